@@ -0,0 +1,24 @@
+"""
+Audio helpers for the Twilio media pipeline.
+
+Everything here works on raw buffers so the hot path never loops over
+individual samples in Python.
+"""
+
+from .buffer import FrameChunker
+from .g711 import ulaw_to_pcm16, pcm16_to_ulaw
+from .levels import LevelMeter, apply_gain, rms_dbfs, ulaw_rms_dbfs
+from .resample import Resampler
+from .transcode import TTSTranscoder
+
+__all__ = [
+    'FrameChunker',
+    'LevelMeter',
+    'Resampler',
+    'TTSTranscoder',
+    'apply_gain',
+    'pcm16_to_ulaw',
+    'rms_dbfs',
+    'ulaw_rms_dbfs',
+    'ulaw_to_pcm16',
+]
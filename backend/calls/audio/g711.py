@@ -0,0 +1,66 @@
+"""
+G.711 μ-law codec via lookup tables.
+
+Twilio media streams carry 8kHz μ-law. Both directions go through a table
+indexed by the raw value — 256 entries to decode, 65536 to encode — so a
+whole buffer is converted with a single NumPy gather and no per-sample
+Python work.
+"""
+
+import numpy as np
+
+_BIAS = 0x84
+_CLIP = 32635
+_SEGMENT_ENDS = (0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF)
+
+
+def _build_decode_table():
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    sign = u & 0x80
+    exponent = (u >> 4) & 0x07
+    mantissa = u & 0x0F
+    magnitude = (((mantissa << 3) + _BIAS) << exponent) - _BIAS
+    return np.where(sign, -magnitude, magnitude).astype(np.int16)
+
+
+def _build_encode_table():
+    # Index is the int16 sample reinterpreted as uint16. Works on the 14-bit
+    # magnitude like the ITU reference (and audioop) so results match exactly.
+    pcm = np.arange(65536, dtype=np.int32)
+    pcm = np.where(pcm >= 32768, pcm - 65536, pcm) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm), _CLIP >> 2) + (_BIAS >> 2)
+    segment = np.searchsorted(np.array(_SEGMENT_ENDS), magnitude)
+    mantissa = (magnitude >> (segment + 1)) & 0x0F
+    ulaw = np.where(segment >= 8, 0x7F, (segment << 4) | mantissa)
+    return (ulaw ^ mask).astype(np.uint8)
+
+
+# μ-law byte -> linear PCM16 sample
+ULAW_TO_PCM16 = _build_decode_table()
+ULAW_TO_PCM16.setflags(write=False)
+
+# PCM16 sample (as uint16) -> μ-law byte
+PCM16_TO_ULAW = _build_encode_table()
+PCM16_TO_ULAW.setflags(write=False)
+
+# μ-law byte -> squared sample, for energy measurement without decoding first
+ULAW_TO_POWER = ULAW_TO_PCM16.astype(np.float64) ** 2
+ULAW_TO_POWER.setflags(write=False)
+
+
+def ulaw_bytes(buf):
+    """View a μ-law buffer (bytes, bytearray, memoryview) as a uint8 array without copying."""
+    return np.frombuffer(buf, dtype=np.uint8)
+
+
+def ulaw_to_pcm16(buf):
+    """Decode μ-law bytes to an int16 PCM array."""
+    return ULAW_TO_PCM16.take(ulaw_bytes(buf))
+
+
+def pcm16_to_ulaw(pcm):
+    """Encode an int16 PCM array (or little-endian PCM16 bytes) to μ-law bytes."""
+    if not isinstance(pcm, np.ndarray):
+        pcm = np.frombuffer(pcm, dtype='<i2')
+    return PCM16_TO_ULAW.take(pcm.astype(np.int16, copy=False).view(np.uint16)).tobytes()
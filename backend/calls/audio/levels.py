@@ -0,0 +1,78 @@
+"""
+Gain and level metering for PCM16 and μ-law buffers.
+"""
+
+import math
+
+import numpy as np
+
+from .g711 import ULAW_TO_POWER, ulaw_bytes
+
+# Full-scale PCM16 power, so levels can be expressed in dBFS
+_FULL_SCALE_POWER = 32768.0 ** 2
+SILENCE_DBFS = -120.0
+
+
+def power_to_dbfs(power):
+    if power <= 0:
+        return SILENCE_DBFS
+    return 10.0 * math.log10(power / _FULL_SCALE_POWER)
+
+
+def rms_dbfs(pcm):
+    """RMS level of an int16 PCM array in dBFS."""
+    if not len(pcm):
+        return SILENCE_DBFS
+    samples = pcm.astype(np.float64)
+    return power_to_dbfs(float(np.dot(samples, samples)) / len(samples))
+
+
+def ulaw_rms_dbfs(buf):
+    """RMS level of μ-law bytes in dBFS, straight from the power table."""
+    samples = ulaw_bytes(buf)
+    if not samples.size:
+        return SILENCE_DBFS
+    return power_to_dbfs(float(ULAW_TO_POWER.take(samples).sum()) / samples.size)
+
+
+def apply_gain(pcm, gain_db):
+    """Scale an int16 PCM array by ``gain_db``, saturating instead of wrapping."""
+    scaled = pcm.astype(np.float32) * np.float32(10.0 ** (gain_db / 20.0))
+    return np.clip(np.rint(scaled), -32768, 32767).astype(np.int16)
+
+
+class LevelMeter:
+    """
+    Running level statistics for one stream, fed one frame level at a time.
+
+    Cheap enough to update on every 20ms frame; the averages are energy
+    means (not dB means), so loud passages dominate as they should.
+    """
+
+    def __init__(self, active_threshold_db=-45.0):
+        self.active_threshold_db = active_threshold_db
+        self.frames = 0
+        self.active_frames = 0
+        self.peak_db = SILENCE_DBFS
+        self._power_sum = 0.0
+
+    def add(self, level_db):
+        self.frames += 1
+        self._power_sum += 10.0 ** (level_db / 10.0)
+        if level_db > self.peak_db:
+            self.peak_db = level_db
+        if level_db > self.active_threshold_db:
+            self.active_frames += 1
+
+    @property
+    def mean_db(self):
+        if not self.frames or self._power_sum <= 0:
+            return SILENCE_DBFS
+        return 10.0 * math.log10(self._power_sum / self.frames)
+
+    @property
+    def active_ratio(self):
+        return self.active_frames / self.frames if self.frames else 0.0
+
+    def summary(self):
+        return f"mean={self.mean_db:.1f}dBFS peak={self.peak_db:.1f}dBFS active={self.active_ratio:.0%}"
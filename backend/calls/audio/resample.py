@@ -0,0 +1,89 @@
+"""
+Streaming polyphase resampling between telephony and TTS/STT sample rates.
+
+Converting by the rational factor L/M (e.g. 8000 -> 22050 is 441/160) is
+done without materialising the L-times upsampled signal: each output sample
+picks the one polyphase branch of the anti-aliasing filter that lines up
+with real input samples. All output samples of a chunk are computed in one
+NumPy gather + row-wise dot product, so there is no per-sample Python loop.
+
+The resampler is stateful: feed consecutive chunks of one stream through the
+same instance and the output is seamless across chunk boundaries.
+"""
+
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def design_filter(up, down, taps_per_phase, beta=8.0):
+    """
+    Kaiser-windowed sinc low-pass for an up/down ratio, laid out as one row
+    per polyphase branch with taps reversed so each row can be dotted
+    directly against a window of input samples.
+    """
+    num_taps = up * taps_per_phase
+    # Cutoff relative to the upsampled rate; a little below Nyquist for a transition band
+    cutoff = 0.5 / max(up, down) * 0.9
+    n = np.arange(num_taps) - (num_taps - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(num_taps, beta)
+    h *= up / h.sum()  # Unity DC gain after zero-stuffing
+
+    # Branch p holds h[p], h[p + up], h[p + 2*up], ...
+    phases = h.reshape(taps_per_phase, up).T
+    return np.ascontiguousarray(phases[:, ::-1])
+
+
+class Resampler:
+    """
+    Resample an int16 PCM stream from ``in_rate`` to ``out_rate``.
+
+    ``process(pcm)`` accepts int16 arrays or little-endian PCM16 bytes and
+    returns an int16 array. Output lags input by half the filter length.
+    """
+
+    def __init__(self, in_rate, out_rate, taps_per_phase=16):
+        g = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // g
+        self.down = in_rate // g
+        self.taps = taps_per_phase
+        self.filters = design_filter(self.up, self.down, taps_per_phase)
+
+        # Input history so consecutive chunks join seamlessly
+        self._history = np.zeros(self.taps - 1, dtype=np.float64)
+        self._in_total = 0   # Input samples seen so far
+        self._out_total = 0  # Output samples produced so far
+
+    def process(self, pcm):
+        if not isinstance(pcm, np.ndarray):
+            pcm = np.frombuffer(pcm, dtype='<i2')
+        if self.up == self.down:
+            return pcm.astype(np.int16, copy=False)
+
+        buf = np.concatenate((self._history, pcm.astype(np.float64)))
+        buf_start = self._in_total - (self.taps - 1)  # Absolute index of buf[0]
+        self._in_total += len(pcm)
+
+        # Output n uses input samples up to floor(n * down / up)
+        out_end = -(-self._in_total * self.up // self.down)
+        n = np.arange(self._out_total, out_end, dtype=np.int64)
+        self._out_total = out_end
+        self._history = buf[len(buf) - (self.taps - 1):]
+        if not len(n):
+            return np.zeros(0, dtype=np.int16)
+
+        pos = n * self.down
+        last_input = pos // self.up
+        phase = pos % self.up
+
+        windows = sliding_window_view(buf, self.taps)[last_input - (self.taps - 1) - buf_start]
+        out = np.einsum('ij,ij->i', windows, self.filters[phase])
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+    def reset(self):
+        self._history[:] = 0
+        self._in_total = 0
+        self._out_total = 0
@@ -0,0 +1,55 @@
+"""
+Convert TTS provider output to the 8kHz μ-law Twilio plays.
+
+ElevenLabs (and most other TTS providers) can return raw PCM at several
+sample rates; some voices/models are only available that way or sound
+better resampled than synthesized at 8kHz directly.
+"""
+
+import numpy as np
+
+from .g711 import pcm16_to_ulaw
+from .resample import Resampler
+
+TWILIO_SAMPLE_RATE = 8000
+
+
+class TTSTranscoder:
+    """
+    Stateful converter for one TTS stream, chosen by provider output format.
+
+    ``ulaw_8000`` passes straight through; ``pcm_<rate>`` (16-bit little-endian
+    mono) is resampled to 8kHz and μ-law encoded. Chunks may split samples, so
+    an odd trailing byte is carried over to the next chunk.
+    """
+
+    def __init__(self, output_format):
+        codec, _, rate = output_format.partition('_')
+        if output_format == 'ulaw_8000':
+            self.resampler = None
+        elif codec == 'pcm' and rate.isdigit():
+            self.resampler = Resampler(int(rate), TWILIO_SAMPLE_RATE)
+        else:
+            raise ValueError(f"Unsupported TTS output format: {output_format}")
+        self.output_format = output_format
+        self._carry = b""
+
+    def process(self, chunk):
+        """Convert one provider chunk; returns μ-law bytes (possibly empty)."""
+        if self.resampler is None:
+            return chunk
+
+        if self._carry:
+            chunk = self._carry + bytes(chunk)
+        usable = len(chunk) & ~1
+        self._carry = bytes(chunk[usable:])
+        if not usable:
+            return b""
+
+        pcm = np.frombuffer(chunk, dtype='<i2', count=usable // 2)
+        return pcm16_to_ulaw(self.resampler.process(pcm))
+
+    def reset(self):
+        self._carry = b""
+        if self.resampler is not None:
+            self.resampler.reset()
@@ -0,0 +1,72 @@
+"""
+Streaming energy-based voice activity detection on Twilio's inbound μ-law.
+
+Deepgram only reports speech once it has a transcript, which is several
+hundred milliseconds after the caller starts talking. ``EnergyVAD`` looks at
+raw frame energy instead, so barge-in can start within a few frames.
+
+It is deliberately simple: an adaptive noise floor, a start threshold that
+must hold for a few consecutive frames, and a hangover so short pauses
+between words don't end the utterance. Deepgram still has the final say on
+whether a detection was real speech.
+"""
+
+from .levels import ulaw_rms_dbfs
+
+SPEECH_START = 'speech_start'
+SPEECH_END = 'speech_end'
+FRAME_MS = 20
+
+
+class EnergyVAD:
+    """
+    Frame-by-frame speech detector for one inbound stream.
+
+    ``process(frame)`` returns ``SPEECH_START`` or ``SPEECH_END`` on the frame
+    where the state changes, otherwise ``None``. Frames are expected every
+    20ms (Twilio's 160-byte media payloads), which is what the frame counts
+    below are expressed in.
+    """
+
+    def __init__(self, threshold_db=-40.0, margin_db=12.0, start_frames=3, hangover_frames=15, floor_adapt=0.05):
+        self.threshold_db = threshold_db    # Absolute floor for speech, in dBFS
+        self.margin_db = margin_db          # How far above the noise floor speech must be
+        self.start_frames = start_frames    # Consecutive voiced frames to declare speech (60ms)
+        self.hangover_frames = hangover_frames  # Unvoiced frames to declare silence (300ms)
+        self.floor_adapt = floor_adapt      # Noise floor smoothing factor
+
+        self.noise_floor_db = -70.0
+        self.speaking = False
+        self.level_db = -120.0
+        self._voiced_run = 0
+        self._unvoiced_run = 0
+
+    def reset(self):
+        self.speaking = False
+        self._voiced_run = 0
+        self._unvoiced_run = 0
+
+    def process(self, frame):
+        if not len(frame):
+            return None
+
+        self.level_db = ulaw_rms_dbfs(frame)
+        voiced = self.level_db > max(self.threshold_db, self.noise_floor_db + self.margin_db)
+
+        if voiced:
+            self._voiced_run += 1
+            self._unvoiced_run = 0
+            # Creep up very slowly so a sudden rise in background noise isn't speech forever
+            self.noise_floor_db += self.floor_adapt * 0.05 * (self.level_db - self.noise_floor_db)
+        else:
+            self._unvoiced_run += 1
+            self._voiced_run = 0
+            self.noise_floor_db += self.floor_adapt * (self.level_db - self.noise_floor_db)
+
+        if not self.speaking and self._voiced_run >= self.start_frames:
+            self.speaking = True
+            return SPEECH_START
+        if self.speaking and self._unvoiced_run >= self.hangover_frames:
+            self.speaking = False
+            return SPEECH_END
+        return None
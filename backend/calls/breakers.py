@@ -0,0 +1,180 @@
+"""
+Per-provider circuit breakers and retries, shared by every call in the process.
+
+Without them, a degraded provider costs every call a full timeout per
+request before the fallback kicks in. A ``CircuitBreaker`` counts
+consecutive failures per provider; after ``BREAKER_FAILURES`` it opens and
+callers skip straight to their fallback (``allow()`` is False) for
+``BREAKER_RESET_SECONDS``. Then one probe request is let through
+(half-open): success closes the circuit, failure opens it again.
+
+``retry()`` runs an idempotent async operation through a breaker, retrying
+failures with full-jitter exponential backoff as long as the next attempt
+still fits in the caller's latency budget.
+
+Providers: ``deepgram``, ``groq`` (and the LLM hedge provider),
+``elevenlabs``, ``twilio``. ``snapshot()`` feeds the ``/calls/providers/``
+endpoint.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+from calls import calllog, metrics
+
+# Consecutive failures that open a circuit
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", "5"))
+
+# How long an open circuit fast-fails before letting a probe through
+BREAKER_RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", "30"))
+
+process_log = calllog.CallLogger(sampled=False)
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker. Thread-safe: views use it from worker threads."""
+
+    def __init__(self, name, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failures
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+        labels = {'provider': name}
+        self._state_gauge = metrics.gauge('breaker_state', 'Circuit state (0 closed, 1 half-open, 2 open)', labels)
+        self._rejected = metrics.counter('breaker_rejected_total', 'Requests fast-failed by an open circuit', labels)
+        self._failed = metrics.counter('breaker_failures_total', 'Provider request failures', labels)
+        self._opened = metrics.counter('breaker_opened_total', 'Times the circuit opened', labels)
+        self._state_gauge.set(0)
+
+    def allow(self):
+        """True if a request may go to the provider now."""
+        with self._lock:
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_seconds:
+                self._set(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._rejected.inc()
+            return False
+
+    def check(self):
+        """``allow()`` or raise ``CircuitOpenError``."""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                process_log.info('breaker_closed', breaker=self.name)
+                self._set(CLOSED)
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            self.last_error = repr(error) if error is not None else None
+            self._failed.inc()
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                process_log.warning('breaker_opened', self.last_error or '', breaker=self.name, failures=self.failures)
+                self.opened_at = self.clock()
+                self._opened.inc()
+                self._set(OPEN)
+
+    def release(self):
+        """A probe ended without an outcome (e.g. cancelled); let the next request probe instead."""
+        with self._lock:
+            self._probing = False
+
+    def stats(self):
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, self.reset_seconds - (self.clock() - self.opened_at))
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'retry_in_seconds': round(retry_in, 1) if retry_in is not None else None,
+                'last_error': self.last_error,
+            }
+
+    def _set(self, state):
+        self.state = state
+        self._state_gauge.set(STATE_VALUES[state])
+
+
+PROVIDERS = ('deepgram', 'groq', 'elevenlabs', 'twilio')
+
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def get(name):
+    """The process-wide breaker for provider ``name`` (created on first use)."""
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def snapshot():
+    return {name: breaker.stats() for name, breaker in sorted(_breakers.items())}
+
+
+async def retry(breaker, operation, budget, base_delay=0.1, max_attempts=3):
+    """
+    ``await operation()`` through ``breaker``, retrying failures with jittered
+    backoff while another attempt fits in ``budget`` seconds. Raises
+    ``CircuitOpenError`` without calling ``operation`` if the circuit is open,
+    else the last error.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget
+    attempt = 0
+    while True:
+        breaker.check()
+        attempt += 1
+        started = loop.time()
+        try:
+            result = await operation()
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            breaker.record_failure(e)
+            delay = random.uniform(0, base_delay * 2 ** (attempt - 1))
+            # Retry only if the wait plus another attempt as long as this one still fits
+            if attempt >= max_attempts or loop.time() + delay + (loop.time() - started) > deadline:
+                raise
+            process_log.warning('breaker_retry', repr(e), breaker=breaker.name, attempt=attempt,
+                                delay_ms=round(delay * 1000))
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+
+
+for _name in PROVIDERS:
+    get(_name)
@@ -0,0 +1,219 @@
+"""
+Structured, non-blocking call logging.
+
+``print()`` on the media path is a synchronous write to stdout from the event
+loop: when stdout is a pipe to a slow log collector, every call on the
+process waits for it. Call logs go through the ``calls.media`` logger
+instead. Emitting puts a plain tuple on a bounded queue; a
+``QueueListener`` thread turns it into a ``LogRecord``, formats it and writes
+it, so the loop never pays for ``LogRecord`` construction, caller lookup or
+formatting. Other code logging to ``calls.media`` goes through a
+``QueueHandler`` onto the same queue. If the writer falls behind and the
+queue fills, records are dropped and counted rather than blocking the loop.
+
+Each call gets a ``CallLogger`` that tags its records with ``call_sid``,
+``stream_sid`` and the current turn, and has its own level:
+
+- ``CALL_LOG_LEVEL`` for most calls (per-chunk detail is DEBUG)
+- ``CALL_LOG_SAMPLE_LEVEL`` for a ``CALL_LOG_SAMPLE`` fraction of calls, so a
+  few calls are traced in full without paying for it on every call
+
+The level is checked before anything is built, so a filtered-out record
+costs one comparison. ``CALL_LOG_FORMAT`` picks one text line or one JSON
+object per record.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+from calls import metrics
+
+# Level for ordinary calls, and for the sampled ones
+CALL_LOG_LEVEL = os.environ.get("CALL_LOG_LEVEL", "INFO").upper()
+CALL_LOG_SAMPLE_LEVEL = os.environ.get("CALL_LOG_SAMPLE_LEVEL", "DEBUG").upper()
+
+# Fraction of calls logged at CALL_LOG_SAMPLE_LEVEL (0 = none, 1 = all)
+CALL_LOG_SAMPLE = float(os.environ.get("CALL_LOG_SAMPLE", "0"))
+
+# "text" (one readable line per record) or "json" (one object per line)
+CALL_LOG_FORMAT = os.environ.get("CALL_LOG_FORMAT", "text")
+
+# Records waiting for the writer thread; more are dropped
+CALL_LOG_QUEUE_MAX = int(os.environ.get("CALL_LOG_QUEUE_MAX", "10000"))
+
+RECORDS_DROPPED = metrics.counter('call_log_records_dropped_total', 'Call log records dropped on a full queue')
+QUEUE_DEPTH = metrics.gauge('call_log_queue_depth', 'Call log records waiting for the writer thread')
+
+logger = logging.getLogger('calls.media')
+logger.setLevel(logging.DEBUG)   # Levels are applied per call by CallLogger
+logger.propagate = False
+
+_queue = queue.Queue(CALL_LOG_QUEUE_MAX)
+_listener = None
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking or raising on a full queue."""
+
+    def prepare(self, record):
+        # Resolve the message here: its args may change once the loop moves on.
+        # Formatting the line is left to the writer thread.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            RECORDS_DROPPED.inc()
+
+
+class TextFormatter(logging.Formatter):
+    """``<time> <LEVEL> [<call_sid> t<turn>] <event>: <message> key=value ...``"""
+
+    def format(self, record):
+        where = getattr(record, 'call_sid', None) or '-'
+        turn = getattr(record, 'turn', None)
+        if turn:
+            where += f" t{turn}"
+        line = f"{self.formatTime(record)} {record.levelname} [{where}] {getattr(record, 'event', '-')}"
+        if record.msg:
+            line += f": {record.msg}"
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record; ``fields`` are merged in at the top level."""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'event': getattr(record, 'event', None),
+            'call_sid': getattr(record, 'call_sid', None),
+            'stream_sid': getattr(record, 'stream_sid', None),
+            'turn': getattr(record, 'turn', None),
+            'msg': record.msg,
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, separators=(',', ':'))
+
+
+FORMATTERS = {'text': TextFormatter, 'json': JSONFormatter}
+
+
+class CallLogListener(logging.handlers.QueueListener):
+    """Writer thread: builds the ``LogRecord`` for each tuple a ``CallLogger`` queued."""
+
+    def prepare(self, record):
+        if not isinstance(record, tuple):
+            return record
+        created, level, event, call_sid, stream_sid, turn, msg, fields = record
+        record = logger.makeRecord(logger.name, level, '', 0, msg, None, None, extra={
+            'event': event, 'call_sid': call_sid, 'stream_sid': stream_sid, 'turn': turn, 'fields': fields,
+        })
+        record.created = created
+        record.msecs = int(created * 1000) % 1000
+        return record
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)   # Waits for room on a full queue rather than raising
+
+
+def configure(stream=None, fmt=CALL_LOG_FORMAT):
+    """(Re)start the writer thread, writing to ``stream`` (default stderr)."""
+    global _listener
+    shutdown()
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(FORMATTERS[fmt]())
+    logger.handlers = [DroppingQueueHandler(_queue)]
+    _listener = CallLogListener(_queue, writer)
+    _listener.start()
+
+
+def shutdown():
+    """Write out whatever is queued and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown)
+
+
+@metrics.on_collect
+def report_queue_depth():
+    QUEUE_DEPTH.set(_queue.qsize())
+
+
+def _level(name):
+    return logging.getLevelName(name) if isinstance(name, str) else name
+
+
+class CallLogger:
+    """
+    Logger for one call. ``turn`` is a function returning the current turn
+    number; ``bind()`` adds the Twilio ids once the stream starts.
+    """
+
+    def __init__(self, turn=None, level=None, sampled=None):
+        if sampled is None:
+            sampled = CALL_LOG_SAMPLE > 0 and random.random() < CALL_LOG_SAMPLE
+        self.sampled = sampled
+        self.level = _level(level or (CALL_LOG_SAMPLE_LEVEL if sampled else CALL_LOG_LEVEL))
+        self.call_sid = None
+        self.stream_sid = None
+        self._turn = turn
+
+    def bind(self, call_sid, stream_sid):
+        self.call_sid = call_sid
+        self.stream_sid = stream_sid
+
+    def set_level(self, level):
+        self.level = _level(level)
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def log(self, level, event, msg='', **fields):
+        if level < self.level:
+            return
+        turn = self._turn() if self._turn else None
+        try:
+            _queue.put_nowait((time.time(), level, event, self.call_sid, self.stream_sid, turn, msg, fields))
+        except queue.Full:
+            RECORDS_DROPPED.inc()
+
+    def debug(self, event, msg='', **fields):
+        self.log(logging.DEBUG, event, msg, **fields)
+
+    def info(self, event, msg='', **fields):
+        self.log(logging.INFO, event, msg, **fields)
+
+    def warning(self, event, msg='', **fields):
+        self.log(logging.WARNING, event, msg, **fields)
+
+    def error(self, event, msg='', **fields):
+        self.log(logging.ERROR, event, msg, **fields)
+
+
+configure()
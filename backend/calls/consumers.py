@@ -10,29 +10,161 @@ Features:
 - Full conversation logging to DB
 - **Low latency**: Groq streaming → ElevenLabs
 - **Interruption handling**: AI stops speaking instantly if user interrupts
+- **Phrase cache**: greeting, goodbye and apology audio is synthesized once and replayed
 """
 
 import os
 import re
 import json
-import base64
+import time
 import asyncio
-import aiohttp
+import logging
 from datetime import timezone, datetime
 from channels.generic.websocket import AsyncWebsocketConsumer
-from deepgram import DeepgramClient, LiveTranscriptionEvents, LiveOptions
+from deepgram import DeepgramClient, DeepgramClientOptions, LiveTranscriptionEvents, LiveOptions
 from groq import AsyncGroq
 from elevenlabs.client import AsyncElevenLabs
 from asgiref.sync import sync_to_async
+from django.conf import settings
 
-# SDK Clients — initialised once at module level
-deepgram = DeepgramClient(os.environ.get("DEEPGRAM_API_KEY", ""))
-groq_client = AsyncGroq(api_key=os.environ.get("GROQ_API_KEY", ""))
-el_client = AsyncElevenLabs(api_key=os.environ.get("ELEVENLABS_API_KEY", ""))
+from calls.audio import LevelMeter, TTSTranscoder
+from calls.audio.vad import EnergyVAD, FRAME_MS as VAD_FRAME_MS, SPEECH_END, SPEECH_START
+from calls.playback import PacedPlayback
+from calls.segmenter import SentenceSegmenter
+from calls import (breakers, calllog, context, db, http, llm, metrics, persistence, preanswer, prompts, recorder,
+                   tts, turns, twilio_media, warmup)
+from calls.memory import ConversationMemory, token_budget
+from calls.stt import AudioSendQueue
+from calls.tts_cache import TTSCache
+from calls.twilio_media import MediaFrameEncoder, parse_message
+
+# Deepgram endpoint; configurable so a local fake can stand in for it (see tests/fakes.py)
+DEEPGRAM_URL = os.environ.get("DEEPGRAM_URL", "")
+
+# Level of the Deepgram SDK's own stderr logging. Its finish() cancels its own socket
+# tasks and logs that as an error ("tasks cancelled error:") on every close; real
+# failures reach the call log through the connection's Error event instead
+DEEPGRAM_LOG_LEVEL = os.environ.get("DEEPGRAM_LOG_LEVEL", "CRITICAL").upper()
+
+# SDK clients: Deepgram's is made once here; Groq's and ElevenLabs' on first use, on the shared httpx pool
+deepgram = DeepgramClient(os.environ.get("DEEPGRAM_API_KEY", ""),
+                          DeepgramClientOptions(url=DEEPGRAM_URL, verbose=logging.getLevelName(DEEPGRAM_LOG_LEVEL)))
+
+_groq = _elevenlabs = None  # (httpx pool, SDK client)
+
+
+def groq_client():
+    """The async Groq SDK client on the shared httpx pool, rebuilt once ``http.close()`` replaced the pool."""
+    global _groq
+    pool = http.async_httpx()
+    if _groq is None or _groq[0] is not pool:
+        _groq = (pool, AsyncGroq(api_key=os.environ.get("GROQ_API_KEY", ""), http_client=pool))
+    return _groq[1]
+
+
+def el_client():
+    """The async ElevenLabs SDK client on the shared httpx pool (see ``groq_client``)."""
+    global _elevenlabs
+    pool = http.async_httpx()
+    if _elevenlabs is None or _elevenlabs[0] is not pool:
+        _elevenlabs = (pool, AsyncElevenLabs(api_key=os.environ.get("ELEVENLABS_API_KEY", ""), httpx_client=pool))
+    return _elevenlabs[1]
+
+
+# Log for process-level events; each call has its own CallLogger
+process_log = calllog.CallLogger(sampled=False)
+
+
+# Process-wide circuit breakers: once a provider keeps failing, calls skip it for a while
+stt_breaker = breakers.get('deepgram')
+tts_breaker = breakers.get('elevenlabs')
+twilio_breaker = breakers.get('twilio')
+
+# Latency budgets for retrying a failed connect (Deepgram, ElevenLabs) and the Twilio <Say> fallback
+CONNECT_BUDGET_SECONDS = float(os.environ.get("CONNECT_BUDGET_MS", "1500")) / 1000
+FALLBACK_BUDGET_SECONDS = float(os.environ.get("FALLBACK_BUDGET_MS", "2000")) / 1000
 
 # ElevenLabs config
 ELEVENLABS_VOICE_ID = os.environ.get("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")  # "Rachel" — natural female voice
 ELEVENLABS_MODEL = os.environ.get("ELEVENLABS_MODEL", "eleven_turbo_v2_5") # Upgraded to 2.5 for lower latency
+# ulaw_8000 plays as-is; pcm_16000/22050/24000/44100 are resampled and encoded locally
+ELEVENLABS_OUTPUT_FORMAT = os.environ.get("ELEVENLABS_OUTPUT_FORMAT", "ulaw_8000")
+
+# TTS transport: "websocket" keeps one ElevenLabs input-streaming socket open for the whole
+# call (falls back to "http" if it can't connect); "http" makes one streaming request per reply
+TTS_PROVIDER = os.environ.get("TTS_PROVIDER", tts.WEBSOCKET)
+ELEVENLABS_WS_URL = os.environ.get("ELEVENLABS_WS_URL", tts.DEFAULT_WS_URL)
+
+# Finished ulaw audio for fixed phrases is cached in memory (bounded) and on disk;
+# set TTS_CACHE_DIR to an empty string to keep it in memory only
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", str(settings.BASE_DIR / "tts_cache"))
+TTS_CACHE_MAX_MB = int(os.environ.get("TTS_CACHE_MAX_MB", "16"))
+tts_cache = TTSCache(max_bytes=TTS_CACHE_MAX_MB * 1024 * 1024, directory=TTS_CACHE_DIR or None)
+
+# Fixed phrases — spoken from the TTS cache, synthesized ahead of time at start-up
+GREETING_TEXT = "Hello! How can I help you today?"
+GOODBYE_TEXT = "Thank you for calling. Goodbye! Have a great day."
+LLM_ERROR_TEXT = "Sorry, I'm having trouble thinking."
+CACHED_PHRASES = (GREETING_TEXT, GOODBYE_TEXT, LLM_ERROR_TEXT)
+
+# Said by Twilio before hanging up when transcription can't start: the caller could not be heard
+STT_UNAVAILABLE_TEXT = "Sorry, we're having trouble hearing you right now. Please call back in a few minutes. Goodbye."
+
+# Outbound calls are prepared while ringing (context, prompt, greeting audio). At pickup the
+# consumer waits this long for preparation still in flight before doing it itself
+PREANSWER_WAIT_MS = int(os.environ.get("PREANSWER_WAIT_MS", "1500"))
+
+START_STAGE_SECONDS = {
+    stage: metrics.histogram('call_start_stage_seconds', 'Duration of each call start-up stage', {'stage': stage})
+    for stage in ('preanswer', 'session', 'context', 'deepgram', 'tts')
+}
+
+PICKUP_TO_FIRST_AUDIO = {
+    prepared: metrics.histogram('call_pickup_to_first_audio_seconds',
+                                'Media stream connect to first greeting audio sent',
+                                {'preanswer': prepared})
+    for prepared in ('hit', 'miss')
+}
+
+ACTIVE_CALLS = metrics.gauge('calls_active', 'Media streams currently connected')
+FRAMES_SENT = metrics.counter('twilio_media_frames_sent_total', 'Outbound media frames sent to Twilio')
+MEDIA_FPS = {
+    direction: metrics.gauge('twilio_media_frames_per_second', 'Twilio media frame rate since the previous scrape',
+                             {'direction': direction})
+    for direction in ('inbound', 'outbound')
+}
+_fps_mark = [time.monotonic(), {'inbound': 0, 'outbound': 0}]
+
+
+def _frame_counts():
+    # Inbound messages are nearly all media; the parser already counts them
+    parsed = twilio_media.FAST_PATH.value + twilio_media.SLOW_PATH.value
+    return {'inbound': parsed, 'outbound': FRAMES_SENT.value}
+
+
+@metrics.on_collect
+def report_frame_rates():
+    now = time.monotonic()
+    then, previous = _fps_mark
+    if now - then < 0.5:
+        return  # Back-to-back scrapes: keep the previous rates
+    counts = _frame_counts()
+    for direction, frames in counts.items():
+        MEDIA_FPS[direction].set(round((frames - previous[direction]) / (now - then), 1))
+    _fps_mark[:] = [now, counts]
+
+
+# Groq chat model for replies, openers and history summaries
+LLM_MODEL = "llama-3.1-8b-instant"
+
+# Replies stream through the hedged gateway (calls.llm); one-shot requests use groq_client()
+llm_gateway = llm.from_env(os.environ.get("GROQ_API_KEY", ""), LLM_MODEL)
+
+# Instruction for folding older turns into the running summary (calls.memory)
+SUMMARY_INSTRUCTION = (
+    "Summarize this phone conversation for the assistant's own memory in at most four sentences. "
+    "Keep names, numbers, dates, requests and anything the caller agreed to. Output only the summary."
+)
 
 # Default system prompt (overridden per-call via CallSession)
 DEFAULT_SYSTEM_PROMPT = "You are a helpful, brief, and friendly AI phone assistant. Always speak conversationally. Keep your answers short. NEVER use emojis, markdown formatting, or asterisks like *laughs*."
@@ -43,23 +175,125 @@ END_CALL_PATTERN = re.compile(
     re.IGNORECASE
 )
 
+# Outbound playback pacing — audio is sent in 20ms-multiple frames at real-time rate,
+# keeping only a small lookahead queued on Twilio so barge-in can cut it off quickly
+PLAYBACK_FRAME_MS = int(os.environ.get("PLAYBACK_FRAME_MS", "20"))
+PLAYBACK_LOOKAHEAD_MS = int(os.environ.get("PLAYBACK_LOOKAHEAD_MS", "200"))
+PLAYBACK_MARK_INTERVAL_MS = int(os.environ.get("PLAYBACK_MARK_INTERVAL_MS", "500"))
+
+# Inbound audio is queued per call and sent to Deepgram in batches by a separate task.
+# On overflow the queue either drops the oldest frames ("drop_oldest") or makes the
+# receive loop wait ("block")
+STT_BATCH_MS = int(os.environ.get("STT_BATCH_MS", "100"))
+STT_QUEUE_MAX_MS = int(os.environ.get("STT_QUEUE_MAX_MS", "1000"))
+STT_QUEUE_POLICY = os.environ.get("STT_QUEUE_POLICY", "drop_oldest")
+
+# Local barge-in — when the energy VAD hears the caller over the AI, playback is paused
+# straight away and Deepgram gets this long to confirm it was real speech (extended
+# while the caller is still talking, up to the max) before the AI carries on
+VAD_DUCK_CONFIRM_MS = int(os.environ.get("VAD_DUCK_CONFIRM_MS", "800"))
+VAD_DUCK_MAX_MS = int(os.environ.get("VAD_DUCK_MAX_MS", "2400"))
+
+# LLM output is handed to TTS in segments: whole sentences of at least SEGMENT_MIN_CHARS,
+# cut at SEGMENT_MAX_CHARS, except the first clause of a reply which goes out as soon as
+# it has SEGMENT_FIRST_CLAUSE_WORDS words
+SEGMENT_MIN_CHARS = int(os.environ.get("SEGMENT_MIN_CHARS", "40"))
+SEGMENT_MAX_CHARS = int(os.environ.get("SEGMENT_MAX_CHARS", "250"))
+SEGMENT_FIRST_CLAUSE_WORDS = int(os.environ.get("SEGMENT_FIRST_CLAUSE_WORDS", "4"))
+
 # Low confidence phrases to re-prompt
 LOW_CONFIDENCE_THRESHOLD = 0.5
 
 
+def tts_cache_key(text):
+    return TTSCache.key(text, ELEVENLABS_VOICE_ID, ELEVENLABS_MODEL, ELEVENLABS_OUTPUT_FORMAT)
+
+
+async def synthesize_ulaw(text):
+    """Synthesize one phrase in full as Twilio-ready ulaw (used to fill the TTS cache)."""
+    async def convert():
+        transcoder = TTSTranscoder(ELEVENLABS_OUTPUT_FORMAT)
+        audio = bytearray()
+        async for chunk in el_client().text_to_speech.convert_as_stream(
+            voice_id=ELEVENLABS_VOICE_ID,
+            text=text,
+            model_id=ELEVENLABS_MODEL,
+            output_format=ELEVENLABS_OUTPUT_FORMAT,
+        ):
+            audio += transcoder.process(chunk)
+        return bytes(audio)
+
+    # Off the reply path (start-up, pre-answer): one attempt, skipped while the circuit is open
+    return await breakers.retry(tts_breaker, convert, budget=0, max_attempts=1)
+
+
+async def generate_opener(system_prompt, instruction):
+    """One-shot LLM call for a personalized first line (pre-answer stage)."""
+    completion = await groq_client().chat.completions.create(
+        model=LLM_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": instruction},
+        ],
+        temperature=0.6,
+        max_tokens=60,
+    )
+    return completion.choices[0].message.content
+
+
+async def summarize_turns(summary, turns):
+    """Fold older turns into the call's running summary (ConversationMemory, off the turn path)."""
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+    previous = f"Summary so far: {summary}\n\n" if summary else ""
+    completion = await groq_client().chat.completions.create(
+        model=LLM_MODEL,
+        messages=[
+            {"role": "system", "content": SUMMARY_INSTRUCTION},
+            {"role": "user", "content": f"{previous}Conversation to add:\n{transcript}"},
+        ],
+        temperature=0.2,
+        max_tokens=200,
+    )
+    return completion.choices[0].message.content
+
+
+@warmup.on_startup
+async def prewarm_tts_cache():
+    """Make sure every fixed phrase is cached before the first call needs it."""
+    if not os.environ.get("ELEVENLABS_API_KEY"):
+        return
+    for phrase in CACHED_PHRASES:
+        key = tts_cache_key(phrase)
+        if not tts_cache.has(key):
+            tts_cache.put(key, await synthesize_ulaw(phrase))
+            process_log.info('tts_cache_prewarmed', repr(phrase))
+
+
 class TwilioMediaConsumer(AsyncWebsocketConsumer):
     """Handles a single Twilio bi-directional media stream."""
 
     async def connect(self):
         await self.accept()
-        print("WebSocket connection accepted.")
+        ACTIVE_CALLS.inc()
 
         self.stream_sid = None
+        self.frame_encoder = None
         self.call_sid = None
         self.session = None
-        self.messages = []
         self.call_active = True
         self.dg_connection = None
+        self.stt_queue = None
+
+        # Pickup-to-first-audio: Twilio opens this socket as soon as the call is answered
+        self.connected_at = asyncio.get_running_loop().time()
+        self.first_audio_sent = False
+        self.preanswered = False
+
+        # Call start-up runs in the background; LLM turns wait for the system prompt
+        self.startup_task = None
+        self.prompt_ready = asyncio.Event()
+        self.prompt = None
+        self.start_timings = {}
         
         # State tracking for interruptions and latency
         self.response_task = None
@@ -71,11 +305,60 @@ class TwilioMediaConsumer(AsyncWebsocketConsumer):
         self.transcription_buffer = []
         self.llm_debounce_task = None
 
+        # Latency timeline of the turn being answered (see calls.turns)
+        self.turn = None
+        self.next_turn = None      # Collects STT stages until the debounce fires
+        self.turn_count = 0
+        self.speech_ended_at = None
+
+        # Structured call log, tagged with the call/stream ids and turn (see calls.calllog)
+        self.log = calllog.CallLogger(turn=lambda: self.turn_count)
+        self.log.info('ws_connected')
+
+        self.memory = ConversationMemory(DEFAULT_SYSTEM_PROMPT, summarize_turns, budget=token_budget(LLM_MODEL),
+                                         log=self.log)
+
+        # Replies stream through the shared LLM gateway (swapped out by the replay driver)
+        self.llm = llm_gateway
+
+        # Opt-in recording of the call for offline replay (see calls.recorder)
+        self.recorder = recorder.start_call(self.connected_at, log=self.log)
+
+        # Outbound audio pacing and playback position tracking (reused for every reply)
+        self.playback = PacedPlayback(
+            self._send_audio,
+            self._send_mark,
+            frame_ms=PLAYBACK_FRAME_MS,
+            lookahead_ms=PLAYBACK_LOOKAHEAD_MS,
+            mark_interval_ms=PLAYBACK_MARK_INTERVAL_MS,
+        )
+
+        # One TTS session for the whole call, connected during start-up
+        self.tts = self._create_tts(TTS_PROVIDER)
+
+        # Local voice activity detection on inbound audio for fast barge-in
+        self.vad = EnergyVAD()
+        self.inbound_level = LevelMeter() # Caller audio level, logged at the end of the call
+        self.duck_task = None
+
     async def disconnect(self, close_code):
-        print(f"WebSocket disconnected (code={close_code}).")
+        self.log.info('ws_disconnected', code=close_code)
+        ACTIVE_CALLS.dec()
         self.call_active = False
         self._cancel_response_task()
+        self.memory.close()
+        await self.tts.close()
+
+        if self.startup_task and not self.startup_task.done():
+            self.startup_task.cancel()
+            try:
+                await self.startup_task
+            except (asyncio.CancelledError, Exception):
+                pass
         
+        if self.stt_queue is not None:
+            await self.stt_queue.close()
+
         if self.dg_connection:
             try:
                 await self.dg_connection.finish()
@@ -84,24 +367,32 @@ class TwilioMediaConsumer(AsyncWebsocketConsumer):
 
         # Mark session as completed
         if self.session:
+            rows, batches = await persistence.buffer.end_call(self.session.id)
+            self.log.info('db_persisted', rows=rows, batches=batches)
             await self._update_session_ended()
 
+        if self.recorder is not None:
+            await self._save_recording()
+
     async def receive(self, text_data=None, bytes_data=None):
         if not text_data:
             return
 
-        data = json.loads(text_data)
-        event = data.get('event')
+        # Media frames skip json.loads; everything else is parsed in full
+        event, data, audio = parse_message(text_data)
+        if self.recorder is not None and event != 'media':
+            self.recorder.twilio(text_data)
 
-        if event == 'start':
+        if event == 'media':
+            await self._handle_media(audio)
+        elif event == 'start':
             await self._handle_start(data)
-        elif event == 'media':
-            await self._handle_media(data)
         elif event == 'stop':
             await self._handle_stop()
         elif event == 'mark':
-            # Twilio sends 'mark' events when audio playback completes
-            if data['mark']['name'] == 'ai_finished_speaking':
+            # Twilio acks each mark once playback reaches it
+            if self.playback.on_mark(data['mark']['name']) and self.playback.played_all:
+                self._turn_mark('playback_marked')
                 # Only clear the flag if we haven't already started a new response
                 if not self.response_task or self.response_task.done():
                     self.is_ai_speaking = False
@@ -113,63 +404,167 @@ class TwilioMediaConsumer(AsyncWebsocketConsumer):
     async def _handle_start(self, data):
         """Called when Twilio starts streaming audio."""
         self.stream_sid = data['start']['streamSid']
+        self.frame_encoder = MediaFrameEncoder(self.stream_sid)
         self.call_sid = data['start'].get('callSid', '')
-        print(f"Call started. Stream SID: {self.stream_sid}, Call SID: {self.call_sid}")
-
-        # Load or create the CallSession from DB
-        await self._load_session()
-
-        # Fetch external context if configured
-        await self._fetch_context()
+        self.log.bind(self.call_sid, self.stream_sid)
+        self.log.info('call_started')
 
-        # Build the system prompt with context
-        system_prompt = self.session.system_prompt if self.session else DEFAULT_SYSTEM_PROMPT
-        if self.session and self.session.context_data:
-            system_prompt += f"\n\nHere is context about the person you are calling:\n{json.dumps(self.session.context_data, indent=2)}"
+        # Start-up runs as a background task so this receive loop keeps handling
+        # media and mark messages (the greeting's playback acks) meanwhile
+        self.startup_task = asyncio.create_task(self._start_call())
 
-        self.messages = [{"role": "system", "content": system_prompt}]
+    async def _start_call(self):
+        """
+        Call start-up as a dependency graph. Every stage starts as soon as its own
+        inputs are ready:
+
+            pre-answer ──────────────────────> greeting
+                 └──────────┐
+            session load ──> context fetch ──> system prompt
+            Deepgram connect
+            TTS connect
+        """
+        pre_task = asyncio.create_task(self._timed('preanswer', self._take_preanswer()))
+        session_task = asyncio.create_task(self._timed('session', self._load_session()))
+        deepgram_task = asyncio.create_task(self._timed('deepgram', self._start_deepgram()))
+        tts_task = asyncio.create_task(self._timed('tts', self._open_tts()))
+
+        async def greet():
+            pre = await pre_task
+            greeting = pre.greeting if pre and pre.greeting else GREETING_TEXT
+            audio = pre.audio if pre else None
+            self.preanswered = audio is not None
+            # The next reply must know what the call opened with (an LLM opener differs per call)
+            self.memory.add("assistant", greeting)
+            # Buffered audio or the phrase cache — neither needs the session or Deepgram
+            self.response_task = asyncio.create_task(self._speak_phrase(greeting, audio=audio))
+            return greeting
+
+        async def build_prompt():
+            pre = await pre_task
+            await session_task
+
+            # Fetch external context if configured (already done and saved if pre-answered)
+            if not (pre and pre.context_fetched):
+                await self._timed('context', self._fetch_context())
+
+            # Built once per call; every turn resends exactly these bytes first
+            if pre and pre.prompt:
+                self.prompt = pre.prompt
+            else:
+                base_prompt = self.session.system_prompt if self.session else DEFAULT_SYSTEM_PROMPT
+                self.prompt = prompts.compile_system_prompt(base_prompt, self.session.context_data if self.session else None)
+            self.memory.system_prompt = self.prompt.text
+            self.prompt_ready.set()
+
+        stages = [asyncio.ensure_future(greet()), asyncio.ensure_future(build_prompt()), deepgram_task, tts_task]
+        try:
+            greeting, _, _, _ = await asyncio.gather(*stages)
+        except Exception as e:
+            self.log.error('startup_error', repr(e))
+            self._log_event('error', f"Call start-up error: {e}")
+            return
+        finally:
+            for task in stages + [pre_task, session_task]:
+                task.cancel()
+            if not self.prompt_ready.is_set():
+                # Never leave turns waiting on a prompt that will not come
+                self.memory.system_prompt = DEFAULT_SYSTEM_PROMPT
+                self.prompt_ready.set()
 
         # Log event
-        await self._log_event('call_started', f"Stream={self.stream_sid}")
-
-        # Start Deepgram live transcription
-        await self._start_deepgram()
-
-        # Greet the caller
-        greeting = "Hello! How can I help you today?"
-        asyncio.create_task(self._save_message('assistant', greeting))
-        asyncio.create_task(self._log_event('ai_response', greeting))
-        
-        # Fire off greeting generator as a background task
-        async def greeting_gen():
-            yield greeting
-            
-        self.response_task = asyncio.create_task(
-            self._handle_ai_response(greeting_gen(), greeting)
+        self._log_event('call_started', f"Stream={self.stream_sid}")
+        self._save_message('assistant', greeting)
+        self._log_event('ai_response', greeting)
+        await self._log_start_timings()
+        if self.prompt:
+            self._log_prompt()
+
+    def _create_tts(self, provider):
+        return tts.create_session(
+            provider,
+            client=el_client(),
+            api_key=os.environ.get("ELEVENLABS_API_KEY", ""),
+            voice_id=ELEVENLABS_VOICE_ID,
+            model_id=ELEVENLABS_MODEL,
+            output_format=ELEVENLABS_OUTPUT_FORMAT,
+            ws_url=ELEVENLABS_WS_URL,
         )
 
-    async def _handle_media(self, data):
-        """Forward incoming Twilio audio to Deepgram for transcription."""
-        if self.dg_connection:
-            audio_b64 = data['media']['payload']
-            audio_bytes = base64.b64decode(audio_b64)
-            try:
-                await self.dg_connection.send(audio_bytes)
-            except Exception as e:
-                print(f"Deepgram send error: {e}")
+    async def _open_tts(self):
+        """Connect the call's TTS session up front so the first reply skips the handshake."""
+        try:
+            await breakers.retry(tts_breaker, self.tts.open, budget=CONNECT_BUDGET_SECONDS)
+        except Exception as e:
+            self.log.warning('tts_ws_unavailable', f"{e!r}; using HTTP streaming for this call")
+            await self.tts.close()
+            self.tts = self._create_tts(tts.HTTP)
+
+    async def _take_preanswer(self):
+        """Whatever the pre-answer stage got ready while the phone was ringing (or None)."""
+        if not self.call_sid:
+            return None
+        return await preanswer.take(self.call_sid, PREANSWER_WAIT_MS / 1000, self.log)
+
+    async def _timed(self, stage, coro):
+        """Await ``coro``, recording how long the stage took and when it finished."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            return await coro
+        finally:
+            finished = loop.time()
+            self.start_timings[stage] = (finished - started, finished - self.connected_at)
+            START_STAGE_SECONDS[stage].observe(finished - started)
+
+    async def _log_start_timings(self):
+        detail = " ".join(
+            f"{stage}={took * 1000:.0f}ms(@{done_at * 1000:.0f}ms)"
+            for stage, (took, done_at) in sorted(self.start_timings.items(), key=lambda item: item[1][1])
+        )
+        self.log.info('start_stages', detail)
+        self._log_event('timing', f"start_stages {detail}")
+
+    def _log_prompt(self):
+        """Report the call's system prompt size and how much of it is the cacheable shared prefix."""
+        detail = self.prompt.report()
+        self.log.info('prompt', detail)
+        self._log_event('prompt', detail)
+
+    async def _handle_media(self, audio_bytes):
+        """Run local VAD on incoming Twilio audio and forward it to Deepgram for transcription."""
+        if self.recorder is not None:
+            self.recorder.media(audio_bytes)
+        vad_event = self.vad.process(audio_bytes)
+        self.inbound_level.add(self.vad.level_db)
+        if vad_event == SPEECH_START and self.is_ai_speaking and not self.interrupted:
+            await self._duck_ai_audio()
+        elif vad_event == SPEECH_END:
+            # The last voiced frame was a hangover's worth of frames ago
+            self.speech_ended_at = asyncio.get_running_loop().time() - self.vad.hangover_frames * VAD_FRAME_MS / 1000
+
+        # Only enqueue here — a slow STT socket must never stall this receive loop
+        if self.stt_queue is not None:
+            await self.stt_queue.put(audio_bytes)
 
     async def _handle_stop(self):
         """Called when Twilio stops the stream (call ended)."""
-        print("Call stopped by Twilio.")
+        self.log.info('call_stopped')
         self.call_active = False
         self._cancel_response_task()
-        await self._log_event('call_ended', 'Call stopped by Twilio')
+        self._log_event('call_ended', f"Call stopped by Twilio. Caller audio: {self.inbound_level.summary()}")
+        await persistence.buffer.flush()
 
     def _cancel_response_task(self):
         """Helper to safely cancel the current AI speaking task."""
+        self.playback.interrupt() # Freeze what the caller has heard before Twilio acks the cleared marks
+        self._cancel_duck_timer()
         if self.response_task and not self.response_task.done():
+            if self.turn is not None:
+                self.turn.interrupted = True  # The reply may swallow the CancelledError
             self.response_task.cancel()
             self.response_task = None
+        self.tts.cancel() # Drop the reply on the TTS side too; the session stays open for the next one
         self.is_ai_speaking = False # Force clear the flag locally just in case
         self.ai_spoken_buffer = "" # Clear echo buffer
 
@@ -177,127 +572,110 @@ class TwilioMediaConsumer(AsyncWebsocketConsumer):
         """Send a 'clear' event to instantly stop Twilio from playing queued audio."""
         if self.call_active and self.stream_sid:
             try:
-                clear_payload = {
-                    "event": "clear",
-                    "streamSid": self.stream_sid
-                }
-                await self.send(text_data=json.dumps(clear_payload))
+                await self._send_clear()
                 self.is_ai_speaking = False
-                print("Sent clear to Twilio.")
+                self.log.debug('clear_sent')
             except Exception as e:
-                print(f"Error sending clear: {e}")
+                self.log.warning('clear_failed', repr(e))
+
+    async def _send_clear(self):
+        await self.send(text_data=self.frame_encoder.clear())
 
     # ------------------------------------------------------------------
-    # Deepgram STT
+    # Local barge-in (VAD pauses, Deepgram confirms or undoes)
     # ------------------------------------------------------------------
 
-    async def _start_deepgram(self):
-        """Initialise Deepgram live transcription."""
-        self.dg_connection = deepgram.listen.asyncwebsocket.v("1")
-
-        async def on_message(self_dg, result, **kwargs):
-            # Sometimes deepgram can emit empty interim transcripts, ignore them
-            if not result.channel.alternatives:
-                return
-
-            sentence = result.channel.alternatives[0].transcript.strip()
-            
-            # Identify if this utterance is substantial enough to be considered a real interruption
-            is_substantial = len(sentence) > 3 or len(sentence.split()) >= 2
-            
-            # --- ANTI-ECHO HALLUCINATION ENGINE ---
-            # If the phone is on speakerphone, Deepgram might transcribe the AI's own voice.
-            # We compare the Deepgram transcript to what the AI is currently speaking.
-            # If it's highly similar, we drop it entirely.
-            if self.is_ai_speaking and self.ai_spoken_buffer:
-                normalized_stt = re.sub(r'[^\w\s]', '', sentence.lower())
-                normalized_ai = re.sub(r'[^\w\s]', '', self.ai_spoken_buffer.lower())
-                # If stt is inside what AI just said, or AI is inside stt, it's an echo.
-                if normalized_stt in normalized_ai or normalized_ai in normalized_stt:
-                    print(f"[Echo Dropped] Ignoring self-hearing hallucination: '{sentence}'")
-                    return
+    async def _duck_ai_audio(self):
+        """The caller started talking over the AI: stop playback now, decide later."""
+        if not self.playback.pause():
+            return
+        self.log.info('vad_duck', "Caller speech detected; pausing AI audio")
+        try:
+            await self._send_clear()
+        except Exception as e:
+            self.log.warning('clear_failed', repr(e))
+        self._cancel_duck_timer()
+        self.duck_task = asyncio.create_task(self._undo_duck_unconfirmed())
+
+    async def _undo_duck_unconfirmed(self):
+        """Resume the AI if Deepgram never confirms the caller actually said something."""
+        waited = 0
+        while True:
+            await asyncio.sleep(VAD_DUCK_CONFIRM_MS / 1000)
+            waited += VAD_DUCK_CONFIRM_MS
+            if not self.vad.speaking or waited >= VAD_DUCK_MAX_MS:
+                break
+        self.duck_task = None
+        self._undo_duck("no transcript")
+
+    def _undo_duck(self, reason):
+        if self.playback.paused and not self.interrupted:
+            self.log.info('vad_unduck', "False barge-in; resuming AI audio", reason=reason)
+            self._cancel_duck_timer()
+            self.playback.resume()
+
+    def _cancel_duck_timer(self):
+        if self.duck_task and not self.duck_task.done():
+            self.duck_task.cancel()
+        self.duck_task = None
+
+    async def _send_audio(self, frame):
+        """Send one chunk of ulaw audio to Twilio as an outbound media message."""
+        if not self.first_audio_sent:
+            self._record_first_audio()
+        self._turn_mark('first_frame_sent')
+        FRAMES_SENT.inc()
+        await self.send(text_data=self.frame_encoder.media(frame))
+
+    def _record_first_audio(self):
+        self.first_audio_sent = True
+        elapsed = asyncio.get_running_loop().time() - self.connected_at
+        prepared = 'hit' if self.preanswered else 'miss'
+        PICKUP_TO_FIRST_AUDIO[prepared].observe(elapsed)
+        self.log.info('first_audio', pickup_ms=round(elapsed * 1000), preanswer=prepared)
+        self._log_event('timing', f"pickup_to_first_audio_ms={elapsed * 1000:.0f} preanswer={prepared}")
+
+    async def _send_mark(self, name):
+        """Send a named mark; Twilio echoes it back once playback reaches it."""
+        await self.send(text_data=self.frame_encoder.mark(name))
 
-            # --- INTERRUPTION HANDLING & VAD ---
-            if self.is_ai_speaking:
-                if not is_substantial:
-                    # Ignore background noise (e.g. coughs) while AI is speaking
-                    return
-                else:
-                    # It's substantial! 
-                    if not getattr(self, "interrupted", False): # Only interrupt and clear ONCE per utterance
-                        print(f"[Interrupt] User started speaking: '{sentence}'. Cancelling AI.")
-                        self.interrupted = True
-                        self._cancel_response_task()
-                        await self._clear_twilio_buffer()
-                        
-                        # Clear any existing debounce buffering so old audio doesn't prepend to the new query
-                        self.transcription_buffer = []
-                        if self.llm_debounce_task and not getattr(self.llm_debounce_task, 'done', lambda: True)():
-                            self.llm_debounce_task.cancel()
-                    
-                    # If it's an interim result, we've halted the AI. We now wait for the final transcript.
-                    if not result.is_final:
-                        return
+    # ------------------------------------------------------------------
+    # Turn latency timeline (see calls.turns)
+    # ------------------------------------------------------------------
 
-            # If it's just an interim result (and we aren't interrupting), do nothing.
-            if not result.is_final:
-                return
-                
-            # Ignore empty finals
-            if not sentence:
-                return
-                
-            confidence = result.channel.alternatives[0].confidence or 1.0
-            print(f"User (Final chunk): {sentence} (confidence: {confidence:.2f})")
-            
-            # Fire and forget logging for the chunk
-            asyncio.create_task(self._log_event('transcription_chunk', f"{sentence} [conf={confidence:.2f}]"))
+    async def _run_turn(self, turn, reply):
+        """Answer a turn with the ``reply`` coroutine, then queue the turn's timeline row."""
+        self.turn = turn
+        self.turn_count = turn.index
+        try:
+            await reply
+        except asyncio.CancelledError:
+            turn.interrupted = True
+            raise
+        finally:
+            if self.turn is turn:
+                self.turn = None
+            turn.observe()
+            if self.session:
+                persistence.buffer.add(turn.to_model(self.session, asyncio.get_running_loop().time()))
 
-            self.interrupted = False  # Reset interrupt flag for the new turn
-            self.transcription_buffer.append(sentence)
+    def _turn_mark(self, stage):
+        """Record the first time ``stage`` happens in the current turn (no-op outside turns)."""
+        if self.turn is not None and stage not in self.turn.times:
+            self.turn.mark(stage, asyncio.get_running_loop().time())
 
-            # --- DEBOUNCE LOGIC ---
-            # Wait 0.4 seconds of silence (Deepgram already waited 500ms) before sending.
-            # Total pause time before AI speaks: ~0.9 seconds.
-            if getattr(self, "llm_debounce_task", None) and not self.llm_debounce_task.done():
-                self.llm_debounce_task.cancel()
-            
-            async def _process_user_buffer():
-                try:
-                    await asyncio.sleep(0.4) 
-                except asyncio.CancelledError:
-                    return # A new speech chunk arrived! Leave the buffer alone and exit.
-                    
-                full_sentence = " ".join(self.transcription_buffer).strip()
-                self.transcription_buffer = [] # Clear buffer for next turn
-                
-                if not full_sentence:
-                    return
-                    
-                print(f"User (Full Utterance): {full_sentence}")
-                asyncio.create_task(self._log_event('transcription', full_sentence))
-                asyncio.create_task(self._save_message('user', full_sentence))
-
-                # Check for end-call phrases
-                if END_CALL_PATTERN.search(full_sentence):
-                    goodbye_msg = "Thank you for calling. Goodbye! Have a great day."
-                    asyncio.create_task(self._save_message('assistant', goodbye_msg))
-                    asyncio.create_task(self._log_event('call_ended', 'User said goodbye'))
-                    
-                    async def goodbye_gen(): yield goodbye_msg
-                    self._cancel_response_task()
-                    self.response_task = asyncio.create_task(self._handle_ai_response(goodbye_gen(), [goodbye_msg]))
-                    return
+    # ------------------------------------------------------------------
+    # Deepgram STT
+    # ------------------------------------------------------------------
 
-                # Normal flow: Kick off background task for LLM -> TTS stream
-                self._cancel_response_task() # Safety clear
-                self.response_task = asyncio.create_task(
-                    self._generate_and_speak(full_sentence)
-                )
+    async def _start_deepgram(self):
+        """Initialise Deepgram live transcription."""
 
-            self.llm_debounce_task = asyncio.create_task(_process_user_buffer())
+        async def on_message(self_dg, result, **kwargs):
+            await self._on_transcript(result)
 
-        self.dg_connection.on(LiveTranscriptionEvents.Transcript, on_message)
+        async def on_error(self_dg, error, **kwargs):
+            self.log.error('deepgram_error', str(error))
 
         options = LiveOptions(
             model="nova-2-phonecall", # better model for telephony
@@ -310,11 +688,150 @@ class TwilioMediaConsumer(AsyncWebsocketConsumer):
             smart_format=True,
         )
 
-        if not await self.dg_connection.start(options):
-            print("Failed to start Deepgram")
-            await self._log_event('error', 'Failed to start Deepgram')
+        async def connect():
+            # A fresh connection per attempt; a failed start leaves nothing to reuse
+            connection = deepgram.listen.asyncwebsocket.v("1")
+            connection.on(LiveTranscriptionEvents.Transcript, on_message)
+            connection.on(LiveTranscriptionEvents.Error, on_error)
+            if not await connection.start(options):
+                raise ConnectionError("Deepgram did not start")
+            return connection
+
+        try:
+            self.dg_connection = await breakers.retry(stt_breaker, connect, budget=CONNECT_BUDGET_SECONDS)
+        except Exception as e:
+            self.log.error('deepgram_failed', repr(e))
+            self._log_event('error', f'Failed to start Deepgram: {e!r}')
+            await self._hang_up_unheard()
+            return
+
+        self.stt_queue = AudioSendQueue(
+            self.dg_connection.send,
+            max_frames=STT_QUEUE_MAX_MS // 20,
+            batch_ms=STT_BATCH_MS,
+            policy=STT_QUEUE_POLICY,
+            log=self.log,
+        )
+        self.stt_queue.start()
+
+        self.log.info('deepgram_started')
+
+    async def _on_transcript(self, result):
+        """Handle one Deepgram result (interim or final): echo filter, barge-in, debounce, turn start."""
+        # Sometimes deepgram can emit empty interim transcripts, ignore them
+        if not result.channel.alternatives:
+            return
+
+        if self.recorder is not None:
+            alternative = result.channel.alternatives[0]
+            self.recorder.transcript(alternative.transcript, result.is_final, alternative.confidence)
+
+        sentence = result.channel.alternatives[0].transcript.strip()
+        
+        # Identify if this utterance is substantial enough to be considered a real interruption
+        is_substantial = len(sentence) > 3 or len(sentence.split()) >= 2
+        
+        # --- ANTI-ECHO HALLUCINATION ENGINE ---
+        # If the phone is on speakerphone, Deepgram might transcribe the AI's own voice.
+        # We compare the Deepgram transcript to what the AI is currently speaking.
+        # If it's highly similar, we drop it entirely.
+        if self.is_ai_speaking and self.ai_spoken_buffer:
+            normalized_stt = re.sub(r'[^\w\s]', '', sentence.lower())
+            normalized_ai = re.sub(r'[^\w\s]', '', self.ai_spoken_buffer.lower())
+            # If stt is inside what AI just said, or AI is inside stt, it's an echo.
+            if normalized_stt in normalized_ai or normalized_ai in normalized_stt:
+                self.log.info('echo_dropped', sentence)
+                self._undo_duck("echo")
+                return
+
+        # --- INTERRUPTION HANDLING & VAD ---
+        if self.is_ai_speaking:
+            if not is_substantial:
+                # Ignore background noise (e.g. coughs) while AI is speaking
+                return
+            else:
+                # It's substantial! 
+                if not getattr(self, "interrupted", False): # Only interrupt and clear ONCE per utterance
+                    self.log.info('interrupt', sentence)
+                    self.interrupted = True
+                    self._cancel_response_task()
+                    await self._clear_twilio_buffer()
+                    
+                    # Clear any existing debounce buffering so old audio doesn't prepend to the new query
+                    self.transcription_buffer = []
+                    if self.llm_debounce_task and not getattr(self.llm_debounce_task, 'done', lambda: True)():
+                        self.llm_debounce_task.cancel()
+                
+                # If it's an interim result, we've halted the AI. We now wait for the final transcript.
+                if not result.is_final:
+                    return
+
+        # If it's just an interim result (and we aren't interrupting), do nothing.
+        if not result.is_final:
+            return
+            
+        # Ignore empty finals
+        if not sentence:
+            return
+            
+        confidence = result.channel.alternatives[0].confidence or 1.0
+        self.log.debug('transcript_chunk', sentence, confidence=round(confidence, 2))
+        
+        # Fire and forget logging for the chunk
+        self._log_event('transcription_chunk', f"{sentence} [conf={confidence:.2f}]")
+
+        self.interrupted = False  # Reset interrupt flag for the new turn
+        self.transcription_buffer.append(sentence)
+
+        # The turn's STT stages are those of its last final chunk
+        now = asyncio.get_running_loop().time()
+        if self.next_turn is None:
+            self.next_turn = turns.TurnTimeline(self.turn_count + 1)
+        if self.speech_ended_at is not None and self.speech_ended_at <= now:
+            self.next_turn.mark('user_audio_end', self.speech_ended_at, first=False)
+        self.next_turn.mark('stt_final', now, first=False)
+
+        # --- DEBOUNCE LOGIC ---
+        # Wait 0.4 seconds of silence (Deepgram already waited 500ms) before sending.
+        # Total pause time before AI speaks: ~0.9 seconds.
+        if getattr(self, "llm_debounce_task", None) and not self.llm_debounce_task.done():
+            self.llm_debounce_task.cancel()
+        
+        async def _process_user_buffer():
+            try:
+                await asyncio.sleep(0.4) 
+            except asyncio.CancelledError:
+                return # A new speech chunk arrived! Leave the buffer alone and exit.
+                
+            full_sentence = " ".join(self.transcription_buffer).strip()
+            self.transcription_buffer = [] # Clear buffer for next turn
+            turn, self.next_turn = self.next_turn, None
+            
+            if not full_sentence or turn is None:
+                return
+            turn.mark('debounce_fired', asyncio.get_running_loop().time())
+                
+            self.log.info('user_utterance', full_sentence)
+            self._log_event('transcription', full_sentence)
+            self._save_message('user', full_sentence)
+
+            # Check for end-call phrases
+            if END_CALL_PATTERN.search(full_sentence):
+                goodbye_msg = GOODBYE_TEXT
+                self._save_message('assistant', goodbye_msg)
+                self._log_event('call_ended', 'User said goodbye')
+                
+                self._cancel_response_task()
+                self.response_task = asyncio.create_task(self._run_turn(turn, self._speak_phrase(goodbye_msg)))
+                return
+
+            # Normal flow: Kick off background task for LLM -> TTS stream
+            self._cancel_response_task() # Safety clear
+            self.response_task = asyncio.create_task(
+                self._run_turn(turn, self._generate_and_speak(full_sentence))
+            )
 
-        print("Deepgram started.")
+        self.llm_debounce_task = asyncio.create_task(_process_user_buffer())
 
     # ------------------------------------------------------------------
     # Core Pipeline: LLM -> TTS
@@ -322,159 +839,208 @@ class TwilioMediaConsumer(AsyncWebsocketConsumer):
 
     async def _generate_and_speak(self, user_text):
         """Main orchestrator for a single conversation turn."""
-        self.messages.append({"role": "user", "content": user_text})
+        # The caller can speak before start-up has built the system prompt
+        await self.prompt_ready.wait()
+        self.memory.add("user", user_text)
         
-        # We need a queue to pass words from Groq chunks to ElevenLabs
+        # We need a queue to pass words from LLM chunks to ElevenLabs
         # ElevenLabs accepts an AsyncIterator[str].
         
         full_response_parts = []
+        spoken_parts = []    # What was handed to TTS, for cutting an interrupted reply
+        stream = None
         
         async def llm_stream_generator():
             try:
-                stream = await groq_client.chat.completions.create(
-                    model="llama-3.1-8b-instant",
-                    messages=self.messages,
-                    temperature=0.6,
-                    max_tokens=150,
-                    stream=True
+                segmenter = SentenceSegmenter(
+                    min_chars=SEGMENT_MIN_CHARS,
+                    max_chars=SEGMENT_MAX_CHARS,
+                    first_clause_words=SEGMENT_FIRST_CLAUSE_WORDS,
                 )
-                buffer = ""
-                async for chunk in stream:
+                async for content in stream:
                     # Defensive check: if task was cancelled or call ended, yield nothing more
                     if self.interrupted or not self.call_active:
-                        print("LLM generation interrupted inside generator.")
+                        self.log.debug('llm_interrupted')
                         break
                         
-                    content = chunk.choices[0].delta.content
                     if content:
+                        if self.recorder is not None:
+                            self.recorder.llm_token(content)
                         full_response_parts.append(content)
-                        buffer += content
                         self.ai_spoken_buffer += content # Track exactly what is going outward
                         
-                        # Semantic Chunking: Yield to ElevenLabs only when a grammatical phrase completes
-                        if any(punct in buffer for punct in ['.', '!', '?', ':', '\n']):
-                            # Find the latest occurring terminal punctuation
-                            last_punct_idx = max(buffer.rfind(p) for p in ['.', '!', '?', ':', '\n'])
-                            chunk_to_yield = buffer[:last_punct_idx+1]
-                            buffer = buffer[last_punct_idx+1:]
-                            yield chunk_to_yield + " " # Yield complete sentence with space padding
+                        # Semantic Chunking: Yield to ElevenLabs only when a sentence (or the opening clause) completes
+                        for segment in segmenter.push(content):
+                            spoken_parts.append(segment + " ")
+                            yield segment + " " # Yield complete sentence with space padding
                             
                 # Flush remaining buffer at the end of the stream
-                if buffer.strip():
-                    yield buffer + " "
+                tail = segmenter.flush()
+                if tail:
+                    spoken_parts.append(tail + " ")
+                    yield tail + " "
                         
             except asyncio.CancelledError:
-                print("LLM stream forcefully cancelled.")
+                self.log.debug('llm_cancelled')
                 raise
             except Exception as e:
-                print(f"Groq stream error: {e}")
-                error_msg = "Sorry, I'm having trouble thinking."
+                self.log.error('llm_stream_error', repr(e))
+                if self.recorder is not None:
+                    self.recorder.llm_error(e)
+                error_msg = LLM_ERROR_TEXT
                 full_response_parts.append(error_msg)
+                spoken_parts.append(error_msg)
                 yield error_msg
 
         # Hand off the generator to the speaker task
         try:
-            await self._handle_ai_response(llm_stream_generator(), full_response_parts)
+            try:
+                # Waits for the first token, hedging to the backup provider if it is slow
+                self._turn_mark('llm_request')
+                if self.recorder is not None:
+                    self.recorder.llm_request()
+                stream = await self.llm.open(self.memory.messages(), temperature=0.6, max_tokens=150)
+                self._turn_mark('llm_first_token')
+                if self.recorder is not None:
+                    self.recorder.llm_first()
+            except Exception as e:
+                self.log.error('llm_request_error', repr(e))
+                if self.recorder is not None:
+                    self.recorder.llm_error(e)
+
+            if stream is None:
+                # The LLM request failed outright — apologise with the cached phrase
+                full_response_parts.append(LLM_ERROR_TEXT)
+                spoken_parts.append(LLM_ERROR_TEXT)
+                await self._speak_phrase(LLM_ERROR_TEXT)
+            else:
+                await self._handle_ai_response(llm_stream_generator(), full_response_parts)
         except asyncio.CancelledError:
-            print("_generate_and_speak cancelled.")
+            self.log.debug('reply_cancelled')
         finally:
-            # Once speaking finishes (or is cancelled), save what we *actually* generated
-            final_ai_text = "".join(full_response_parts).strip()
+            if stream is not None:
+                await stream.close()
+            # Once speaking finishes (or is cancelled), save only what the caller actually heard
+            final_ai_text = self.playback.heard_text("".join(full_response_parts).strip(),
+                                                     spoken="".join(spoken_parts).strip())
             if final_ai_text:
-                self.messages.append({"role": "assistant", "content": final_ai_text})
-                print(f"AI: {final_ai_text}")
-                asyncio.create_task(self._log_event('ai_response', final_ai_text))
-                asyncio.create_task(self._save_message('assistant', final_ai_text))
+                self.memory.add("assistant", final_ai_text)
+                self.log.info('ai_reply', final_ai_text)
+                self._log_event('ai_response', final_ai_text)
+                self._save_message('assistant', final_ai_text)
+
+
+    async def _speak_phrase(self, text, audio=None):
+        """
+        Speak one phrase: ``audio`` if it was synthesized ahead of time, else from the
+        TTS cache for fixed phrases, else through live TTS.
+        """
+        async def phrase_gen():
+            yield text
 
+        cache_text = text if text in CACHED_PHRASES else None
+        await self._handle_ai_response(phrase_gen(), [text], cache_text=cache_text, audio=audio)
 
-    async def _handle_ai_response(self, text_iterator, full_text_ref):
+    async def _handle_ai_response(self, text_iterator, full_text_ref, cache_text=None, audio=None):
         """
         Consumes an async generator of text chunks, feeds it into ElevenLabs TTS,
         and streams the resulting audio back to Twilio.
+
+        With ``cache_text`` (the whole text ``text_iterator`` will produce) the
+        audio is played from the TTS cache on a hit, and cached on a miss.
+        Pre-rendered ``audio`` is played as-is.
         """
         if not self.stream_sid or not self.call_active:
             return
 
         self.is_ai_speaking = True
         self.interrupted = False
+        self.playback.start()
         
         # We need the full text for fallback purposes
         full_text = ""
 
         try:
-            # Generate audio incrementally as text arrives — ulaw_8000 is Twilio-compatible
-            audio_generator = el_client.text_to_speech.convert_as_stream(
-                voice_id=ELEVENLABS_VOICE_ID,
-                text=text_iterator, 
-                model_id=ELEVENLABS_MODEL,
-                output_format="ulaw_8000",
-                optimize_streaming_latency=3, # Critical parameter for 10/10 responsiveness
-            )
+            cache_key = tts_cache_key(cache_text) if cache_text else None
+            cached = audio
+            if cached is None and cache_key:
+                cached = tts_cache.get(cache_key)
+            if cached is not None:
+                self._turn_mark('tts_first_byte')
+                if self.recorder is not None:
+                    self.recorder.tts_start()
+                    self.recorder.tts_audio(len(cached))
+                await self.playback.write(cached)
+                await self._finish_playback()
+                return
 
-            CHUNK_SIZE = 4000  # Send ~0.5s chunks to minimise latency and buffer build-up
-            audio_buffer = b""
+            # An open circuit skips ElevenLabs entirely and goes straight to the fallback
+            tts_breaker.check()
 
-            async for chunk in audio_generator:
-                if self.interrupted or not self.call_active:
-                    print("TTS playback interrupted midway.")
-                    break
-                    
-                audio_buffer += chunk
-                
-                # Send to Twilio in small pieces as they arrive
-                while len(audio_buffer) >= CHUNK_SIZE:
-                    send_chunk = audio_buffer[:CHUNK_SIZE]
-                    audio_buffer = audio_buffer[CHUNK_SIZE:]
-                    
-                    b64_audio = base64.b64encode(send_chunk).decode('utf-8')
-                    media_payload = {
-                        "event": "media",
-                        "streamSid": self.stream_sid,
-                        "media": {
-                            "payload": b64_audio,
-                            "track": "outbound"
-                        }
-                    }
-                    if not self.interrupted and self.call_active:
-                        await self.send(text_data=json.dumps(media_payload))
-            
-            # Flush any remaining audio in the buffer
-            if audio_buffer and not self.interrupted and self.call_active:
-                b64_audio = base64.b64encode(audio_buffer).decode('utf-8')
-                media_payload = {
-                    "event": "media",
-                    "streamSid": self.stream_sid,
-                    "media": {
-                        "payload": b64_audio,
-                        "track": "outbound"
-                    }
-                }
-                await self.send(text_data=json.dumps(media_payload))
-                
-            # Send a mark event so we know when audio has finished playing on the phone
-            if not self.interrupted and self.call_active:
-                mark_payload = {
-                    "event": "mark",
-                    "streamSid": self.stream_sid,
-                    "mark": {"name": "ai_finished_speaking"}
-                }
-                await self.send(text_data=json.dumps(mark_payload))
+            # Generate audio incrementally as text arrives — converted to Twilio's ulaw_8000 if needed
+            transcoder = TTSTranscoder(ELEVENLABS_OUTPUT_FORMAT)
+            captured = bytearray() if cache_key else None
+            if self.recorder is not None:
+                self.recorder.tts_start()
+                text_iterator = self.recorder.tts_text(text_iterator)
+            audio_generator = self.tts.stream(text_iterator)
+            got_audio = False
+
+            try:
+                async for chunk in audio_generator:
+                    if self.interrupted or not self.call_active:
+                        self.log.debug('tts_interrupted')
+                        self.tts.cancel()
+                        break
+
+                    # Paced send to Twilio — returns once the frames fit in the lookahead window
+                    if not got_audio:
+                        self._turn_mark('tts_first_byte')
+                    got_audio = True
+                    audio = transcoder.process(chunk)
+                    if self.recorder is not None and audio:
+                        self.recorder.tts_audio(len(audio))
+                    if captured is not None:
+                        captured += audio
+                    await self.playback.write(audio)
+            except asyncio.CancelledError:
+                tts_breaker.release()
+                raise
+            except Exception as e:
+                tts_breaker.record_failure(e)
+                raise
+            if got_audio:
+                tts_breaker.record_success()
+            else:
+                tts_breaker.release()  # Interrupted before any audio: no verdict on ElevenLabs
+
+            # Only a phrase synthesized start to finish goes into the cache
+            if captured and not self.interrupted and self.call_active:
+                tts_cache.put(cache_key, captured)
+
+            await self._finish_playback()
 
         except asyncio.CancelledError:
-            print("_handle_ai_response task cancelled.")
+            self.log.debug('playback_cancelled')
             raise
         except Exception as e:
-            print(f"ElevenLabs TTS Error: {e}")
-            await self._log_event('error', f"ElevenLabs error. Initiating Twilio Fallback. Error: {e}")
+            if isinstance(e, breakers.CircuitOpenError):
+                self.log.warning('tts_circuit_open', "Using the Twilio fallback")
+                self._log_event('error', "ElevenLabs circuit open. Initiating Twilio Fallback.")
+                # Nothing has read the text yet; collect all of it for <Say>
+                try:
+                    async for _ in text_iterator:
+                        pass
+                except Exception as drain_err:
+                    self.log.warning('reply_drain_failed', repr(drain_err))
+            else:
+                self.log.error('tts_error', repr(e))
+                self._log_event('error', f"ElevenLabs error. Initiating Twilio Fallback. Error: {e}")
             
             # Fallback to Twilio's standard <Say> voice if ElevenLabs fails
             full_text = "".join(full_text_ref).strip()
             if full_text and self.call_active and self.call_sid:
                 try:
-                    from twilio.rest import Client
-                    client = Client(os.environ['TWILIO_ACCOUNT_SID'], os.environ['TWILIO_AUTH_TOKEN'])
-                    
-                    # We can't send TwiML over the media socket, so we modify the live call
                     # We use <Say> and then <Connect><Stream> to rejoin the websocket
                     domain = os.environ.get('DOMAIN')
                     fallback_twiml = f'''
@@ -485,14 +1051,47 @@ class TwilioMediaConsumer(AsyncWebsocketConsumer):
                         </Connect>
                     </Response>
                     '''
-                    await sync_to_async(client.calls)(self.call_sid).update(twiml=fallback_twiml)
-                    print("Successfully injected Twilio <Say> fallback.")
+                    await self._update_call(fallback_twiml)
+                    self.log.info('twilio_fallback', "Injected Twilio <Say> fallback")
                 except Exception as fallback_err:
-                    print(f"Twilio fallback also failed: {fallback_err}")
+                    self.log.error('twilio_fallback_failed', repr(fallback_err))
             
         finally:
             self.is_ai_speaking = False
 
+    async def _update_call(self, twiml):
+        """Replace the live call's TwiML: we can't send TwiML over the media socket."""
+        from twilio.rest import Client
+        client = Client(os.environ['TWILIO_ACCOUNT_SID'], os.environ['TWILIO_AUTH_TOKEN'],
+                        http_client=http.twilio_http_client())
+        # Updating a call to the same TwiML is idempotent, so it may be retried
+        update = sync_to_async(client.calls(self.call_sid).update)
+        await breakers.retry(twilio_breaker, lambda: update(twiml=twiml), budget=FALLBACK_BUDGET_SECONDS)
+
+    async def _hang_up_unheard(self):
+        """
+        Without transcription the caller would be talking to a bot that can't hear
+        them: have Twilio apologize and end the call (this ends the media stream too).
+        """
+        if not (self.call_active and self.call_sid):
+            return
+        try:
+            await self._update_call(
+                f'<Response><Say voice="Polly.Joanna-Neural">{STT_UNAVAILABLE_TEXT}</Say><Hangup/></Response>')
+            self.log.warning('stt_unavailable_hangup', "Ended the call: the caller can't be heard")
+            self._log_event('call_ended', "Transcription unavailable; Twilio apologized and hung up.")
+        except Exception as e:
+            self.log.error('stt_unavailable_hangup_failed', repr(e))
+
+    async def _finish_playback(self):
+        """
+        Flush the trailing frame and send the end-of-reply mark, then stay "speaking"
+        until Twilio confirms playback so a late barge-in still truncates the reply.
+        """
+        if not self.interrupted and self.call_active:
+            await self.playback.finish()
+            await self.playback.wait_played(PLAYBACK_LOOKAHEAD_MS / 1000 + 1.0)
+
     # ------------------------------------------------------------------
     # External Context API
     # ------------------------------------------------------------------
@@ -503,39 +1102,33 @@ class TwilioMediaConsumer(AsyncWebsocketConsumer):
             return
 
         try:
-            headers = self.session.context_headers or {}
-            async with aiohttp.ClientSession() as http_session:
-                async with http_session.get(
-                    self.session.context_url,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=5)
-                ) as resp:
-                    if resp.status == 200:
-                        context_data = await resp.json()
-                        await self._save_context_data(context_data)
-                        await self._log_event('context_fetched', json.dumps(context_data)[:500])
-                        print(f"Context fetched from {self.session.context_url}")
-                    else:
-                        await self._log_event('error', f"Context API returned {resp.status}")
+            # Usually already cached: the view prefetches it when the call is created
+            context_data = await context.cache.get(self.session.context_url, self.session.context_headers)
+            await self._save_context_data(context_data)
+            self._log_event('context_fetched', json.dumps(context_data)[:500])
+            self.log.info('context_fetched', self.session.context_url)
+        except context.ContextError as e:
+            self._log_event('error', str(e))
         except Exception as e:
-            print(f"Context fetch error: {e}")
-            await self._log_event('error', f"Context fetch error: {e}")
+            self.log.warning('context_error', repr(e))
+            self._log_event('error', f"Context fetch error: {e}")
 
     # ------------------------------------------------------------------
-    # Database helpers (all use sync_to_async for ORM access)
+    # Database helpers (ORM access goes through the DB pool or the write-behind buffer)
     # ------------------------------------------------------------------
 
     async def _load_session(self):
         """Load CallSession by call_sid (created when make_call was called)."""
         from calls.models import CallSession
         try:
-            self.session = await sync_to_async(CallSession.objects.get)(call_sid=self.call_sid)
+            self.session = await db.run(CallSession.objects.get, call_sid=self.call_sid)
             self.session.stream_sid = self.stream_sid
             self.session.status = 'in_progress'
-            await sync_to_async(self.session.save)()
+            await db.run(self.session.save)
         except CallSession.DoesNotExist:
             # Inbound calls won't have a session yet — create one
-            self.session = await sync_to_async(CallSession.objects.create)(
+            self.session = await db.run(
+                CallSession.objects.create,
                 call_sid=self.call_sid or f"unknown-{self.stream_sid}",
                 stream_sid=self.stream_sid,
                 from_number='unknown',
@@ -543,31 +1136,38 @@ class TwilioMediaConsumer(AsyncWebsocketConsumer):
                 status='in_progress',
             )
 
-    async def _save_message(self, role, content):
+    def _save_message(self, role, content):
+        """Queue a transcript row; written in the next batch (see calls.persistence)."""
         if not self.session:
             return
         from calls.models import ConversationMessage
-        await sync_to_async(ConversationMessage.objects.create)(
-            session=self.session,
-            role=role,
-            content=content,
-        )
+        persistence.buffer.add(ConversationMessage(session=self.session, role=role, content=content))
 
-    async def _log_event(self, event_type, detail=''):
+    def _log_event(self, event_type, detail=''):
+        """Queue an event row; written in the next batch (see calls.persistence)."""
         if not self.session:
             return
         from calls.models import CallEvent
-        await sync_to_async(CallEvent.objects.create)(
-            session=self.session,
-            event_type=event_type,
-            detail=detail,
-        )
+        persistence.buffer.add(CallEvent(session=self.session, event_type=event_type, detail=detail))
 
     async def _save_context_data(self, context_data):
         if not self.session:
             return
         self.session.context_data = context_data
-        await sync_to_async(self.session.save)(update_fields=['context_data'])
+        await db.run(self.session.save, update_fields=['context_data'])
+
+    async def _save_recording(self):
+        try:
+            path = await self.recorder.save(
+                self.call_sid or self.stream_sid or f"call-{int(self.recorder.started_wall)}",
+                call_sid=self.call_sid,
+                stream_sid=self.stream_sid,
+                output_format=ELEVENLABS_OUTPUT_FORMAT,
+                playback_frame_ms=PLAYBACK_FRAME_MS,
+            )
+            self.log.info('call_recorded', path, truncated=self.recorder.truncated)
+        except Exception as e:
+            self.log.error('recording_failed', repr(e))
 
     async def _update_session_ended(self):
         from calls.models import CallSession
@@ -577,8 +1177,8 @@ class TwilioMediaConsumer(AsyncWebsocketConsumer):
             if self.session.started_at:
                 delta = self.session.ended_at - self.session.started_at
                 self.session.duration_seconds = int(delta.total_seconds())
-            await sync_to_async(self.session.save)()
+            await db.run(self.session.save)
         except Exception as e:
-            print(f"Error updating session: {e}")
+            self.log.error('session_update_failed', repr(e))
 
 
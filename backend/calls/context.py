@@ -0,0 +1,160 @@
+"""
+Caller context lookups (``CallSession.context_url``), cached.
+
+A session's ``context_url`` usually points at a CRM record, and the same
+record is fetched again for every repeat caller and every retried call.
+``ContextCache`` sits in front of those fetches:
+
+- results are kept for ``CONTEXT_CACHE_TTL_SECONDS``, keyed on the URL and a
+  hash of the request headers (headers can carry auth that changes the
+  answer), in an LRU of at most ``CONTEXT_CACHE_MAX_ENTRIES``
+- concurrent lookups of the same key share one request
+- responses larger than ``CONTEXT_MAX_BYTES`` are refused
+
+Views call ``prefetch()`` as soon as a call is created, so by the time the
+media stream starts the consumer finds the context already cached. Failed
+fetches are not cached.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+import aiohttp
+
+from calls import http, metrics, warmup
+
+# How long a fetched context is reused
+CONTEXT_CACHE_TTL_SECONDS = int(os.environ.get("CONTEXT_CACHE_TTL_SECONDS", "300"))
+
+# Max distinct (URL, headers) results kept in memory
+CONTEXT_CACHE_MAX_ENTRIES = int(os.environ.get("CONTEXT_CACHE_MAX_ENTRIES", "256"))
+
+# Largest context response accepted, in bytes
+CONTEXT_MAX_BYTES = int(os.environ.get("CONTEXT_MAX_BYTES", str(256 * 1024)))
+
+CONTEXT_TIMEOUT_SECONDS = 5
+
+LOOKUPS = {
+    result: metrics.counter('context_cache_lookups_total', 'Caller context lookups', {'result': result})
+    for result in ('hit', 'miss', 'coalesced')
+}
+FETCH_SECONDS = metrics.histogram('context_fetch_seconds', 'Context API request time, cache misses only')
+HIT_RATIO = metrics.gauge('context_cache_hit_ratio', 'Share of context lookups that did not fetch (hit or coalesced)')
+
+
+@metrics.on_collect
+def report_hit_ratio():
+    total = sum(counter.value for counter in LOOKUPS.values())
+    if total:
+        HIT_RATIO.set(round((total - LOOKUPS['miss'].value) / total, 4))
+
+
+class ContextError(Exception):
+    """The context API could not be used (bad status, oversized or invalid body, network)."""
+
+
+class ContextCache:
+    """TTL + LRU cache of context API responses with in-flight request sharing."""
+
+    def __init__(self, ttl=CONTEXT_CACHE_TTL_SECONDS, max_entries=CONTEXT_CACHE_MAX_ENTRIES,
+                 max_bytes=CONTEXT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, data), least recently used first
+        self._inflight = {}            # key -> asyncio.Task
+
+    @staticmethod
+    def key(url, headers):
+        digest = hashlib.sha256(json.dumps(headers or {}, sort_keys=True).encode()).hexdigest()
+        return (url, digest)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def peek(self, url, headers=None):
+        """The cached context if it is still fresh, else None. Not counted as a lookup."""
+        entry = self._entries.get(self.key(url, headers))
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    async def get(self, url, headers=None):
+        """Context for ``url``, from cache or fetched. Raises ``ContextError``."""
+        key = self.key(url, headers)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                LOOKUPS['hit'].inc()
+                return entry[1]
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            LOOKUPS['coalesced'].inc()
+        else:
+            LOOKUPS['miss'].inc()
+            task = asyncio.ensure_future(self._fetch(url, headers))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # One caller giving up (call hung up) must not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, task.result())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _fetch(self, url, headers):
+        started = time.perf_counter()
+        try:
+            async with http.aiohttp_session().get(
+                url,
+                headers=headers or {},
+                timeout=aiohttp.ClientTimeout(total=CONTEXT_TIMEOUT_SECONDS),
+            ) as resp:
+                if resp.status != 200:
+                    raise ContextError(f"Context API returned {resp.status}")
+                if (resp.content_length or 0) > self.max_bytes:
+                    raise ContextError(f"Context API response too large ({resp.content_length} bytes)")
+                body = bytearray()
+                async for chunk in resp.content.iter_chunked(64 * 1024):
+                    body += chunk
+                    if len(body) > self.max_bytes:
+                        raise ContextError(f"Context API response larger than {self.max_bytes} bytes")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ContextError(f"Context fetch error: {e!r}") from e
+        finally:
+            FETCH_SECONDS.observe(time.perf_counter() - started)
+
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise ContextError(f"Context API returned invalid JSON: {e}") from e
+
+
+cache = ContextCache()
+
+
+def prefetch(url, headers=None):
+    """
+    Start fetching ``url`` into the cache from sync code (a view) and return
+    immediately. Returns False if there is nothing to fetch or no server loop.
+    """
+    if not url:
+        return False
+    future = warmup.submit(cache.get(url, headers))
+    if future is None:
+        return False
+    # The consumer reports failures when it looks the context up again
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    return True
@@ -0,0 +1,82 @@
+"""
+Dedicated thread pool for the ORM work of live calls.
+
+``sync_to_async`` defaults to ``thread_sensitive=True``, which runs every
+ORM call in the process on one shared thread: with many calls up, a
+session load for a call that just connected waits behind every other
+call's inserts. ``run()`` sends ORM work to a bounded pool of
+``DB_EXECUTOR_THREADS`` workers instead.
+
+Each worker keeps its own database connection open between operations for
+``DB_CONN_MAX_AGE`` seconds, so the pool doubles as the connection pool: at
+most ``DB_EXECUTOR_THREADS`` connections, each reused until it expires or
+fails a health check (``CONN_HEALTH_CHECKS``). The global ``CONN_MAX_AGE``
+stays 0: Daphne runs each HTTP request on a thread of its own that is
+discarded afterwards, so a connection kept open there would leak. SQLite
+allows one writer at a time, so there the pool defaults to a single thread.
+
+Usage::
+
+    session = await db.run(CallSession.objects.get, call_sid=sid)
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+from calls import metrics
+
+
+def _default_threads():
+    engine = settings.DATABASES['default']['ENGINE']
+    return 1 if engine.endswith('sqlite3') else 16
+
+
+# Worker threads (and so pooled connections) for call ORM work; 0 picks 1 on SQLite, 16 otherwise
+DB_EXECUTOR_THREADS = int(os.environ.get("DB_EXECUTOR_THREADS", "0")) or _default_threads()
+
+# Seconds a worker keeps its connection open for reuse
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "600"))
+
+QUEUE_SECONDS = metrics.histogram('db_queue_seconds', 'Time an ORM operation waited for a DB worker thread')
+RUN_SECONDS = metrics.histogram('db_run_seconds', 'Time an ORM operation ran on its DB worker thread')
+
+
+
+def _keep_connection():
+    # Connection wrappers are per thread: this worker's own copy of the settings
+    # keeps its connection open, without touching CONN_MAX_AGE for other threads
+    conn = connections[DEFAULT_DB_ALIAS]
+    conn.settings_dict = {**conn.settings_dict, 'CONN_MAX_AGE': DB_CONN_MAX_AGE}
+
+
+executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_THREADS, thread_name_prefix='db', initializer=_keep_connection)
+
+
+async def run(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` on the DB pool and return its result."""
+    submitted = time.perf_counter()
+    started = finished = None
+
+    def call():
+        nonlocal started, finished
+        started = time.perf_counter()
+        try:
+            # Per-operation equivalent of Django's per-request cleanup: drop the
+            # connection if it is past DB_CONN_MAX_AGE or broken, re-check health on next use
+            close_old_connections()
+            return func(*args, **kwargs)
+        finally:
+            finished = time.perf_counter()
+
+    try:
+        return await sync_to_async(call, thread_sensitive=False, executor=executor)()
+    finally:
+        # Observed here, on the loop, rather than from the worker threads
+        if started is not None:
+            QUEUE_SECONDS.observe(started - submitted)
+            RUN_SECONDS.observe(finished - started)
@@ -0,0 +1,276 @@
+"""
+Shared HTTP connection pools for every provider.
+
+Opening a TLS connection to a provider costs one or two round trips before
+the first byte of a request goes out, and a fresh ``ClientSession`` or SDK
+client per call pays it every time. This module keeps one long-lived pool
+per HTTP stack in the process and hands it to every caller:
+
+- ``aiohttp_session()``: aiohttp, for our own requests (context API, ...)
+- ``websocket_session()``: aiohttp, for websockets held open for a whole
+  call (ElevenLabs). These never return to a pool, so they get a session
+  of their own without a connection cap; in the shared one every open
+  call would hold a per-host slot and call ``HTTP_POOL_PER_HOST + 1``
+  would wait for a hangup
+- ``async_httpx()`` / ``sync_httpx()``: httpx, passed to the Groq and
+  ElevenLabs SDK clients
+- ``twilio_http_client()``: the Twilio SDK's requests-based client
+
+All pools keep connections alive between requests, cap connections per
+host and (aiohttp) cache DNS lookups. ``warm_up`` runs at server start-up
+and opens a connection to each provider so the first call doesn't pay for
+it. Every request records whether it reused a pooled connection or had to
+open one, and how long opening took.
+"""
+
+import asyncio
+import os
+import time
+
+import aiohttp
+import httpx
+from asgiref.sync import sync_to_async
+
+from calls import calllog, metrics, warmup
+
+# Pool sizing — total connections, connections per provider host, idle keep-alive
+HTTP_POOL_MAX = int(os.environ.get("HTTP_POOL_MAX", "100"))
+HTTP_POOL_PER_HOST = int(os.environ.get("HTTP_POOL_PER_HOST", "20"))
+HTTP_KEEPALIVE_SECONDS = int(os.environ.get("HTTP_KEEPALIVE_SECONDS", "60"))
+DNS_CACHE_SECONDS = 300
+
+# Opened at start-up. Any response (even 401/404) leaves a warm connection in the pool
+WARMUP_URLS = {
+    'groq': 'https://api.groq.com/',
+    'elevenlabs': 'https://api.elevenlabs.io/',
+    'deepgram': 'https://api.deepgram.com/',
+    'twilio': 'https://api.twilio.com/',
+}
+
+process_log = calllog.CallLogger(sampled=False)
+
+REQUESTS = {
+    (client, result): metrics.counter('http_pool_requests_total', 'Outbound HTTP requests by connection pool outcome',
+                                      {'client': client, 'result': result})
+    for client in ('aiohttp', 'httpx') for result in ('reused', 'new')
+}
+CONNECT_SECONDS = {
+    client: metrics.histogram('http_connect_seconds', 'Time to open a new pooled connection (TCP + TLS)', {'client': client})
+    for client in ('aiohttp', 'httpx')
+}
+
+_aiohttp = None
+_websockets = None
+_async_httpx = None
+_sync_httpx = None
+_twilio = None
+
+
+# ------------------------------------------------------------------
+# aiohttp
+# ------------------------------------------------------------------
+
+def _aiohttp_trace_config():
+    async def on_request_start(session, ctx, params):
+        ctx.new_connection = False
+
+    async def on_connection_create_start(session, ctx, params):
+        ctx.new_connection = True
+        ctx.connect_started = time.perf_counter()
+
+    async def on_connection_create_end(session, ctx, params):
+        CONNECT_SECONDS['aiohttp'].observe(time.perf_counter() - ctx.connect_started)
+
+    async def on_request_end(session, ctx, params):
+        REQUESTS['aiohttp', 'new' if ctx.new_connection else 'reused'].inc()
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_request_start)
+    config.on_connection_create_start.append(on_connection_create_start)
+    config.on_connection_create_end.append(on_connection_create_end)
+    config.on_request_end.append(on_request_end)
+    return config
+
+
+def _retire(session):
+    """Close a session made on another event loop before it is replaced."""
+    if session is None or session.closed:
+        return
+    if session._loop.is_running():
+        asyncio.run_coroutine_threadsafe(session.close(), session._loop)
+    else:
+        # Its connections went with its loop: closing only marks it closed
+        asyncio.ensure_future(_close_quietly(session))
+
+
+async def _close_quietly(session):
+    try:
+        await session.close()
+    except Exception:
+        pass
+
+
+def aiohttp_session():
+    """The process-wide aiohttp session (created on first use, on the running loop)."""
+    global _aiohttp
+    loop = asyncio.get_running_loop()
+    if _aiohttp is None or _aiohttp.closed or _aiohttp._loop is not loop:
+        _retire(_aiohttp)
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_MAX,
+            limit_per_host=HTTP_POOL_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_SECONDS,
+            keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+        )
+        _aiohttp = aiohttp.ClientSession(connector=connector, trace_configs=[_aiohttp_trace_config()])
+    return _aiohttp
+
+
+def websocket_session():
+    """The process-wide aiohttp session for call-long websockets: no connection cap."""
+    global _websockets
+    loop = asyncio.get_running_loop()
+    if _websockets is None or _websockets.closed or _websockets._loop is not loop:
+        _retire(_websockets)
+        connector = aiohttp.TCPConnector(limit=0, ttl_dns_cache=DNS_CACHE_SECONDS)
+        _websockets = aiohttp.ClientSession(connector=connector)
+    return _websockets
+
+
+# ------------------------------------------------------------------
+# httpx (Groq, ElevenLabs SDKs)
+# ------------------------------------------------------------------
+
+class _Trace:
+    """httpcore trace hook: notes whether a request opened a connection and how long it took."""
+
+    def __init__(self):
+        self.connect_started = None
+        self.connect_seconds = None
+
+    def event(self, name):
+        if name == 'connection.connect_tcp.started':
+            self.connect_started = time.perf_counter()
+        elif name in ('connection.connect_tcp.complete', 'connection.start_tls.complete') and self.connect_started:
+            self.connect_seconds = time.perf_counter() - self.connect_started
+
+    def record(self):
+        new = self.connect_started is not None
+        REQUESTS['httpx', 'new' if new else 'reused'].inc()
+        if self.connect_seconds is not None:
+            CONNECT_SECONDS['httpx'].observe(self.connect_seconds)
+
+
+class _TracingAsyncTransport(httpx.AsyncHTTPTransport):
+
+    async def handle_async_request(self, request):
+        trace = _Trace()
+
+        async def hook(name, info):
+            trace.event(name)
+
+        request.extensions['trace'] = hook
+        response = await super().handle_async_request(request)
+        trace.record()
+        return response
+
+
+class _TracingTransport(httpx.HTTPTransport):
+
+    def handle_request(self, request):
+        trace = _Trace()
+        request.extensions['trace'] = lambda name, info: trace.event(name)
+        response = super().handle_request(request)
+        trace.record()
+        return response
+
+
+def _httpx_limits():
+    return httpx.Limits(
+        max_connections=HTTP_POOL_MAX,
+        max_keepalive_connections=HTTP_POOL_PER_HOST,
+        keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+    )
+
+
+def async_httpx():
+    """Shared ``httpx.AsyncClient`` for async SDK clients (``http_client=`` / ``httpx_client=``)."""
+    global _async_httpx
+    if _async_httpx is None:
+        _async_httpx = httpx.AsyncClient(
+            transport=_TracingAsyncTransport(limits=_httpx_limits()),
+            timeout=httpx.Timeout(60, connect=5),
+            follow_redirects=True,
+        )
+    return _async_httpx
+
+
+def sync_httpx():
+    """Shared ``httpx.Client`` for sync SDK clients used from DRF views."""
+    global _sync_httpx
+    if _sync_httpx is None:
+        _sync_httpx = httpx.Client(
+            transport=_TracingTransport(limits=_httpx_limits()),
+            timeout=httpx.Timeout(60, connect=5),
+            follow_redirects=True,
+        )
+    return _sync_httpx
+
+
+# ------------------------------------------------------------------
+# Twilio
+# ------------------------------------------------------------------
+
+def twilio_http_client():
+    """Shared Twilio HTTP client; its requests session keeps connections to api.twilio.com alive."""
+    global _twilio
+    if _twilio is None:
+        from twilio.http.http_client import TwilioHttpClient
+        _twilio = TwilioHttpClient(pool_connections=True, timeout=10)
+    return _twilio
+
+
+# ------------------------------------------------------------------
+# Start-up warm-up
+# ------------------------------------------------------------------
+
+async def _aiohttp_head(url):
+    async with aiohttp_session().head(url) as resp:
+        await resp.release()
+
+
+async def _warm(name, open_connection):
+    started = time.perf_counter()
+    try:
+        await open_connection()
+        process_log.info('http_warmed', name, ms=round((time.perf_counter() - started) * 1000))
+    except Exception as e:
+        process_log.warning('http_warmup_failed', repr(e), host=name)
+
+
+@warmup.on_startup
+async def warm_up():
+    """Open one pooled connection to every provider before the first call needs it."""
+    await asyncio.gather(
+        _warm('groq', lambda: async_httpx().head(WARMUP_URLS['groq'])),
+        _warm('elevenlabs', lambda: async_httpx().head(WARMUP_URLS['elevenlabs'])),
+        # The live STT socket is opened by the Deepgram SDK itself; this warms DNS
+        # and keeps a connection ready for REST calls
+        _warm('deepgram', lambda: _aiohttp_head(WARMUP_URLS['deepgram'])),
+        _warm('twilio', lambda: sync_to_async(twilio_http_client().session.head, thread_sensitive=False)(
+            WARMUP_URLS['twilio'], timeout=10)),
+    )
+
+
+@warmup.on_shutdown
+async def close():
+    """Close the shared pools; the next caller gets fresh ones."""
+    global _aiohttp, _websockets, _async_httpx, _sync_httpx
+    for session in (_aiohttp, _websockets):
+        if session is not None and not session.closed:
+            await session.close()
+    if _async_httpx is not None:
+        await _async_httpx.aclose()
+    if _sync_httpx is not None:
+        _sync_httpx.close()
+    _aiohttp = _websockets = _async_httpx = _sync_httpx = None
@@ -0,0 +1,50 @@
+"""
+Event-loop lag monitor.
+
+Every call's media, marks, STT sends and paced playback share one event loop;
+anything that blocks it (a sync call, a long CPU burst) delays all of them at
+once. The monitor sleeps ``EVENT_LOOP_LAG_INTERVAL_MS`` at a time and records
+how late each wake-up was: that lateness is how long a ready callback waited
+for the loop.
+
+Started once per process from ``warmup``.
+"""
+
+import asyncio
+import os
+
+from calls import metrics, warmup
+
+# How often the loop is sampled
+EVENT_LOOP_LAG_INTERVAL_MS = int(os.environ.get("EVENT_LOOP_LAG_INTERVAL_MS", "250"))
+
+LAG_SECONDS = metrics.histogram('event_loop_lag_seconds', 'How late the loop ran a timer due now',
+                                buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+LAG_MAX = metrics.gauge('event_loop_lag_max_seconds', 'Worst loop lag since the previous scrape')
+
+_worst = 0.0
+
+
+async def monitor(interval=EVENT_LOOP_LAG_INTERVAL_MS / 1000):
+    global _worst
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        LAG_SECONDS.observe(lag)
+        if lag > _worst:
+            _worst = lag
+
+
+@warmup.on_startup
+async def start_monitor():
+    if EVENT_LOOP_LAG_INTERVAL_MS > 0:
+        await monitor()
+
+
+@metrics.on_collect
+def report_worst():
+    global _worst
+    LAG_MAX.set(_worst)
+    _worst = 0.0
@@ -0,0 +1,310 @@
+"""
+LLM gateway: streamed chat completions with hedged requests.
+
+A reply used to be one streamed request to one Groq model with no deadline:
+a slow request meant dead air, a failed one the apology phrase. The gateway
+talks to any OpenAI-compatible ``/chat/completions`` endpoint over SSE and,
+when the primary provider has produced no token by the hedge deadline,
+sends the same request to the next provider. Whichever streams a first
+token first is used and the other request is cancelled. A primary that
+fails outright, or whose circuit breaker is open (``calls.breakers``), is
+hedged immediately.
+
+The hedge deadline adapts: each provider's recent time-to-first-token
+(TTFT) is tracked, and the deadline is the primary's p90, kept between
+``HEDGE_MIN_MS`` and ``HEDGE_MAX_MS`` (``LLM_HEDGE_AFTER_MS`` fixes it
+instead). A request cancelled before its first token (it lost to the hedge)
+counts with the time it had waited, a lower bound on its TTFT: leaving the
+slow ones out would pull the p90, and so the deadline, ever lower.
+
+Hedging is on by default only when ``LLM_HEDGE_BASE_URL`` or
+``LLM_HEDGE_MODEL`` names a different target: a second request for the same
+model on the same endpoint shares the primary's rate limit.
+
+Usage::
+
+    reply = await gateway.open(messages, temperature=0.6, max_tokens=150)
+    async for text in reply:       # text deltas; raises LLMError mid-stream
+        ...
+    await reply.close()
+
+``open`` raises ``LLMError`` if no provider produced a first token in time.
+Base URLs are configurable so local fakes can stand in for providers in
+tests (see ``tests/fakes.py``).
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+import aiohttp
+
+from calls import breakers, calllog, http, metrics
+
+# Primary provider (Groq's OpenAI-compatible endpoint by default)
+LLM_BASE_URL = os.environ.get("LLM_BASE_URL", "https://api.groq.com/openai/v1")
+
+# Hedge provider; unset parts default to the primary's. "auto" hedges only to another endpoint or model
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "auto").lower()
+LLM_HEDGE_BASE_URL = os.environ.get("LLM_HEDGE_BASE_URL", "")
+LLM_HEDGE_API_KEY = os.environ.get("LLM_HEDGE_API_KEY", "")
+LLM_HEDGE_MODEL = os.environ.get("LLM_HEDGE_MODEL", "")
+
+# Hedge after this long without a first token; 0 = adapt to the primary's TTFT
+LLM_HEDGE_AFTER_MS = int(os.environ.get("LLM_HEDGE_AFTER_MS", "0"))
+
+# Give up (apology phrase) if no provider has produced a first token by then
+LLM_FIRST_TOKEN_TIMEOUT_MS = int(os.environ.get("LLM_FIRST_TOKEN_TIMEOUT_MS", "5000"))
+
+HEDGE_MIN_MS = 250
+HEDGE_MAX_MS = 1500
+HEDGE_INITIAL_MS = 800   # Until there are enough TTFT samples to adapt
+MIN_SAMPLES = 20
+
+process_log = calllog.CallLogger(sampled=False)
+
+TTFT_SECONDS = {}
+REQUESTS = {}
+HEDGES = metrics.counter('llm_hedges_total', 'Replies for which a hedge request was sent')
+HEDGE_DEADLINE = metrics.gauge('llm_hedge_deadline_seconds', 'Current hedge deadline')
+
+
+class LLMError(Exception):
+    pass
+
+
+class LatencyWindow:
+    """The last ``size`` latency samples, for percentiles."""
+
+    def __init__(self, size=200):
+        self.samples = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class Provider:
+    """One OpenAI-compatible chat completions endpoint and model."""
+
+    def __init__(self, name, base_url, api_key, model, breaker=None):
+        self.name = name
+        self.url = base_url.rstrip('/') + '/chat/completions'
+        self.api_key = api_key
+        self.model = model
+        self.ttft = LatencyWindow()
+        self.breaker = breaker or breakers.get(name)
+        TTFT_SECONDS[name] = metrics.histogram('llm_ttft_seconds', 'Time to first token per provider', {'provider': name})
+        for result in ('won', 'lost', 'error'):
+            REQUESTS[name, result] = metrics.counter('llm_requests_total', 'LLM requests by provider and outcome',
+                                                     {'provider': name, 'result': result})
+
+    def stats(self):
+        return {
+            'model': self.model,
+            'circuit': self.breaker.state,
+            'samples': len(self.ttft),
+            **{f"ttft_p{q}_ms": round(self.ttft.percentile(q) * 1000) if self.ttft else None for q in (50, 90, 99)},
+        }
+
+    async def start(self, messages, params):
+        """Send the request and wait for the first text. Returns a ``Reply``."""
+        started = time.perf_counter()
+        try:
+            return await self._start(messages, params, started)
+        except asyncio.CancelledError:
+            # No first token yet (another provider won, or the reply was dropped):
+            # the TTFT is at least this long
+            self.ttft.add(time.perf_counter() - started)
+            raise
+
+    async def _start(self, messages, params, started):
+        resp = await http.aiohttp_session().post(
+            self.url,
+            headers={'Authorization': f"Bearer {self.api_key}"},
+            json={'model': self.model, 'messages': messages, 'stream': True, **params},
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=5, sock_read=10),
+        )
+        try:
+            if resp.status != 200:
+                raise LLMError(f"{self.name} returned {resp.status}: {(await resp.text())[:200]}")
+            deltas = _deltas(resp)
+            first = ''
+            async for text in deltas:
+                first = text
+                break
+            ttft = time.perf_counter() - started
+            self.ttft.add(ttft)
+            TTFT_SECONDS[self.name].observe(ttft)
+            return Reply(self, resp, deltas, first)
+        except BaseException:
+            resp.close()
+            raise
+
+
+class Reply:
+    """A streaming completion that has produced its first text."""
+
+    def __init__(self, provider, resp, deltas, first):
+        self.provider = provider
+        self._resp = resp
+        self._deltas = deltas
+        self._first = first
+
+    async def __aiter__(self):
+        if self._first:
+            yield self._first
+        async for text in self._deltas:
+            yield text
+
+    async def close(self):
+        try:
+            await self._deltas.aclose()
+        except RuntimeError:
+            pass  # Still being iterated by a reply that was cancelled mid-chunk
+        self._resp.close()
+
+
+async def _deltas(resp):
+    """Text deltas from an OpenAI-style SSE stream."""
+    try:
+        async for line in resp.content:
+            if not line.startswith(b'data:'):
+                continue
+            data = line[5:].strip()
+            if data == b'[DONE]':
+                return
+            chunk = json.loads(data)
+            if chunk.get('error'):
+                raise LLMError(str(chunk['error']))
+            choices = chunk.get('choices') or [{}]
+            text = (choices[0].get('delta') or {}).get('content')
+            if text:
+                yield text
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise LLMError(f"LLM stream broke: {e!r}") from e
+
+
+class Gateway:
+    """Hedged streaming across ``providers`` (primary first)."""
+
+    def __init__(self, providers, hedge_after_ms=LLM_HEDGE_AFTER_MS, timeout_ms=LLM_FIRST_TOKEN_TIMEOUT_MS):
+        self.providers = providers
+        self.hedge_after_ms = hedge_after_ms
+        self.timeout = timeout_ms / 1000
+
+    def hedge_deadline(self):
+        """Seconds to wait for the primary's first token before hedging."""
+        if self.hedge_after_ms:
+            deadline = self.hedge_after_ms / 1000
+        else:
+            primary = self.providers[0].ttft
+            if len(primary) < MIN_SAMPLES:
+                deadline = HEDGE_INITIAL_MS / 1000
+            else:
+                deadline = min(max(primary.percentile(90), HEDGE_MIN_MS / 1000), HEDGE_MAX_MS / 1000)
+        HEDGE_DEADLINE.set(deadline)
+        return deadline
+
+    def stats(self):
+        return {
+            'hedge_deadline_ms': round(self.hedge_deadline() * 1000),
+            'providers': {p.name: p.stats() for p in self.providers},
+        }
+
+    async def open(self, messages, **params):
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + self.timeout
+        hedge_at = loop.time() + self.hedge_deadline()
+        waiting = list(self.providers)
+        attempts = {}   # task -> provider
+        errors = []
+
+        timed_out = False
+
+        def launch():
+            # Providers whose circuit is open are skipped without sending anything
+            while waiting:
+                provider = waiting.pop(0)
+                if provider.breaker.allow():
+                    attempts[asyncio.ensure_future(provider.start(messages, params))] = provider
+                    return True
+                errors.append(f"{provider.name}: circuit open")
+            return False
+
+        launch()
+        try:
+            while attempts or waiting:
+                if not attempts and not launch():
+                    break
+                now = loop.time()
+                if now >= give_up_at:
+                    timed_out = True
+                    break
+                # Wake up for the hedge deadline only while there is someone left to hedge to
+                wake_at = min(give_up_at, hedge_at) if waiting else give_up_at
+                done, _ = await asyncio.wait(attempts, timeout=max(0, wake_at - now),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = attempts.pop(task)
+                    if task.exception() is None:
+                        provider.breaker.record_success()
+                        REQUESTS[provider.name, 'won'].inc()
+                        return task.result()
+                    provider.breaker.record_failure(task.exception())
+                    REQUESTS[provider.name, 'error'].inc()
+                    errors.append(f"{provider.name}: {task.exception()!r}")
+                    process_log.warning('llm_provider_failed', repr(task.exception()), provider=provider.name)
+                if not done and waiting and loop.time() >= hedge_at:
+                    if launch():
+                        HEDGES.inc()
+                        process_log.info('llm_hedged', "No first token by the hedge deadline",
+                                         provider=list(attempts.values())[-1].name)
+                    hedge_at = loop.time() + self.hedge_deadline()
+        finally:
+            for task, provider in attempts.items():
+                # Slower than the winner is not a failure; no first token at all is
+                if timed_out:
+                    provider.breaker.record_failure(LLMError("no first token"))
+                else:
+                    provider.breaker.release()
+                REQUESTS[provider.name, 'lost'].inc()
+                task.cancel()
+                task.add_done_callback(_close_late_reply)
+        raise LLMError("; ".join(errors) or f"No first token within {self.timeout:.1f}s")
+
+
+def _close_late_reply(task):
+    # A cancelled loser may have finished just before the cancel landed
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(task.result().close())
+
+
+def hedge_enabled(model):
+    """LLM_HEDGE "true"/"false", or for "auto" whether the hedge goes to another endpoint or model."""
+    if LLM_HEDGE == 'auto':
+        return (LLM_HEDGE_BASE_URL or LLM_BASE_URL) != LLM_BASE_URL or (LLM_HEDGE_MODEL or model) != model
+    return LLM_HEDGE == 'true'
+
+
+def from_env(api_key, model):
+    """The gateway the consumer uses: primary from LLM_BASE_URL, hedge from LLM_HEDGE_*."""
+    providers = [Provider('groq', LLM_BASE_URL, api_key, model)]
+    if hedge_enabled(model):
+        providers.append(Provider(
+            'hedge',
+            LLM_HEDGE_BASE_URL or LLM_BASE_URL,
+            LLM_HEDGE_API_KEY or api_key,
+            LLM_HEDGE_MODEL or model,
+        ))
+    return Gateway(providers)
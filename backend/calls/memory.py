@@ -0,0 +1,161 @@
+"""
+Conversation memory for one call, held to a token budget.
+
+Sending the whole history to the LLM every turn makes each turn slower and
+dearer than the last. ``ConversationMemory`` keeps what goes out bounded:
+
+- the system prompt, always, verbatim
+- a running summary of older turns
+- the most recent turns, verbatim
+
+Once the history passes the model's budget, the oldest turns (beyond the
+``keep_recent`` newest) are handed to a summarizer coroutine in the
+background; the turn being answered never waits for it. Until the new
+summary lands (or if summarizing fails) the prompt leaves out as many of the
+oldest turns as it takes to stay within budget; they are still kept, and the
+next summary covers them. After a failed summary the next attempt waits for
+``MEMORY_SUMMARY_RETRY_TURNS`` new messages (twice as many after each further
+failure), so a summarizer that keeps failing doesn't cost an LLM request per
+message.
+
+Token counts are a local estimate (~4 characters per token plus a few per
+message), close enough for budgeting and free to compute.
+"""
+
+import asyncio
+import os
+import time
+
+from calls import calllog, metrics
+
+# Prompt budget (tokens) per model; MEMORY_TOKEN_BUDGET overrides it for every model
+MODEL_TOKEN_BUDGETS = {
+    'llama-3.1-8b-instant': 2000,
+    'llama-3.3-70b-versatile': 3000,
+}
+DEFAULT_TOKEN_BUDGET = 2000
+MEMORY_TOKEN_BUDGET = int(os.environ.get("MEMORY_TOKEN_BUDGET", "0"))
+
+# Newest messages (user and assistant) that are never summarized
+MEMORY_KEEP_RECENT = int(os.environ.get("MEMORY_KEEP_RECENT", "6"))
+
+# New messages to wait for before retrying a failed summary (doubles per consecutive failure)
+MEMORY_SUMMARY_RETRY_TURNS = int(os.environ.get("MEMORY_SUMMARY_RETRY_TURNS", "4"))
+
+MESSAGE_OVERHEAD_TOKENS = 4
+
+process_log = calllog.CallLogger(sampled=False)
+
+PROMPT_TOKENS = metrics.histogram('llm_prompt_tokens', 'Estimated prompt tokens sent to the LLM per turn',
+                                  buckets=(100, 250, 500, 1000, 1500, 2000, 3000, 4000, 8000))
+SUMMARIES = metrics.counter('memory_summaries_total', 'Conversation summaries produced')
+SUMMARY_SECONDS = metrics.histogram('memory_summary_seconds', 'Time to summarize older turns (off the turn path)')
+
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message):
+    return estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+
+
+def token_budget(model):
+    return MEMORY_TOKEN_BUDGET or MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+
+
+class ConversationMemory:
+    """
+    History for one call. ``summarize(summary, turns)`` is an async function
+    returning the new summary text given the previous one (or None) and the
+    messages to fold into it. Summaries are logged to ``log``, the call's
+    ``CallLogger``.
+    """
+
+    def __init__(self, system_prompt, summarize, budget=DEFAULT_TOKEN_BUDGET, keep_recent=MEMORY_KEEP_RECENT,
+                 log=None):
+        self.system_prompt = system_prompt
+        self.summarize = summarize
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.log = log or process_log
+        self.summary = None
+        self.turns = []           # {"role", "content"} dicts, oldest first
+        self._summarizing = 0     # Oldest turns currently being folded into the summary
+        self._task = None
+        self._failures = 0        # Consecutive failed summaries
+        self._retry_in = 0        # Messages still to add before the next attempt
+
+    def add(self, role, content):
+        self.turns.append({"role": role, "content": content})
+        if self._retry_in:
+            self._retry_in -= 1
+        elif self._task is None and self.tokens() > self.budget:
+            self._start_summary()
+
+    def messages(self):
+        """The prompt for the next LLM request: system, summary, recent turns."""
+        head = [{"role": "system", "content": self.system_prompt}]
+        if self.summary:
+            head.append({"role": "system", "content": f"Summary of the call so far: {self.summary}"})
+
+        # Over budget (summary still in flight, or it failed): leave out the oldest
+        # turns, never the newest keep_recent; the next summary covers them
+        tokens = self._tokens(head) + self._tokens(self.turns)
+        skip = 0
+        while tokens > self.budget and len(self.turns) - skip > self.keep_recent:
+            tokens -= message_tokens(self.turns[skip])
+            skip += 1
+
+        PROMPT_TOKENS.observe(tokens)
+        return head + self.turns[skip:]
+
+    def tokens(self):
+        """Estimated tokens of the full prompt as ``messages()`` would build it now."""
+        head = self._tokens([{"role": "system", "content": self.system_prompt}])
+        if self.summary:
+            head += estimate_tokens(self.summary) + MESSAGE_OVERHEAD_TOKENS
+        return head + self._tokens(self.turns)
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def wait(self):
+        """Wait for a summary in flight (tests, end of call)."""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def _tokens(self, messages):
+        return sum(message_tokens(m) for m in messages)
+
+    def _start_summary(self):
+        count = len(self.turns) - self.keep_recent
+        if count <= 0:
+            return
+        self._summarizing = count
+        self._task = asyncio.ensure_future(self._summarize(self.turns[:count]))
+
+    async def _summarize(self, turns):
+        started = time.perf_counter()
+        try:
+            summary = await self.summarize(self.summary, turns)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._failures += 1
+            self._retry_in = MEMORY_SUMMARY_RETRY_TURNS * 2 ** (self._failures - 1)
+            self.log.warning('memory_summary_failed', f"{e!r}; keeping the turns verbatim", turns=len(turns),
+                             retry_in=self._retry_in)
+            return
+        finally:
+            self._task = None
+            count, self._summarizing = self._summarizing, 0
+
+        self._failures = 0
+        if summary:
+            self.summary = summary.strip()
+            del self.turns[:count]
+            SUMMARIES.inc()
+            SUMMARY_SECONDS.observe(time.perf_counter() - started)
+            self.log.info('memory_summarized', turns=count, prompt_tokens=self.tokens())
@@ -0,0 +1,189 @@
+"""
+In-process metrics registry.
+
+Metrics are plain Python objects updated from the event loop, so recording
+one is an attribute increment — no locks, no I/O. Each metric is registered
+once under its name plus an optional set of labels and looked up again by
+the module that owns it:
+
+    FRAMES_SENT = metrics.counter('stt_frames_sent_total', 'Frames sent to STT')
+    FRAMES_SENT.inc()
+
+``render()`` produces the Prometheus text format for ``/calls/metrics/``.
+Values that are cheaper to derive at scrape time than to keep current
+(ratios, rates, sums over live calls) come from ``on_collect`` functions,
+which run just before each render.
+"""
+
+import math
+from bisect import bisect_left
+
+# Seconds — covers sub-millisecond queue hops up to multi-second provider stalls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = {}
+_collectors = []
+
+
+class Counter:
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help='', labels=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge:
+    """Value that can go up and down (queue depth, active calls, ...)."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help='', labels=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class Histogram:
+    """Bucketed distribution with a running sum and count."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help='', labels=None, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @property
+    def value(self):
+        return {'count': self.count, 'sum': self.sum}
+
+
+def _get_or_create(cls, name, help, labels, **kwargs):
+    key = (name, tuple(sorted((labels or {}).items())))
+    metric = _registry.get(key)
+    if metric is None:
+        metric = _registry[key] = cls(name, help, labels, **kwargs)
+    elif not isinstance(metric, cls):
+        raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+    return metric
+
+
+def counter(name, help='', labels=None):
+    return _get_or_create(Counter, name, help, labels)
+
+
+def gauge(name, help='', labels=None):
+    return _get_or_create(Gauge, name, help, labels)
+
+
+def histogram(name, help='', labels=None, buckets=DEFAULT_BUCKETS):
+    return _get_or_create(Histogram, name, help, labels, buckets=buckets)
+
+
+def all_metrics():
+    """Registered metrics, sorted by name then labels."""
+    return [metric for _, metric in sorted(_registry.items())]
+
+
+def snapshot():
+    """Plain-dict view of every metric, keyed by name with labels appended."""
+    out = {}
+    for metric in all_metrics():
+        key = metric.name
+        if metric.labels:
+            key += '{' + ','.join(f'{k}={v}' for k, v in sorted(metric.labels.items())) + '}'
+        out[key] = metric.value
+    return out
+
+
+def on_collect(func):
+    """Register ``func()`` to refresh derived metrics before each render. Usable as a decorator."""
+    _collectors.append(func)
+    return func
+
+
+def collect():
+    for func in _collectors:
+        try:
+            func()
+        except Exception as e:
+            from calls import calllog  # calllog registers its own metrics here
+            calllog.CallLogger(sampled=False).error('metrics_collector_failed', repr(e), collector=func.__name__)
+
+
+def render():
+    """Every metric in the Prometheus text exposition format (0.0.4)."""
+    collect()
+    lines = []
+    family = None
+    for metric in all_metrics():
+        if metric.name != family:
+            family = metric.name
+            lines.append(f"# HELP {family} {_escape_help(metric.help)}")
+            lines.append(f"# TYPE {family} {metric.kind}")
+        if metric.kind == 'histogram':
+            # Read once: the event loop may observe while a worker thread renders
+            counts, total, count = list(metric.counts), metric.sum, metric.count
+            cumulative = 0
+            for bound, n in zip(metric.buckets + (math.inf,), counts):
+                cumulative += n
+                lines.append(f"{family}_bucket{_labels(metric.labels, le=_number(bound))} {cumulative}")
+            lines.append(f"{family}_sum{_labels(metric.labels)} {_number(total)}")
+            lines.append(f"{family}_count{_labels(metric.labels)} {count}")
+        else:
+            lines.append(f"{family}{_labels(metric.labels)} {_number(metric.value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _labels(labels, **extra):
+    pairs = sorted(labels.items()) + list(extra.items())   # ``le`` goes last
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_value(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _escape_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
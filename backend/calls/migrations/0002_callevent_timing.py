@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calls', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='callevent',
+            name='event_type',
+            field=models.CharField(choices=[('call_initiated', 'Call Initiated'), ('call_started', 'Call Started'), ('context_fetched', 'Context Fetched'), ('transcription', 'Transcription'), ('ai_response', 'AI Response'), ('tts_sent', 'TTS Sent'), ('call_ended', 'Call Ended'), ('error', 'Error'), ('timing', 'Timing')], max_length=20),
+        ),
+    ]
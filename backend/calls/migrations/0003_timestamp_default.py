@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calls', '0002_callevent_timing'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='callevent',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='conversationmessage',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calls', '0004_callevent_prompt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CallTurn',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('started_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('measured_from', models.CharField(choices=[('user_audio_end', 'Last user audio'), ('stt_final', 'Deepgram final')], default='user_audio_end', max_length=16)),
+                ('interrupted', models.BooleanField(default=False)),
+                ('stt_final_ms', models.IntegerField(blank=True, null=True)),
+                ('debounce_fired_ms', models.IntegerField(blank=True, null=True)),
+                ('llm_request_ms', models.IntegerField(blank=True, null=True)),
+                ('llm_first_token_ms', models.IntegerField(blank=True, null=True)),
+                ('tts_first_byte_ms', models.IntegerField(blank=True, null=True)),
+                ('first_frame_sent_ms', models.IntegerField(blank=True, null=True)),
+                ('playback_marked_ms', models.IntegerField(blank=True, null=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turns', to='calls.callsession')),
+            ],
+            options={
+                'ordering': ['started_at'],
+            },
+        ),
+    ]
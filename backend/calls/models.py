@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 import uuid
 
 
@@ -54,7 +55,7 @@ class ConversationMessage(models.Model):
     session = models.ForeignKey(CallSession, on_delete=models.CASCADE, related_name='messages')
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)  # Set when queued, not when the batch is written
 
     class Meta:
         ordering = ['timestamp']
@@ -75,15 +76,49 @@ class CallEvent(models.Model):
         ('tts_sent', 'TTS Sent'),
         ('call_ended', 'Call Ended'),
         ('error', 'Error'),
+        ('timing', 'Timing'),
+        ('prompt', 'Prompt'),
     ]
 
     session = models.ForeignKey(CallSession, on_delete=models.CASCADE, related_name='events')
     event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
     detail = models.TextField(blank=True, default='')
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)  # Set when queued, not when the batch is written
 
     class Meta:
         ordering = ['timestamp']
 
     def __str__(self):
         return f"{self.event_type} @ {self.timestamp}"
+
+
+class CallTurn(models.Model):
+    """
+    Latency timeline of one conversation turn (see calls.turns): each stage in
+    ms after the caller stopped speaking (``measured_from``), null if it never happened.
+    """
+
+    MEASURED_FROM_CHOICES = [
+        ('user_audio_end', 'Last user audio'),
+        ('stt_final', 'Deepgram final'),
+    ]
+
+    session = models.ForeignKey(CallSession, on_delete=models.CASCADE, related_name='turns')
+    index = models.PositiveIntegerField()
+    started_at = models.DateTimeField(default=timezone.now, db_index=True)
+    measured_from = models.CharField(max_length=16, choices=MEASURED_FROM_CHOICES, default='user_audio_end')
+    interrupted = models.BooleanField(default=False)
+
+    stt_final_ms = models.IntegerField(blank=True, null=True)
+    debounce_fired_ms = models.IntegerField(blank=True, null=True)
+    llm_request_ms = models.IntegerField(blank=True, null=True)
+    llm_first_token_ms = models.IntegerField(blank=True, null=True)
+    tts_first_byte_ms = models.IntegerField(blank=True, null=True)
+    first_frame_sent_ms = models.IntegerField(blank=True, null=True)
+    playback_marked_ms = models.IntegerField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['started_at']
+
+    def __str__(self):
+        return f"Turn {self.index} of {self.session_id}: first frame at {self.first_frame_sent_ms}ms"
@@ -0,0 +1,140 @@
+"""
+Write-behind buffer for call transcript and event rows.
+
+A call logs a row for every transcript, reply and lifecycle event, and each
+used to be its own ``objects.create``: one INSERT, one thread hop and, on
+SQLite, one write lock per row. ``WriteBehindBuffer`` queues the unsaved
+model instances instead and writes them with one ``bulk_create`` per model
+per batch, inside a transaction:
+
+- a batch is written once ``PERSIST_BATCH_SIZE`` rows are waiting, or
+  ``PERSIST_FLUSH_MS`` after the first row of the batch arrived
+- rows keep the order they were added in (``timestamp`` is set when the row
+  is queued, and batches are written one at a time)
+- ``flush()`` writes everything queued so far; the consumer awaits it when
+  the call stops and again on disconnect
+
+If a batch fails (e.g. its session was deleted) the rows are retried one by
+one so a single bad row doesn't take the rest of the batch down with it.
+"""
+
+import asyncio
+import os
+import time
+from collections import defaultdict
+
+from django.db import transaction
+
+from calls import calllog, db, metrics
+
+# Rows that trigger an immediate flush
+PERSIST_BATCH_SIZE = int(os.environ.get("PERSIST_BATCH_SIZE", "100"))
+
+# Max time a row waits in memory before it is written
+PERSIST_FLUSH_MS = int(os.environ.get("PERSIST_FLUSH_MS", "250"))
+
+process_log = calllog.CallLogger(sampled=False)
+
+ROWS_WRITTEN = metrics.counter('db_rows_written_total', 'Rows written by the write-behind buffer')
+ROWS_FAILED = metrics.counter('db_rows_failed_total', 'Rows the write-behind buffer could not write')
+FLUSH_SECONDS = metrics.histogram('db_flush_seconds', 'Time to write one batch of buffered rows')
+BATCH_ROWS = metrics.histogram('db_flush_rows', 'Rows per write-behind batch',
+                               buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500))
+ROWS_PER_CALL = metrics.histogram('db_rows_per_call', 'Rows written per call',
+                                  buckets=(5, 10, 25, 50, 100, 250, 500, 1000))
+BATCHES_PER_CALL = metrics.histogram('db_batches_per_call', 'Write-behind batches (transactions) per call',
+                                     buckets=(1, 2, 5, 10, 25, 50, 100, 250))
+
+
+class WriteBehindBuffer:
+    """Batches unsaved model instances and writes them with ``bulk_create``."""
+
+    def __init__(self, batch_size=PERSIST_BATCH_SIZE, flush_interval=PERSIST_FLUSH_MS / 1000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows = []
+        self._timer = None
+        self._task = None
+        self._calls = defaultdict(lambda: [0, 0])  # session_id -> [rows, batches]
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, instance):
+        """Queue an unsaved model instance. Must be called on the event loop."""
+        self._rows.append(instance)
+        if len(self._rows) >= self.batch_size:
+            self._start_flush()
+        elif self._timer is None and self._task is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._start_flush)
+
+    async def flush(self):
+        """Write every row queued so far; returns once they are in the database."""
+        while self._rows or self._task is not None:
+            self._start_flush()
+            # A caller being cancelled (hang-up) must not abort the write itself
+            await asyncio.shield(self._task)
+
+    async def end_call(self, session_id):
+        """Flush, then report and forget the call's write counts. Returns (rows, batches)."""
+        await self.flush()
+        rows, batches = self._calls.pop(session_id, (0, 0))
+        if rows:
+            ROWS_PER_CALL.observe(rows)
+            BATCHES_PER_CALL.observe(batches)
+        return rows, batches
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._drain())
+
+    async def _drain(self):
+        try:
+            while self._rows:
+                batch, self._rows = self._rows[:self.batch_size], self._rows[self.batch_size:]
+                started = time.perf_counter()
+                written = await db.run(_write, batch)
+                FLUSH_SECONDS.observe(time.perf_counter() - started)
+                BATCH_ROWS.observe(len(batch))
+                ROWS_WRITTEN.inc(len(written))
+                ROWS_FAILED.inc(len(batch) - len(written))
+                self._count(written)
+        finally:
+            self._task = None
+
+    def _count(self, written):
+        sessions = defaultdict(int)
+        for instance in written:
+            sessions[instance.session_id] += 1
+        for session_id, rows in sessions.items():
+            self._calls[session_id][0] += rows
+            self._calls[session_id][1] += 1
+
+
+def _write(batch):
+    """Insert ``batch`` (model instances, in order); returns the ones written."""
+    by_model = defaultdict(list)
+    for instance in batch:
+        by_model[type(instance)].append(instance)
+    try:
+        with transaction.atomic():
+            for model, instances in by_model.items():
+                model.objects.bulk_create(instances)
+        return batch
+    except Exception as e:
+        process_log.warning('db_batch_failed', f"{e!r}; retrying row by row", rows=len(batch))
+
+    written = []
+    for instance in batch:
+        try:
+            instance.save(force_insert=True)
+            written.append(instance)
+        except Exception as e:
+            process_log.error('db_row_dropped', repr(e), model=type(instance).__name__)
+    return written
+
+
+buffer = WriteBehindBuffer()
@@ -0,0 +1,308 @@
+"""
+Real-time paced playback of AI audio to Twilio.
+
+Twilio plays whatever we send into a per-stream buffer. Pushing TTS audio as
+fast as ElevenLabs produces it means that buffer can hold seconds of speech,
+which makes barge-in slow (everything queued must be cleared) and hides how
+much of a reply the caller actually heard.
+
+``PacedPlayback`` keeps only a small lookahead queued on Twilio's side:
+frames are sent at real-time rate, named marks are interleaved at a fixed
+interval, and the acks Twilio sends back for those marks tell us how far
+playback really got.
+
+Playback can also be paused tentatively (when local VAD thinks the caller
+started talking) and later either interrupted for good or resumed, in which
+case the audio Twilio dropped on ``clear`` is sent again.
+"""
+
+import asyncio
+import weakref
+
+from calls import metrics
+from calls.audio import FrameChunker
+
+# ulaw @ 8kHz — one byte per sample
+ULAW_BYTES_PER_MS = 8
+TWILIO_FRAME_MS = 20
+
+UNACKED_SECONDS = metrics.gauge('playback_unacked_seconds',
+                                'Reply audio sent to Twilio but not yet acked as played (all calls)')
+UNACKED_MAX_SECONDS = metrics.gauge('playback_unacked_max_seconds',
+                                    'Largest backlog of unacked reply audio on any one call')
+_live = weakref.WeakSet()
+
+
+@metrics.on_collect
+def report_unacked():
+    backlogs = [p.unacked_bytes / (ULAW_BYTES_PER_MS * 1000) for p in list(_live)]
+    UNACKED_SECONDS.set(round(sum(backlogs), 3))
+    UNACKED_MAX_SECONDS.set(round(max(backlogs, default=0.0), 3))
+
+
+class PacedPlayback:
+    """
+    Paces one call's outbound audio and tracks playback position via marks.
+
+    One instance lives for the whole call; ``start()`` resets it for each
+    reply. The consumer supplies two coroutines:
+
+    - ``send_media(frame)`` sends a ulaw frame as a Twilio ``media`` message
+    - ``send_mark(name)`` sends a Twilio ``mark`` message
+
+    Positions are tracked in bytes of ulaw audio:
+
+    - ``generated_bytes``: audio received from TTS for this reply
+    - ``sent_bytes``: audio handed to Twilio
+    - ``played_bytes``: audio confirmed played by the latest acked mark
+    """
+
+    def __init__(self, send_media, send_mark, frame_ms=TWILIO_FRAME_MS, lookahead_ms=200, mark_interval_ms=500):
+        if frame_ms <= 0 or frame_ms % TWILIO_FRAME_MS:
+            raise ValueError(f"frame_ms must be a positive multiple of {TWILIO_FRAME_MS}")
+        self.send_media = send_media
+        self.send_mark = send_mark
+        self.frame_bytes = frame_ms * ULAW_BYTES_PER_MS
+        self.lookahead_ms = lookahead_ms
+        self.mark_interval_bytes = mark_interval_ms * ULAW_BYTES_PER_MS
+        self.chunker = FrameChunker(self.frame_bytes)
+
+        self.reply_seq = 0
+        self._reset()
+        _live.add(self)
+
+    def _reset(self):
+        self.chunker.reset()
+        self.generated_bytes = 0
+        self.sent_bytes = 0
+        self.played_bytes = 0
+        self.interrupted = False
+        self.finished = False
+        self.paused = False
+        self._marks = {}
+        self._mark_seq = 0
+        self._next_mark_at = self.mark_interval_bytes
+        self._final_mark = None
+        self._final_sends = 0
+        self._played_event = asyncio.Event()
+        self._changed = asyncio.Event()
+        self._clock_start = None
+        self._rewind_to = None
+        # Whole reply, kept so audio flushed by a tentative 'clear' can be re-sent
+        self._history = bytearray()
+
+    # ------------------------------------------------------------------
+    # Sending
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Begin a new reply."""
+        self.reply_seq += 1
+        self._reset()
+
+    async def write(self, audio):
+        """Queue TTS audio; frames are sent as soon as pacing allows."""
+        self.generated_bytes += len(audio)
+        self._history += audio
+        for frame in self.chunker.feed(audio):
+            if self.interrupted:
+                return
+            await self._send_frame(frame)
+
+    async def finish(self):
+        """Send the trailing partial frame and the end-of-reply mark."""
+        if self.interrupted:
+            return
+        tail = self.chunker.flush()
+        if tail is not None:
+            await self._send_frame(tail)
+        self.finished = True
+        await self._send_final_mark()
+
+    async def wait_played(self, timeout):
+        """
+        Wait (bounded) for Twilio to ack the end-of-reply mark. A tentative
+        pause in the meantime restarts the wait once playback resumes.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self._played_event.is_set() and not self.interrupted:
+            if self.paused or self._rewind_to is not None:
+                await self._wait_resumed()
+                if self.interrupted:
+                    return
+                if self._final_mark not in self._marks:
+                    await self._send_final_mark()
+                deadline = loop.time() + timeout
+                continue
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    async def _send_final_mark(self):
+        # Re-sent after a tentative pause under a new name, so a stale ack can't match it
+        self._final_sends += 1
+        suffix = "" if self._final_sends == 1 else f"-{self._final_sends}"
+        self._final_mark = f"ai-{self.reply_seq}-end{suffix}"
+        self._marks[self._final_mark] = self.sent_bytes
+        await self.send_mark(self._final_mark)
+
+    async def _send_frame(self, frame):
+        while True:
+            await self._wait_resumed()
+            if self.interrupted:
+                return
+            await self._pace()
+            # Paused while sleeping? Don't slip a frame in after the 'clear'
+            if not self.paused and self._rewind_to is None:
+                break
+        await self.send_media(frame)
+        self.sent_bytes += len(frame)
+
+        if self.sent_bytes >= self._next_mark_at:
+            self._mark_seq += 1
+            name = f"ai-{self.reply_seq}-{self._mark_seq}"
+            self._marks[name] = self.sent_bytes
+            self._next_mark_at += self.mark_interval_bytes
+            await self.send_mark(name)
+
+    async def _pace(self):
+        """Sleep until Twilio holds less than ``lookahead_ms`` of unplayed audio."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        sent_ms = self.sent_bytes / ULAW_BYTES_PER_MS
+
+        if self._clock_start is None:
+            self._clock_start = now - sent_ms / 1000
+        ahead_ms = sent_ms - (now - self._clock_start) * 1000
+
+        if ahead_ms < 0:
+            # TTS fell behind and Twilio ran dry — restart the clock from here
+            self._clock_start = now - sent_ms / 1000
+        elif ahead_ms > self.lookahead_ms:
+            # Sleep down to half the lookahead so we wake up once per few frames
+            await asyncio.sleep((ahead_ms - self.lookahead_ms / 2) / 1000)
+
+    # ------------------------------------------------------------------
+    # Tentative pause (local VAD barge-in)
+    # ------------------------------------------------------------------
+
+    def pause(self):
+        """
+        Stop sending and assume Twilio's queue is being cleared. Everything
+        after the estimated playback position will be re-sent on ``resume()``.
+        Returns False if there was nothing left to pause.
+        """
+        if self.paused or self.interrupted or self._played_event.is_set():
+            return False
+        self.paused = True
+
+        # Twilio plays in real time from the clock start, so the clock is a
+        # finer estimate of the position than the last acked mark
+        played_est = self.played_bytes
+        if self._clock_start is not None:
+            elapsed_ms = (asyncio.get_running_loop().time() - self._clock_start) * 1000
+            played_est = max(played_est, min(self.sent_bytes, int(elapsed_ms * ULAW_BYTES_PER_MS)))
+        rewind_to = played_est - played_est % self.frame_bytes
+        if self._rewind_to is None or rewind_to < self._rewind_to:
+            self._rewind_to = rewind_to
+
+        # The clear makes Twilio ack every pending mark at once; forget them
+        self._marks = {name: offset for name, offset in self._marks.items() if offset <= self._rewind_to}
+        self._changed.set()
+        return True
+
+    def resume(self):
+        """Undo a tentative pause; the sender re-sends the cleared audio first."""
+        if not self.paused:
+            return
+        self.paused = False
+        self._changed.set()
+
+    async def _wait_resumed(self):
+        while self.paused and not self.interrupted:
+            self._changed.clear()
+            await self._changed.wait()
+        if self._rewind_to is None or self.interrupted:
+            return
+
+        start, end = self._rewind_to, self.sent_bytes
+        self._rewind_to = None
+        self.sent_bytes = start
+        self._next_mark_at = (start // self.mark_interval_bytes + 1) * self.mark_interval_bytes
+        self._clock_start = None
+        for offset in range(start, end, self.frame_bytes):
+            # A nested pause while replaying rewinds again and resumes from here
+            await self._send_frame(bytes(self._history[offset:min(offset + self.frame_bytes, end)]))
+
+    # ------------------------------------------------------------------
+    # Playback position
+    # ------------------------------------------------------------------
+
+    def on_mark(self, name):
+        """
+        Record a mark ack from Twilio. Returns True if the mark belonged to the
+        current reply.
+        """
+        offset = self._marks.get(name)
+        if offset is None:
+            return False
+        if not self.interrupted:
+            self.played_bytes = max(self.played_bytes, offset)
+            if name == self._final_mark:
+                self._played_event.set()
+                self._changed.set()
+        return True
+
+    def interrupt(self):
+        """
+        Freeze the playback position. After a ``clear`` Twilio acks every
+        pending mark at once, so acks arriving from now on say nothing about
+        what the caller heard.
+        """
+        if not self._played_event.is_set():
+            self.interrupted = True
+            self._changed.set()
+
+    @property
+    def played_all(self):
+        return self._played_event.is_set()
+
+    @property
+    def unacked_bytes(self):
+        """Audio queued on Twilio's side that no mark has confirmed yet (0 once interrupted)."""
+        return 0 if self.interrupted else max(0, self.sent_bytes - self.played_bytes)
+
+    def heard_text(self, text, spoken=None):
+        """
+        Cut ``text`` down to the part the caller actually heard.
+
+        TTS audio has no word timings, so the cut is proportional: the share of
+        generated audio that was confirmed played, snapped back to a word
+        boundary. The audio only covers the text handed to TTS, so when the
+        reply was stopped before all of it was (the LLM was still streaming),
+        ``spoken`` is that text and the share is taken of it rather than of
+        ``text``. An interrupted reply gets a trailing ellipsis so the LLM can
+        tell it was cut off.
+        """
+        if not self.interrupted:
+            return text
+        if spoken is not None:
+            text = spoken
+        if not self.generated_bytes:
+            return ""
+
+        heard = min(1.0, self.played_bytes / self.generated_bytes)
+        cut = int(len(text) * heard)
+        if cut >= len(text):
+            return text
+        cut = text.rfind(' ', 0, cut + 1)
+        if cut <= 0:
+            return ""
+        return text[:cut].rstrip(" ,;:") + "..."
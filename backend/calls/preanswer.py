@@ -0,0 +1,148 @@
+"""
+Outbound "pre-answer" stage: get the call ready while the phone rings.
+
+Without it, context fetch, prompt build and greeting synthesis all start
+when Twilio's media stream sends ``start``, i.e. after the callee has
+already picked up and is listening to silence. An outbound call rings for
+several seconds first, so ``MakeCallView`` kicks this stage off at dial
+time and the consumer picks up the result:
+
+- fetch the call's ``context_url`` and save it on the session
+- build the system prompt
+- optionally ask the LLM for a personalized opening line
+- synthesize the greeting so its audio is already in memory
+
+Results are kept in-process, keyed by Twilio call SID, and expire if the
+media stream never connects (no answer, busy, ...).
+"""
+
+import asyncio
+import json
+import os
+
+from calls import calllog, context, db, persistence, prompts, warmup
+
+# Ask the LLM for a personalized opener by default (make-call can override per call)
+PREANSWER_LLM_GREETING = os.environ.get("PREANSWER_LLM_GREETING", "false").lower() == "true"
+
+# How long a prepared call is kept waiting for its media stream
+PREANSWER_TTL_SECONDS = int(os.environ.get("PREANSWER_TTL_SECONDS", "120"))
+
+OPENER_INSTRUCTION = (
+    "The call has just been answered. Say your opening line in one short sentence: greet the "
+    "person (by name if you know it) and say why you are calling. Output only the words to speak."
+)
+
+_pending = {}  # call_sid -> PreAnswer
+
+
+class PreAnswer:
+    """Everything prepared for one outbound call before it was answered."""
+
+    def __init__(self, call_sid):
+        self.call_sid = call_sid
+        self.context_data = None
+        self.context_fetched = False
+        self.prompt = None  # prompts.CompiledPrompt
+        self.greeting = None
+        self.audio = None
+        self.done = asyncio.Event()
+        self.error = None
+
+
+def start(session, personalize=PREANSWER_LLM_GREETING):
+    """
+    Kick off preparation for a freshly dialed call from sync code (the view).
+    Returns False when there is no server loop to run it on (e.g. WSGI/tests).
+    """
+    return warmup.submit(prepare(
+        session.id,
+        session.call_sid,
+        session.system_prompt,
+        session.context_url,
+        session.context_headers,
+        personalize,
+    )) is not None
+
+
+async def take(call_sid, timeout, log=None):
+    """
+    Hand the prepared call to its consumer, waiting up to ``timeout`` seconds
+    for preparation still in flight. Returns None if nothing was prepared in
+    time; after a failure, whatever was finished (context, prompt) is kept.
+    ``log`` is the call's ``CallLogger``.
+    """
+    pre = _pending.pop(call_sid, None)
+    if pre is None:
+        return None
+    if not pre.done.is_set():
+        try:
+            await asyncio.wait_for(pre.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            (log or _log(call_sid)).warning('preanswer_late', "Preparing at pickup instead", timeout_s=timeout)
+            return None
+    return pre
+
+
+async def prepare(session_id, call_sid, base_prompt, context_url, context_headers, personalize):
+    from calls.consumers import GREETING_TEXT, generate_opener, synthesize_ulaw, tts_cache, tts_cache_key
+
+    pre = PreAnswer(call_sid)
+    log = _log(call_sid)
+    _pending[call_sid] = pre
+    asyncio.get_running_loop().call_later(PREANSWER_TTL_SECONDS, _expire, call_sid, pre)
+
+    try:
+        if context_url:
+            try:
+                pre.context_data = await _fetch_context(session_id, context_url, context_headers, log)
+            except Exception as e:
+                # Same as at pickup: carry on without context rather than fetch it again
+                log.warning('preanswer_context_error', repr(e))
+            pre.context_fetched = True
+        pre.prompt = prompts.compile_system_prompt(base_prompt, pre.context_data)
+
+        if personalize:
+            opener = await generate_opener(pre.prompt.text, OPENER_INSTRUCTION)
+            pre.greeting = (opener or "").strip().strip('"')
+        if not pre.greeting:
+            pre.greeting = GREETING_TEXT
+
+        key = tts_cache_key(pre.greeting)
+        if pre.greeting == GREETING_TEXT and tts_cache.has(key):
+            pre.audio = tts_cache.get(key)
+        else:
+            pre.audio = await synthesize_ulaw(pre.greeting)
+        log.info('preanswer_ready', greeting_bytes=len(pre.audio))
+    except Exception as e:
+        pre.error = e
+        log.error('preanswer_failed', repr(e))
+    finally:
+        pre.done.set()
+
+
+def _log(call_sid):
+    # No consumer yet: the call is only known by its sid
+    log = calllog.CallLogger(sampled=False)
+    log.bind(call_sid, None)
+    return log
+
+
+def _expire(call_sid, pre):
+    if _pending.get(call_sid) is pre:
+        del _pending[call_sid]
+
+
+async def _fetch_context(session_id, url, headers, log):
+    from calls.models import CallEvent, CallSession
+
+    try:
+        context_data = await context.cache.get(url, headers)
+    except context.ContextError as e:
+        persistence.buffer.add(CallEvent(session_id=session_id, event_type='error', detail=str(e)))
+        return None
+
+    await db.run(CallSession.objects.filter(id=session_id).update, context_data=context_data)
+    persistence.buffer.add(CallEvent(session_id=session_id, event_type='context_fetched', detail=json.dumps(context_data)[:500]))
+    log.info('preanswer_context_fetched', url)
+    return context_data
@@ -0,0 +1,153 @@
+"""
+System prompt compiler.
+
+The system prompt used to be the session prompt plus the caller's context
+as ``json.dumps(..., indent=2)``: every field the CRM returned, with all its
+indentation and quoting, resent on every turn. ``compile_system_prompt``
+builds it once per call instead:
+
+- the session (campaign) prompt comes first, whitespace-normalized, so
+  every turn of a call and every call of a campaign start with the same
+  bytes; providers that cache prompt prefixes can reuse it
+- the caller context follows as compact ``key: value`` lines, limited to
+  ``PROMPT_CONTEXT_FIELDS`` (dotted paths, e.g. ``name,account.plan``) when
+  set, with long values and the whole block cut to size
+
+The returned ``CompiledPrompt`` knows its size and how much of it is the
+shared prefix; the consumer reports both once per call.
+"""
+
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+from calls import metrics
+from calls.memory import estimate_tokens
+
+# Context fields to include, as comma-separated dotted paths (empty = all fields)
+PROMPT_CONTEXT_FIELDS = [f.strip() for f in os.environ.get("PROMPT_CONTEXT_FIELDS", "").split(",") if f.strip()]
+
+# Max characters of rendered context, and per value
+PROMPT_CONTEXT_MAX_CHARS = int(os.environ.get("PROMPT_CONTEXT_MAX_CHARS", "1200"))
+PROMPT_CONTEXT_VALUE_CHARS = int(os.environ.get("PROMPT_CONTEXT_VALUE_CHARS", "200"))
+
+CONTEXT_HEADER = "About the person you are calling:"
+MAX_DEPTH = 4
+MAX_LIST_ITEMS = 10
+
+SYSTEM_TOKENS = metrics.histogram('prompt_system_tokens', 'Estimated system prompt tokens per call',
+                                  buckets=(100, 250, 500, 1000, 1500, 2000, 3000, 4000))
+PREFIX_SHARE = metrics.histogram('prompt_prefix_share', 'Share of the system prompt that is the shared prefix, per call',
+                                 buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 1.0))
+PREFIXES = {
+    result: metrics.counter('prompt_prefixes_total', 'Calls whose prompt prefix was seen before in this process',
+                            {'result': result})
+    for result in ('repeat', 'new')
+}
+
+_seen_prefixes = OrderedDict()  # prefix hash -> None, bounded LRU
+_SEEN_MAX = 1024
+_WHITESPACE = re.compile(r'\s+')
+
+
+class CompiledPrompt:
+    """A call's system prompt: ``text`` = ``prefix`` (shared) + the caller-specific rest."""
+
+    def __init__(self, prefix, context='', context_fields=0, dropped_fields=0):
+        self.prefix = prefix
+        self.text = f"{prefix}\n\n{CONTEXT_HEADER}\n{context}" if context else prefix
+        self.context_fields = context_fields
+        self.dropped_fields = dropped_fields
+        self.prefix_hash = hashlib.sha256(prefix.encode()).hexdigest()[:12]
+
+    @property
+    def tokens(self):
+        return estimate_tokens(self.text)
+
+    @property
+    def prefix_share(self):
+        return len(self.prefix) / len(self.text) if self.text else 1.0
+
+    def report(self):
+        """Record metrics for this call's prompt; returns a one-line summary for the call log."""
+        repeat = self.prefix_hash in _seen_prefixes
+        _seen_prefixes[self.prefix_hash] = None
+        _seen_prefixes.move_to_end(self.prefix_hash)
+        if len(_seen_prefixes) > _SEEN_MAX:
+            _seen_prefixes.popitem(last=False)
+
+        SYSTEM_TOKENS.observe(self.tokens)
+        PREFIX_SHARE.observe(self.prefix_share)
+        PREFIXES['repeat' if repeat else 'new'].inc()
+        return (f"chars={len(self.text)} tokens~{self.tokens} prefix={self.prefix_hash} "
+                f"prefix_share={self.prefix_share:.2f} prefix_seen={'yes' if repeat else 'no'} "
+                f"context_fields={self.context_fields} dropped={self.dropped_fields}")
+
+
+def normalize(text):
+    """Byte-stable form of a prompt: no trailing whitespace, ``\\n`` line ends."""
+    return "\n".join(line.rstrip() for line in text.strip().splitlines())
+
+
+def compile_system_prompt(base_prompt, context_data, fields=None, max_chars=None, value_chars=None):
+    fields = PROMPT_CONTEXT_FIELDS if fields is None else fields
+    max_chars = PROMPT_CONTEXT_MAX_CHARS if max_chars is None else max_chars
+    value_chars = PROMPT_CONTEXT_VALUE_CHARS if value_chars is None else value_chars
+
+    prefix = normalize(base_prompt)
+    if not context_data:
+        return CompiledPrompt(prefix)
+
+    pairs = []
+    if fields:
+        for path in fields:
+            value = _lookup(context_data, path)
+            if value is not None:
+                _flatten(value, path, pairs, 0)
+    else:
+        _flatten(context_data, '', pairs, 0)
+
+    lines, size = [], 0
+    for key, value in pairs:
+        line = f"{key}: {_clip(value, value_chars)}" if key else _clip(value, value_chars)
+        if size + len(line) + 1 > max_chars:
+            break
+        lines.append(line)
+        size += len(line) + 1
+    return CompiledPrompt(prefix, "\n".join(lines), len(lines), len(pairs) - len(lines))
+
+
+def _lookup(data, path):
+    for part in path.split('.'):
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
+
+
+def _flatten(value, path, out, depth):
+    if isinstance(value, dict) and depth < MAX_DEPTH:
+        for key in sorted(value, key=str):
+            _flatten(value[key], f"{path}.{key}" if path else str(key), out, depth + 1)
+    elif isinstance(value, list) and depth < MAX_DEPTH:
+        items = value[:MAX_LIST_ITEMS]
+        if all(not isinstance(item, (dict, list)) for item in items):
+            text = ", ".join(_scalar(item) for item in items if item not in (None, ''))
+            if text:
+                out.append((path, text))
+        else:
+            for i, item in enumerate(items):
+                _flatten(item, f"{path}[{i}]", out, depth + 1)
+    elif value not in (None, '', [], {}):
+        out.append((path, _scalar(value)))
+
+
+def _scalar(value):
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    return _WHITESPACE.sub(' ', str(value)).strip()
+
+
+def _clip(text, limit):
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
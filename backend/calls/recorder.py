@@ -0,0 +1,273 @@
+"""
+Call recording for offline replay.
+
+Echo drops, missed barge-ins and slow turns depend on the exact timing of a
+real conversation, so they rarely reproduce by calling in again. With
+``CALL_RECORD_DIR`` set, the consumer keeps a compact binary log of the
+call and writes it there at disconnect (``<call_sid>.callrec``):
+
+    TWILIO     non-media Twilio messages (start, stop, mark acks), as sent
+    MEDIA      inbound ulaw frames
+    STT        Deepgram results: transcript, is_final, confidence
+    LLM_*      each reply request, its first token, every token, errors
+    TTS_*      each reply's synthesis: start, text sent, audio length back
+
+Every record carries its time since the websocket connected, so
+``tests/bench_replay.py`` can feed the audio back through the consumer and
+serve the STT, LLM and TTS responses with their recorded timing. Only the
+length of TTS audio is kept (as ulaw bytes), not the audio itself; inbound
+audio is kept in full, since it drives the consumer's own VAD. Recordings
+hold caller audio and transcripts: turn them on for calls you may keep.
+
+File layout: ``MAGIC``, a version byte, a length-prefixed JSON header,
+then the zlib-compressed records. A record is a 9-byte header (kind,
+time in 0.1ms units, payload length) and the payload. Records are
+appended to a ``bytearray`` on the event loop and written in a worker
+thread at the end of the call. Inbound audio alone is about 30MB an hour, so
+the buffer is capped at ``CALL_RECORD_MAX_MB``: a call that reaches it stops
+recording (the call itself goes on), the event is logged and counted, and
+the file is saved with what was recorded up to then and ``truncated`` set in
+its header.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+
+from calls import calllog, metrics
+
+# Where recordings are written; empty (the default) turns recording off
+CALL_RECORD_DIR = os.environ.get("CALL_RECORD_DIR", "")
+
+# Fraction of calls recorded while CALL_RECORD_DIR is set
+CALL_RECORD_SAMPLE = float(os.environ.get("CALL_RECORD_SAMPLE", "1"))
+
+# Most a call's recording may hold in memory (about half an hour of inbound audio)
+CALL_RECORD_MAX_MB = float(os.environ.get("CALL_RECORD_MAX_MB", "16"))
+
+MAGIC = b'AICR'
+VERSION = 1
+
+TWILIO, MEDIA, STT, LLM_REQUEST, LLM_FIRST, LLM_TOKEN, LLM_ERROR, TTS_START, TTS_TEXT, TTS_AUDIO = range(1, 11)
+
+_RECORD = struct.Struct('<BII')
+_LENGTH = struct.Struct('<I')
+TICKS_PER_SECOND = 10000
+
+RECORDINGS = metrics.counter('call_recordings_total', 'Calls recorded for replay')
+RECORDING_BYTES = metrics.histogram('call_recording_bytes', 'Size of each call recording on disk',
+                                    buckets=(1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7))
+RECORDINGS_TRUNCATED = metrics.counter('call_recordings_truncated_total',
+                                       'Call recordings stopped at CALL_RECORD_MAX_MB')
+
+process_log = calllog.CallLogger(sampled=False)
+
+
+class CallRecorder:
+    """Append-only record log for one call; times are relative to ``started`` (loop clock)."""
+
+    def __init__(self, directory, started, max_bytes=None, log=None):
+        self.directory = directory
+        self.started = started
+        self.started_wall = time.time()
+        self.max_bytes = int(CALL_RECORD_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        self.truncated = False
+        self.log = log or process_log
+        self._loop = asyncio.get_running_loop()
+        self._buf = bytearray()
+
+    def _add(self, kind, payload=b''):
+        if self.truncated:
+            return
+        if len(self._buf) + _RECORD.size + len(payload) > self.max_bytes:
+            # Stop whole rather than drop single records, so what was kept still replays as it happened
+            self.truncated = True
+            RECORDINGS_TRUNCATED.inc()
+            self.log.warning('recording_truncated', "Recording reached its size cap; the call goes on unrecorded",
+                             max_bytes=self.max_bytes)
+            return
+        ticks = int((self._loop.time() - self.started) * TICKS_PER_SECOND)
+        self._buf += _RECORD.pack(kind, ticks, len(payload))
+        self._buf += payload
+
+    def twilio(self, text):
+        self._add(TWILIO, text.encode())
+
+    def media(self, audio):
+        self._add(MEDIA, audio)
+
+    def transcript(self, text, is_final, confidence):
+        self._add(STT, json.dumps({'text': text, 'final': bool(is_final), 'confidence': confidence}).encode())
+
+    def llm_request(self):
+        self._add(LLM_REQUEST)
+
+    def llm_first(self):
+        self._add(LLM_FIRST)
+
+    def llm_token(self, text):
+        self._add(LLM_TOKEN, text.encode())
+
+    def llm_error(self, error):
+        self._add(LLM_ERROR, repr(error).encode())
+
+    def tts_start(self):
+        self._add(TTS_START)
+
+    def tts_audio(self, length):
+        self._add(TTS_AUDIO, _LENGTH.pack(length))
+
+    async def tts_text(self, text_iterator):
+        """Pass ``text_iterator`` through, recording each chunk as TTS takes it."""
+        async for chunk in text_iterator:
+            self._add(TTS_TEXT, chunk.encode())
+            yield chunk
+
+    async def save(self, name, **meta):
+        """
+        Write the recording as ``<name>.callrec``; returns its path. ``name``
+        comes from Twilio (the call or stream sid), so anything but word
+        characters and dashes is replaced and the file always lands in the
+        recording directory.
+        """
+        safe_name = re.sub(r'[^\w-]', '_', name)
+        path = os.path.join(self.directory, f"{safe_name}.callrec")
+        if os.path.dirname(os.path.realpath(path)) != os.path.realpath(self.directory):
+            raise ValueError(f"Recording name {name!r} escapes {self.directory}")
+        header = json.dumps({'version': VERSION, 'started': self.started_wall, 'truncated': self.truncated,
+                             **meta}).encode()
+        body = bytes(self._buf)
+        self._buf = bytearray()
+
+        def write():
+            os.makedirs(self.directory, exist_ok=True)
+            data = MAGIC + bytes([VERSION]) + _LENGTH.pack(len(header)) + header + zlib.compress(body, 6)
+            with open(path, 'wb') as f:
+                f.write(data)
+            return len(data)
+
+        RECORDING_BYTES.observe(await asyncio.to_thread(write))
+        RECORDINGS.inc()
+        return path
+
+
+def start_call(started, directory=None, sample=None, max_bytes=None, log=None):
+    """A recorder for a new call, or None if recording is off or the call isn't sampled."""
+    directory = CALL_RECORD_DIR if directory is None else directory
+    sample = CALL_RECORD_SAMPLE if sample is None else sample
+    if not directory or random.random() >= sample:
+        return None
+    return CallRecorder(directory, started, max_bytes=max_bytes, log=log)
+
+
+# ------------------------------------------------------------------
+# Reading
+# ------------------------------------------------------------------
+
+@dataclass
+class LLMReply:
+    """One recorded LLM request: time to first token, then (gap, text) per token."""
+    at: float
+    first_delay: float = None
+    tokens: list = field(default_factory=list)
+    error: str = None
+
+
+@dataclass
+class TTSReply:
+    """
+    One recorded synthesis. ``first_delay`` runs from the first text sent
+    (from the start if no text was, e.g. cached audio) to the first audio;
+    ``chunks`` are (seconds after the first audio, length in bytes).
+    """
+    at: float
+    first_text_at: float = None
+    first_delay: float = None
+    chunks: list = field(default_factory=list)
+
+
+@dataclass
+class Recording:
+    meta: dict
+    records: list     # (kind, seconds, payload)
+
+    def twilio(self):
+        """(seconds, message text) for every recorded non-media Twilio message."""
+        return [(t, payload.decode()) for kind, t, payload in self.records if kind == TWILIO]
+
+    def media(self):
+        return [(t, payload) for kind, t, payload in self.records if kind == MEDIA]
+
+    def transcripts(self):
+        return [(t, json.loads(payload)) for kind, t, payload in self.records if kind == STT]
+
+    def llm_replies(self):
+        replies = []
+        last = None
+        for kind, t, payload in self.records:
+            if kind == LLM_REQUEST:
+                replies.append(LLMReply(at=t))
+                last = None
+            elif not replies:
+                continue
+            elif kind == LLM_FIRST:
+                replies[-1].first_delay = t - replies[-1].at
+                last = t
+            elif kind == LLM_TOKEN and last is not None:
+                replies[-1].tokens.append((t - last, payload.decode()))
+                last = t
+            elif kind == LLM_ERROR:
+                replies[-1].error = payload.decode()
+        return replies
+
+    def tts_replies(self):
+        replies = []
+        first_audio = None
+        for kind, t, payload in self.records:
+            if kind == TTS_START:
+                replies.append(TTSReply(at=t))
+                first_audio = None
+            elif not replies:
+                continue
+            elif kind == TTS_TEXT and replies[-1].first_text_at is None:
+                replies[-1].first_text_at = t
+            elif kind == TTS_AUDIO:
+                reply = replies[-1]
+                if first_audio is None:
+                    first_audio = t
+                    reply.first_delay = t - (reply.first_text_at if reply.first_text_at is not None else reply.at)
+                reply.chunks.append((t - first_audio, _LENGTH.unpack(payload)[0]))
+        return replies
+
+    @property
+    def duration(self):
+        return self.records[-1][1] if self.records else 0.0
+
+
+def load(path):
+    """Read a ``.callrec`` file."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path} is not a call recording")
+    if data[4] != VERSION:
+        raise ValueError(f"{path} is recording version {data[4]}, expected {VERSION}")
+    (header_len,) = _LENGTH.unpack_from(data, 5)
+    start = 5 + _LENGTH.size
+    meta = json.loads(data[start:start + header_len])
+    body = zlib.decompress(data[start + header_len:])
+
+    records = []
+    offset = 0
+    while offset < len(body):
+        kind, ticks, length = _RECORD.unpack_from(body, offset)
+        offset += _RECORD.size
+        records.append((kind, ticks / TICKS_PER_SECOND, body[offset:offset + length]))
+        offset += length
+    return Recording(meta, records)
@@ -0,0 +1,183 @@
+"""
+Incremental sentence segmentation of streamed LLM output for TTS.
+
+TTS sounds best when it is handed whole sentences, but waiting for a full
+sentence before any audio starts adds latency to every reply. The
+segmenter sits between the two: tokens are pushed in as they arrive and
+complete segments come out as soon as their boundary is certain.
+
+Boundaries are only decided at the whitespace *after* punctuation, so
+"3.5", "3,000" and "e.g." in the middle of a token run never split. A
+period after a known abbreviation ("Dr.", "Mrs.") or a single-letter
+initial does not end a sentence either.
+
+The first segment of a reply is the one the caller waits for, so it does
+not wait for that whitespace: a token ending in "!" or "?", or in "." or
+a clause break after an ordinary word, releases it at once. Only a digit
+("3." may become "3.50") or an abbreviation holds it for the next token.
+"""
+
+import re
+
+ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'ave', 'vs', 'etc',
+    'e.g', 'i.e', 'a.m', 'p.m', 'u.s', 'inc', 'ltd', 'co', 'corp', 'approx', 'dept', 'est',
+})
+
+TERMINALS = '.!?'
+SOFT = ',;:'
+CLOSERS = '"\')]”’'
+
+_SPACE = re.compile(r'\s')
+
+
+class SentenceSegmenter:
+    """
+    Splits a token stream into speakable segments.
+
+    - ``min_chars``: sentences shorter than this are held back and merged
+      with the next one, so TTS isn't fed "Okay." on its own
+    - ``max_chars``: a segment with no sentence boundary is cut here, at the
+      last clause break (comma, semicolon, colon) or else the last space
+    - ``first_clause_words``: the first segment of a reply is released at
+      the first clause break once it has this many words, and at any
+      sentence end regardless of ``min_chars``
+    - ``first_max_words``: the first segment is cut at a word boundary once
+      it reaches this many words even without punctuation
+
+    ``push(text)`` returns the segments completed by ``text``; ``flush()``
+    returns whatever is left at the end of the stream. Scanning resumes where
+    the previous push stopped and only stops at whitespace, so the cost per
+    token is proportional to the token, not to the buffered text.
+    """
+
+    def __init__(self, min_chars=40, max_chars=250, first_clause_words=4, first_max_words=12,
+                 abbreviations=ABBREVIATIONS):
+        if min_chars > max_chars:
+            raise ValueError("min_chars must not exceed max_chars")
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.first_clause_words = first_clause_words
+        self.first_max_words = first_max_words
+        self.abbreviations = abbreviations
+        self.reset()
+
+    def reset(self):
+        self._buf = ""
+        self._pos = 0           # Next index of _buf to scan
+        self._words = 0         # Words completed in _buf
+        self._last_sentence = 0 # End of the last sentence boundary in _buf (0 = none)
+        self._last_clause = 0   # End of the last clause break in _buf
+        self._last_space = 0    # Index of the last whitespace in _buf
+        self.segments = 0       # Segments emitted for this stream
+
+    def push(self, text):
+        out = []
+        if not self._buf:
+            text = text.lstrip()
+        self._buf += text
+        buf = self._buf
+        n = len(buf)
+        pos = self._pos
+
+        while pos < n:
+            # Jump straight to the next whitespace; nothing else can complete a boundary
+            match = _SPACE.search(buf, pos)
+            space = match.start() if match else n
+            if space >= self.max_chars:
+                self._emit(out, self._last_sentence or self._last_clause or self._last_space or self.max_chars)
+                buf, n, pos = self._buf, len(self._buf), self._pos
+                continue
+            if not match:
+                pos = n
+                break
+
+            pos = space + 1
+            if buf[space] == '\n':
+                # The buffer never starts with whitespace, so this ends a non-empty line
+                self._emit(out, pos)
+                buf, n, pos = self._buf, len(self._buf), self._pos
+                continue
+            if buf[space - 1].isspace():
+                continue
+
+            self._words += 1
+            self._last_space = space
+            kind = self._boundary_kind(buf, space)
+            if kind and self._should_emit(kind, space):
+                self._emit(out, space)
+                buf, n, pos = self._buf, len(self._buf), self._pos
+                continue
+            if kind == 'sentence':
+                self._last_sentence = space
+            elif kind == 'clause':
+                self._last_clause = space
+
+            if self.segments == 0 and self._words >= self.first_max_words:
+                self._emit(out, space)
+                buf, n, pos = self._buf, len(self._buf), self._pos
+
+        self._pos = pos
+        if self.segments == 0 and n and self._ends_first_segment(buf):
+            self._emit(out, n)
+        return out
+
+    def flush(self):
+        """Return the rest of the stream (or None) and reset for the next one."""
+        tail = self._buf.strip()
+        self.reset()
+        return tail or None
+
+    def _boundary_kind(self, buf, space):
+        """Classify the text just before whitespace at ``space``."""
+        end = space - 1
+        while end > 0 and buf[end] in CLOSERS:
+            end -= 1
+        c = buf[end]
+        if c in TERMINALS:
+            if c == '.' and self._is_abbreviation(buf, end):
+                return None
+            return 'sentence'
+        if c in SOFT or c == '—':
+            return 'clause'
+        return None
+
+    def _ends_first_segment(self, buf):
+        """Whether the punctuation the buffer ends with already ends the first segment."""
+        end = len(buf) - 1
+        while end > 0 and buf[end] in CLOSERS:
+            end -= 1
+        c = buf[end]
+        if end == 0 or not buf[end - 1].isalpha():
+            return False  # "3." and "3," may go on as "3.50" and "3,000"
+        if c in '!?':
+            return True
+        if c == '.':
+            return not self._is_abbreviation(buf, end)
+        if c in SOFT or c == '—':
+            # The word before the break hasn't been counted yet: no whitespace after it
+            return self._words + 1 >= self.first_clause_words
+        return False
+
+    def _is_abbreviation(self, buf, dot):
+        start = buf.rfind(' ', 0, dot) + 1
+        word = buf[start:dot].lstrip('("\'').lower()
+        if len(word) == 1 and word.isalpha():
+            return True  # Initial, e.g. "J. Smith"
+        return word in self.abbreviations
+
+    def _should_emit(self, kind, end):
+        if self.segments == 0:
+            return kind == 'sentence' or self._words >= self.first_clause_words
+        return kind == 'sentence' and end >= self.min_chars
+
+    def _emit(self, out, end):
+        segment = self._buf[:end].strip()
+        if segment:
+            out.append(segment)
+            self.segments += 1
+        rest = self._buf[end:].lstrip()
+        self._buf = rest
+        self._pos = 0
+        self._words = 0
+        self._last_sentence = self._last_clause = self._last_space = 0
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import CallSession, ConversationMessage, CallEvent
+from .models import CallSession, ConversationMessage, CallEvent, CallTurn
 
 
 class ConversationMessageSerializer(serializers.ModelSerializer):
@@ -14,9 +14,20 @@ class CallEventSerializer(serializers.ModelSerializer):
         fields = ['event_type', 'detail', 'timestamp']
 
 
+class CallTurnSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CallTurn
+        fields = [
+            'index', 'started_at', 'measured_from', 'interrupted',
+            'stt_final_ms', 'debounce_fired_ms', 'llm_request_ms', 'llm_first_token_ms',
+            'tts_first_byte_ms', 'first_frame_sent_ms', 'playback_marked_ms',
+        ]
+
+
 class CallSessionSerializer(serializers.ModelSerializer):
     messages = ConversationMessageSerializer(many=True, read_only=True)
     events = CallEventSerializer(many=True, read_only=True)
+    turns = CallTurnSerializer(many=True, read_only=True)
 
     class Meta:
         model = CallSession
@@ -24,7 +35,7 @@ class CallSessionSerializer(serializers.ModelSerializer):
             'id', 'call_sid', 'from_number', 'to_number', 'status',
             'started_at', 'ended_at', 'duration_seconds',
             'system_prompt', 'context_url', 'context_data',
-            'messages', 'events'
+            'messages', 'events', 'turns'
         ]
 
 
@@ -43,6 +54,8 @@ class MakeCallRequestSerializer(serializers.Serializer):
     system_prompt = serializers.CharField(required=False, allow_blank=True)
     context_url = serializers.URLField(required=False, allow_blank=True)
     context_headers = serializers.DictField(required=False)
+    # None (not given) means PREANSWER_LLM_GREETING; a plain BooleanField would read a missing form field as False
+    personalize_greeting = serializers.BooleanField(required=False, allow_null=True, default=None)
 
     def validate_to(self, value):
         # Basic validation to ensure it looks like a phone number
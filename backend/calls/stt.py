@@ -0,0 +1,175 @@
+"""
+Decoupled delivery of inbound caller audio to the STT socket.
+
+Twilio sends a 20ms media frame roughly every 20ms. Awaiting the Deepgram
+send for each one inside the websocket receive loop means a slow STT socket
+stalls everything behind it, including ``mark`` and ``stop`` handling.
+
+``AudioSendQueue`` gives each call a bounded queue: the receive loop only
+enqueues, and a dedicated sender task coalesces frames into ~100ms batches
+so the STT socket sees a fifth of the sends.
+"""
+
+import asyncio
+import weakref
+from collections import deque
+
+from calls import calllog, metrics
+
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+
+ULAW_BYTES_PER_MS = 8
+
+QUEUE_DEPTH = metrics.gauge('stt_queue_frames', 'Inbound audio frames waiting to be sent to STT (all calls)')
+QUEUE_LATENCY = metrics.histogram('stt_queue_latency_seconds', 'Age of the oldest frame in each STT batch when sent')
+FRAMES_IN = metrics.counter('stt_frames_enqueued_total', 'Inbound audio frames queued for STT (counted as they leave the queue)')
+FRAMES_DROPPED = metrics.counter('stt_frames_dropped_total', 'Inbound audio frames dropped on queue overflow')
+SENDS = metrics.counter('stt_sends_total', 'Batched sends to the STT socket')
+SEND_ERRORS = metrics.counter('stt_send_errors_total', 'Failed sends to the STT socket')
+
+process_log = calllog.CallLogger(sampled=False)
+
+# Per-frame work stays off the metrics: frames are counted per batch and the depth at scrape time
+_live = weakref.WeakSet()
+
+
+@metrics.on_collect
+def report_depth():
+    QUEUE_DEPTH.set(sum(len(queue) for queue in list(_live)))
+
+
+class AudioSendQueue:
+    """
+    Bounded per-call queue drained by a coalescing sender task.
+
+    ``send`` is the STT connection's async send method. When the queue is
+    full, ``policy`` decides what happens to a new frame:
+
+    - ``drop_oldest``: discard the oldest queued frame (keeps latency bounded)
+    - ``block``: make ``put()`` wait for space (keeps every frame)
+
+    Send errors go to ``log``, the call's ``CallLogger``.
+    """
+
+    def __init__(self, send, max_frames=50, batch_ms=100, policy=DROP_OLDEST, log=None):
+        if policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.send = send
+        self.max_frames = max_frames
+        self.batch_seconds = batch_ms / 1000
+        self.batch_bytes = batch_ms * ULAW_BYTES_PER_MS
+        self.policy = policy
+        self.log = log or process_log
+
+        self._frames = deque()  # (frame, enqueued_at)
+        self._pending_bytes = 0
+        self._has_data = asyncio.Event()
+        self._batch_ready = asyncio.Event()
+        self._has_space = asyncio.Event()
+        self._has_space.set()
+        self._closed = False
+        self._task = None
+
+        self.dropped = 0
+        self.sends = 0
+        _live.add(self)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def put(self, frame):
+        if self._closed:
+            return
+        if len(self._frames) >= self.max_frames:
+            if self.policy == DROP_OLDEST:
+                dropped, _ = self._frames.popleft()
+                self._pending_bytes -= len(dropped)
+                self.dropped += 1
+                FRAMES_IN.inc()
+                FRAMES_DROPPED.inc()
+            else:
+                while len(self._frames) >= self.max_frames and not self._closed:
+                    self._has_space.clear()
+                    await self._has_space.wait()
+                if self._closed:
+                    return
+
+        self._frames.append((frame, asyncio.get_running_loop().time()))
+        self._pending_bytes += len(frame)
+        self._has_data.set()
+        if self._pending_bytes >= self.batch_bytes:
+            self._batch_ready.set()
+
+    async def close(self, flush=True, timeout=1.0):
+        """
+        Stop the sender. With ``flush`` an in-flight send is allowed to finish
+        and anything still queued is sent first (bounded by ``timeout``).
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._has_space.set()
+        if not flush:
+            self._discard()
+
+        if self._task:
+            # Wake the sender so it skips the coalescing wait and drains
+            self._has_data.set()
+            self._batch_ready.set()
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+            self._task = None
+        self._discard()
+
+    def _discard(self):
+        FRAMES_IN.inc(len(self._frames))
+        self._frames.clear()
+        self._pending_bytes = 0
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._has_data.wait()
+
+            # Coalesce: hold the batch until it is full or its oldest frame is batch_ms old
+            if self._frames and not self._closed:
+                wait = self._frames[0][1] + self.batch_seconds - loop.time()
+                if self._pending_bytes < self.batch_bytes and wait > 0:
+                    try:
+                        await asyncio.wait_for(self._batch_ready.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+
+            await self._send_batch()
+            if self._closed and not self._frames:
+                return
+
+    async def _send_batch(self):
+        frames = self._frames
+        self._has_data.clear()
+        if not frames:
+            return
+        now = asyncio.get_running_loop().time()
+        QUEUE_LATENCY.observe(now - frames[0][1])
+
+        batch = b"".join(frame for frame, _ in frames)
+        FRAMES_IN.inc(len(frames))
+        frames.clear()
+        self._pending_bytes = 0
+        self._has_data.clear()
+        self._batch_ready.clear()
+        self._has_space.set()
+
+        try:
+            await self.send(batch)
+            self.sends += 1
+            SENDS.inc()
+        except Exception as e:
+            SEND_ERRORS.inc()
+            self.log.error('stt_send_error', repr(e))
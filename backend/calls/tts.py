@@ -0,0 +1,252 @@
+"""
+Text-to-speech sessions.
+
+A TTS session lives for one call and turns each reply's stream of text
+chunks into a stream of audio chunks. Two providers implement the same
+interface, picked by ``TTS_PROVIDER``:
+
+- ``http``: one ElevenLabs streaming HTTP request per reply
+  (``convert_as_stream``). Every reply pays connection setup and model
+  warm-up again.
+- ``websocket``: one ElevenLabs multi-context input-streaming websocket per
+  call, opened at call start and reused by every reply. Each reply gets its
+  own context on the shared socket, so cancelling one on barge-in never
+  costs a reconnect.
+
+The websocket URL is configurable so a local fake server can stand in for
+ElevenLabs in tests and benchmarks (see ``tests/fakes.py``).
+
+Interface::
+
+    session = create_session(...)
+    await session.open()                 # optional warm-up at call start
+    async for audio in session.stream(text_chunks):
+        ...                              # raw audio in the session's output_format
+    session.cancel()                     # barge-in: drop the reply in progress
+    await session.close()
+"""
+
+import asyncio
+import base64
+import itertools
+import json
+from urllib.parse import urlencode
+
+import aiohttp
+
+from calls import http, metrics
+
+HTTP = 'http'
+WEBSOCKET = 'websocket'
+
+DEFAULT_WS_URL = 'wss://api.elevenlabs.io/v1/text-to-speech/{voice_id}/multi-stream-input'
+
+TTS_CONNECTS = metrics.counter('tts_ws_connects_total', 'TTS websocket connections opened')
+TTS_CANCELS = metrics.counter('tts_replies_cancelled_total', 'TTS replies cancelled mid-stream')
+TTS_FIRST_AUDIO = metrics.histogram('tts_first_audio_seconds', 'First text chunk sent to first audio received, per reply')
+
+
+class TTSError(Exception):
+    pass
+
+
+class TTSSession:
+    """Base class: one call's TTS. Subclasses implement ``stream``."""
+
+    async def open(self):
+        pass
+
+    def stream(self, text_iterator):
+        """Async iterator of audio chunks for one reply."""
+        raise NotImplementedError
+
+    def cancel(self):
+        """Stop the reply in progress; audio still in flight for it is dropped."""
+
+    async def close(self):
+        pass
+
+
+class HTTPStreamSession(TTSSession):
+    """One ``convert_as_stream`` request per reply (the original behaviour)."""
+
+    def __init__(self, client, voice_id, model_id, output_format):
+        self.client = client
+        self.voice_id = voice_id
+        self.model_id = model_id
+        self.output_format = output_format
+
+    def stream(self, text_iterator):
+        return self.client.text_to_speech.convert_as_stream(
+            voice_id=self.voice_id,
+            text=text_iterator,
+            model_id=self.model_id,
+            output_format=self.output_format,
+            optimize_streaming_latency=3,
+        )
+
+
+class WebSocketStreamSession(TTSSession):
+    """
+    ElevenLabs multi-context input streaming over one websocket per call.
+
+    Per reply: a new ``context_id`` is initialised, text chunks are sent as
+    they arrive, and at the end of the text the context is flushed and
+    closed; the server answers with ``isFinal`` once the last audio for it
+    has been sent. A single reader task routes incoming audio to the reply
+    that owns the context, so audio for a cancelled context is just dropped.
+    If the socket has closed between replies (idle timeout, network), the
+    next reply reconnects.
+    """
+
+    def __init__(self, api_key, voice_id, model_id, output_format, url=DEFAULT_WS_URL,
+                 inactivity_timeout=180, connect_timeout=5):
+        query = urlencode({
+            'model_id': model_id,
+            'output_format': output_format,
+            'inactivity_timeout': inactivity_timeout,
+        })
+        self.url = f"{url.format(voice_id=voice_id)}?{query}"
+        self.api_key = api_key
+        self.connect_timeout = connect_timeout
+
+        self._ws = None
+        self._reader = None
+        self._connecting = None
+        self._contexts = {}       # context_id -> asyncio.Queue of audio bytes / None (final) / Exception
+        self._current = None
+        self._ids = itertools.count(1)
+
+    async def open(self):
+        await self._ensure_connected()
+
+    async def _ensure_connected(self):
+        if self._ws is not None and not self._ws.closed:
+            return
+        # Concurrent callers share one connection attempt
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._connect())
+        connecting = self._connecting
+        try:
+            await asyncio.shield(connecting)
+        finally:
+            # Whichever waiter gets here first clears it; the others must not touch a newer attempt
+            if connecting.done() and self._connecting is connecting:
+                self._connecting = None
+
+    async def _connect(self):
+        self._ws = await asyncio.wait_for(
+            http.websocket_session().ws_connect(self.url, headers={'xi-api-key': self.api_key}, heartbeat=30),
+            self.connect_timeout,
+        )
+        TTS_CONNECTS.inc()
+        self._reader = asyncio.create_task(self._read(self._ws))
+
+    async def _read(self, ws):
+        error = None
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                queue = self._contexts.get(data.get('contextId'))
+                if data.get('error'):
+                    # Errors may not name a context; then every reply in flight gets it
+                    for target in [queue] if queue else list(self._contexts.values()):
+                        target.put_nowait(TTSError(data['error']))
+                    continue
+                if queue is None:
+                    continue  # Cancelled or unknown context
+                if data.get('audio'):
+                    queue.put_nowait(base64.b64decode(data['audio']))
+                if data.get('isFinal'):
+                    queue.put_nowait(None)
+        except Exception as e:
+            error = e
+        # Socket gone: fail whatever was still waiting on it
+        for queue in self._contexts.values():
+            queue.put_nowait(TTSError(f"TTS websocket closed: {error or ws.close_code}"))
+
+    async def _send(self, message):
+        await self._ws.send_str(json.dumps(message))
+
+    async def stream(self, text_iterator):
+        await self._ensure_connected()
+        context_id = f"reply-{next(self._ids)}"
+        queue = asyncio.Queue()
+        self._contexts[context_id] = queue
+        self._current = context_id
+        loop = asyncio.get_running_loop()
+        sent_at = None
+        finished = False
+
+        async def send_text():
+            nonlocal sent_at
+            try:
+                await self._send({'text': ' ', 'context_id': context_id})
+                async for chunk in text_iterator:
+                    if chunk and chunk.strip():
+                        if sent_at is None:
+                            sent_at = loop.time()
+                        await self._send({'text': chunk, 'context_id': context_id})
+                await self._send({'context_id': context_id, 'flush': True})
+                await self._send({'context_id': context_id, 'close_context': True})
+            except Exception as e:
+                queue.put_nowait(e)
+
+        # Text goes out while audio comes back
+        sender = asyncio.create_task(send_text())
+        try:
+            first = True
+            while True:
+                item = await queue.get()
+                if item is None:
+                    finished = True
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if first and sent_at is not None:
+                    TTS_FIRST_AUDIO.observe(loop.time() - sent_at)
+                    first = False
+                yield item
+        finally:
+            if not sender.done():
+                sender.cancel()
+            self._contexts.pop(context_id, None)
+            if self._current == context_id:
+                self._current = None
+            if not finished:
+                self._close_context(context_id)
+
+    def cancel(self):
+        context_id, self._current = self._current, None
+        if context_id:
+            TTS_CANCELS.inc()
+            queue = self._contexts.pop(context_id, None)
+            if queue is not None:
+                queue.put_nowait(None)
+            self._close_context(context_id)
+
+    def _close_context(self, context_id):
+        # Fire-and-forget: may run from a cancelled task, and audio for it is ignored anyway
+        if self._ws is not None and not self._ws.closed:
+            task = asyncio.ensure_future(self._send({'context_id': context_id, 'close_context': True}))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def close(self):
+        if self._ws is not None and not self._ws.closed:
+            try:
+                await self._send({'close_socket': True})
+            except Exception:
+                pass
+            await self._ws.close()
+        if self._reader:
+            self._reader.cancel()
+
+
+def create_session(provider, client, api_key, voice_id, model_id, output_format, ws_url=DEFAULT_WS_URL):
+    if provider == HTTP:
+        return HTTPStreamSession(client, voice_id, model_id, output_format)
+    if provider == WEBSOCKET:
+        return WebSocketStreamSession(api_key, voice_id, model_id, output_format, url=ws_url)
+    raise ValueError(f"Unknown TTS provider: {provider}")
@@ -0,0 +1,144 @@
+"""
+Cache of synthesized audio for phrases the AI says over and over.
+
+The greeting, the goodbye and the error apology are identical on every call,
+yet each one used to cost a full ElevenLabs round trip (~1s) and characters
+of quota. ``TTSCache`` keeps the finished Twilio-ready ulaw audio keyed by
+everything that affects the sound: text, voice, model and output format.
+
+Two tiers:
+
+- memory: an LRU bounded by total bytes, not entry count, since one long
+  phrase can outweigh dozens of short ones
+- disk (optional): one file per phrase, read back through ``mmap`` so worker
+  processes on the same host share the pages instead of each holding a copy
+"""
+
+import hashlib
+import mmap
+import os
+from collections import OrderedDict
+
+from calls import calllog, metrics
+
+process_log = calllog.CallLogger(sampled=False)
+
+LOOKUPS_HIT = metrics.counter('tts_cache_lookups_total', 'TTS cache lookups', {'result': 'hit'})
+LOOKUPS_MISS = metrics.counter('tts_cache_lookups_total', 'TTS cache lookups', {'result': 'miss'})
+HIT_RATIO = metrics.gauge('tts_cache_hit_ratio', 'Share of TTS cache lookups served from cache')
+BYTES_SERVED = metrics.counter('tts_cache_served_bytes_total', 'Audio bytes played from the TTS cache')
+MEMORY_BYTES = metrics.gauge('tts_cache_memory_bytes', 'Audio bytes held in the in-memory TTS cache')
+
+
+class TTSCache:
+    """
+    Phrase-level audio cache.
+
+    ``get`` returns a bytes-like object (``bytes`` or a read-only ``mmap``)
+    or None; ``put`` stores in memory and, if a ``directory`` is set, on
+    disk. Keys come from ``TTSCache.key(text, voice_id, model, output_format)``.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._entries = OrderedDict()  # key -> audio, least recently used first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text, voice_id, model, output_format):
+        return (text.strip(), voice_id, model, output_format)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def has(self, key):
+        """True if ``key`` is cached in memory or on disk. Not counted as a lookup."""
+        return key in self._entries or (self.directory is not None and os.path.exists(self._path(key)))
+
+    def get(self, key):
+        audio = self._entries.get(key)
+        if audio is not None:
+            self._entries.move_to_end(key)
+        else:
+            audio = self._load(key)
+            if audio is not None:
+                self._remember(key, audio)
+
+        if audio is None:
+            self.misses += 1
+            LOOKUPS_MISS.inc()
+        else:
+            self.hits += 1
+            LOOKUPS_HIT.inc()
+            BYTES_SERVED.inc(len(audio))
+        HIT_RATIO.set(self.hit_ratio)
+        return audio
+
+    def put(self, key, audio):
+        if not audio:
+            return
+        audio = bytes(audio)
+        if self.directory is not None:
+            self._store(key, audio)
+        self._remember(key, audio)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+
+    def _remember(self, key, audio):
+        if len(audio) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old)
+        self._entries[key] = audio
+        self.bytes += len(audio)
+        while self.bytes > self.max_bytes:
+            # Evicted mmaps are not closed here: a reply may still be playing
+            # from one, and it is unmapped once the last reference goes
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= len(evicted)
+        MEMORY_BYTES.set(self.bytes)
+
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+
+    def _path(self, key):
+        digest = hashlib.sha256('\x1f'.join(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.ulaw")
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # ValueError: an empty file can't be mapped
+            return None
+        except OSError as e:
+            process_log.warning('tts_cache_read_error', repr(e))
+            return None
+
+    def _store(self, key, audio):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            # Created on first write, not at construction: the consumer builds its cache at import
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(audio)
+            # Atomic, so another process never maps a half-written file
+            os.replace(tmp, path)
+        except OSError as e:
+            process_log.warning('tts_cache_write_error', repr(e))
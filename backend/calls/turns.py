@@ -0,0 +1,143 @@
+"""
+Per-turn latency timeline.
+
+A turn runs from the caller going quiet to the reply being played back.
+``TurnTimeline`` records when each stage of it happened, on the event loop's
+monotonic clock:
+
+    user_audio_end     local VAD: the last voiced inbound frame
+    stt_final          Deepgram's final transcript (the last one of the turn)
+    debounce_fired     the debounce gave up waiting for more speech
+    llm_request        the LLM request went out
+    llm_first_token    the first token came back
+    tts_first_byte     the first TTS audio came back
+    first_frame_sent   the first frame of the reply went to Twilio
+    playback_marked    Twilio acked the reply's last mark (it was heard)
+
+At the end of the turn the timeline becomes one ``CallTurn`` row: each stage
+as milliseconds after ``user_audio_end`` (or after ``stt_final`` if VAD
+missed the speech), queued on the write-behind buffer like every other call
+row. ``latency_report`` turns the rows of a time window into p50/p90/p99
+per stage; ``/calls/turn-latency/`` serves it.
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from calls import metrics
+
+STAGES = (
+    'user_audio_end',
+    'stt_final',
+    'debounce_fired',
+    'llm_request',
+    'llm_first_token',
+    'tts_first_byte',
+    'first_frame_sent',
+    'playback_marked',
+)
+
+# The caller's wait: silence until the reply starts playing
+ROUND_TRIP = ('user_audio_end', 'first_frame_sent')
+
+PERCENTILES = (50, 90, 99)
+
+STAGE_SECONDS = {
+    stage: metrics.histogram('turn_stage_seconds', 'Time from the previous turn stage to this one', {'stage': stage})
+    for stage in STAGES[1:]
+}
+ROUND_TRIP_SECONDS = metrics.histogram('turn_round_trip_seconds', 'Caller stops speaking to first reply frame sent',
+                                       buckets=(0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 2.5, 3.0, 4.0, 6.0))
+
+
+class TurnTimeline:
+    """Stage times (loop clock seconds) for one turn."""
+
+    def __init__(self, index):
+        self.index = index
+        self.times = {}
+        self.interrupted = False
+
+    def mark(self, stage, at, first=True):
+        """Record ``stage`` at ``at``; with ``first`` an earlier time for the stage is kept."""
+        if at is not None and not (first and stage in self.times):
+            self.times[stage] = at
+
+    def origin(self):
+        return self.times.get('user_audio_end', self.times.get('stt_final'))
+
+    def offsets_ms(self):
+        """Stage -> milliseconds after the origin, for the stages that happened."""
+        origin = self.origin()
+        if origin is None:
+            return {}
+        return {stage: round((self.times[stage] - origin) * 1000) for stage in STAGES[1:] if stage in self.times}
+
+    def observe(self):
+        """Record the stage durations in the process metrics."""
+        previous = None
+        for stage in STAGES:
+            at = self.times.get(stage)
+            if at is None:
+                continue
+            if previous is not None:
+                STAGE_SECONDS[stage].observe(max(0.0, at - previous))
+            previous = at
+        if all(stage in self.times for stage in ROUND_TRIP):
+            ROUND_TRIP_SECONDS.observe(self.times[ROUND_TRIP[1]] - self.times[ROUND_TRIP[0]])
+
+    def to_model(self, session, now):
+        """An unsaved ``CallTurn``; ``now`` is the loop time matching the wall clock at this call."""
+        from calls.models import CallTurn
+        origin = self.origin()
+        started_at = timezone.now() - timedelta(seconds=now - origin) if origin is not None else timezone.now()
+        fields = {f"{stage}_ms": ms for stage, ms in self.offsets_ms().items()}
+        return CallTurn(session=session, index=self.index, started_at=started_at,
+                        interrupted=self.interrupted, measured_from=self._origin_stage(), **fields)
+
+    def _origin_stage(self):
+        return 'user_audio_end' if 'user_audio_end' in self.times else 'stt_final'
+
+
+def percentiles(values, qs=PERCENTILES):
+    """Nearest-rank percentiles of ``values`` (None if empty)."""
+    if not values:
+        return {f"p{q}": None for q in qs}
+    ordered = sorted(values)
+    return {f"p{q}": ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] for q in qs}
+
+
+def stage_durations(row):
+    """Stage -> ms since the previous recorded stage, for one ``CallTurn``, plus the round trip."""
+    durations = {}
+    previous = 0 if row.measured_from == 'user_audio_end' else None
+    for stage in STAGES[1:]:
+        at = getattr(row, f"{stage}_ms")
+        if at is None:
+            continue
+        if previous is not None:
+            durations[stage] = at - previous
+        previous = at
+    if row.measured_from == 'user_audio_end' and row.first_frame_sent_ms is not None:
+        durations['round_trip'] = row.first_frame_sent_ms
+    return durations
+
+
+def latency_report(since, include_interrupted=False):
+    """p50/p90/p99 (ms) per stage over the turns started after ``since``."""
+    from calls.models import CallTurn
+    rows = CallTurn.objects.filter(started_at__gte=since)
+    if not include_interrupted:
+        rows = rows.filter(interrupted=False)
+
+    samples = {stage: [] for stage in STAGES[1:] + ('round_trip',)}
+    count = 0
+    for row in rows.iterator():
+        count += 1
+        for stage, ms in stage_durations(row).items():
+            samples[stage].append(ms)
+    return {
+        'turns': count,
+        'stages': {stage: {'samples': len(values), **percentiles(values)} for stage, values in samples.items()},
+    }
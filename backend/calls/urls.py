@@ -4,6 +4,8 @@ from . import views
 urlpatterns = [
     # Health check
     path('health/', views.HealthCheckView.as_view(), name='health'),
+    path('providers/', views.ProvidersView.as_view(), name='providers'),        # Circuit breaker state
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),              # Prometheus scrape target
 
     # Call management
     path('make-call/', views.MakeCallView.as_view(), name='make_call'),          # Outbound
@@ -14,6 +16,7 @@ urlpatterns = [
     # Call logs & history
     path('call-history/', views.CallHistoryView.as_view(), name='call_history'),
     path('call-detail/<str:call_sid>/', views.CallDetailView.as_view(), name='call_detail'),
+    path('turn-latency/', views.TurnLatencyView.as_view(), name='turn_latency'),  # Per-stage percentiles
 
     # Test mode (no Twilio needed)
     path('test/', views.test_page, name='test_page'),               # Browser chat test (HTML)
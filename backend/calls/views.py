@@ -3,13 +3,15 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.decorators import api_view
+from twilio.base.exceptions import TwilioRestException
 from twilio.rest import Client
 import os
 import json
 import base64
 import certifi
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
+from . import breakers, context, http, metrics, preanswer, turns
 from .models import CallSession, CallEvent
 from .serializers import (
     CallSessionSerializer,
@@ -38,6 +40,20 @@ class HealthCheckView(APIView):
         })
 
 
+class ProvidersView(APIView):
+    """GET /calls/providers/ — Circuit breaker state per external provider."""
+
+    def get(self, request):
+        return Response(breakers.snapshot())
+
+
+class MetricsView(APIView):
+    """GET /calls/metrics/ — Process metrics in the Prometheus text format."""
+
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
 # ------------------------------------------------------------------
 # Outbound Calls
 # ------------------------------------------------------------------
@@ -63,17 +79,36 @@ class MakeCallView(APIView):
         if not domain:
             return Response({'error': 'Missing DOMAIN in .env'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        # Twilio keeps failing: say so now rather than after another timeout
+        twilio_breaker = breakers.get('twilio')
+        if not twilio_breaker.allow():
+            return Response({'error': 'Twilio is unavailable, try again shortly'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
         try:
-            client = Client(account_sid, auth_token)
-
-            call = client.calls.create(
-                url=f"https://{domain}/calls/twiml/",
-                to=to_phone_number,
-                from_=from_phone_number,
-                status_callback=f"https://{domain}/calls/call-status/",
-                status_callback_event=['initiated', 'ringing', 'answered', 'completed'],
-                status_callback_method='POST',
-            )
+            client = Client(account_sid, auth_token, http_client=http.twilio_http_client())
+
+            # Not retried: creating a call is not idempotent
+            try:
+                call = client.calls.create(
+                    url=f"https://{domain}/calls/twiml/",
+                    to=to_phone_number,
+                    from_=from_phone_number,
+                    status_callback=f"https://{domain}/calls/call-status/",
+                    status_callback_event=['initiated', 'ringing', 'answered', 'completed'],
+                    status_callback_method='POST',
+                )
+            except TwilioRestException as e:
+                # A rejected request (bad number, auth) says nothing about Twilio's health
+                if e.status >= 500:
+                    twilio_breaker.record_failure(e)
+                else:
+                    twilio_breaker.release()
+                raise
+            except Exception as e:
+                twilio_breaker.record_failure(e)
+                raise
+            twilio_breaker.record_success()
 
             # Create CallSession in DB
             system_prompt = data.get('system_prompt') or CallSession._meta.get_field('system_prompt').default
@@ -94,6 +129,14 @@ class MakeCallView(APIView):
                 detail=f"Outbound call to {to_phone_number}, SID={call.sid}"
             )
 
+            context.prefetch(session.context_url, session.context_headers)
+
+            # Fetch context, build the prompt and synthesize the greeting while it rings
+            personalize = data.get('personalize_greeting')
+            if personalize is None:
+                personalize = preanswer.PREANSWER_LLM_GREETING
+            preanswer.start(session, personalize=personalize)
+
             return Response({
                 'message': 'Call initiated',
                 'call_sid': call.sid,
@@ -140,6 +183,9 @@ class InboundCallView(APIView):
                 detail=f"Inbound call from {from_number}, SID={call_sid}"
             )
 
+        # Warm the context cache before Twilio opens the media stream
+        context.prefetch(session.context_url, session.context_headers)
+
         # Return TwiML to connect to our WebSocket
         response = f"""<?xml version="1.0" encoding="UTF-8"?>
 <Response>
@@ -261,6 +307,29 @@ class CallDetailView(generics.RetrieveAPIView):
     lookup_field = 'call_sid'
 
 
+class TurnLatencyView(APIView):
+    """
+    GET /calls/turn-latency/?minutes=60 — p50/p90/p99 (ms) per turn stage over the window.
+    Interrupted turns are left out unless ``include_interrupted=true``.
+    """
+
+    MAX_MINUTES = 7 * 24 * 60
+
+    def get(self, request):
+        try:
+            minutes = int(request.query_params.get('minutes', 60))
+        except ValueError:
+            return Response({'error': 'minutes must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        minutes = min(max(minutes, 1), self.MAX_MINUTES)
+        include_interrupted = request.query_params.get('include_interrupted', '').lower() == 'true'
+
+        since = datetime.now(timezone.utc) - timedelta(minutes=minutes)
+        return Response({
+            'window_minutes': minutes,
+            **turns.latency_report(since, include_interrupted=include_interrupted),
+        })
+
+
 # ------------------------------------------------------------------
 # Test Mode — No Twilio needed, test AI pipeline locally
 # ------------------------------------------------------------------
@@ -294,7 +363,7 @@ class TestChatView(APIView):
         messages.append({"role": "user", "content": message})
 
         try:
-            client = Groq(api_key=os.environ.get("GROQ_API_KEY", ""))
+            client = Groq(api_key=os.environ.get("GROQ_API_KEY", ""), http_client=http.sync_httpx())
             completion = client.chat.completions.create(
                 model="llama-3.1-8b-instant",
                 messages=messages,
@@ -340,7 +409,7 @@ class TestVoiceView(APIView):
 
         # Step 1: Groq LLM
         try:
-            groq = Groq(api_key=os.environ.get("GROQ_API_KEY", ""))
+            groq = Groq(api_key=os.environ.get("GROQ_API_KEY", ""), http_client=http.sync_httpx())
             completion = groq.chat.completions.create(
                 model="llama-3.1-8b-instant",
                 messages=messages,
@@ -355,7 +424,7 @@ class TestVoiceView(APIView):
         # Step 2: ElevenLabs TTS
         audio_b64 = None
         try:
-            el_client = ElevenLabs(api_key=os.environ.get("ELEVENLABS_API_KEY", ""))
+            el_client = ElevenLabs(api_key=os.environ.get("ELEVENLABS_API_KEY", ""), httpx_client=http.sync_httpx())
             voice_id = os.environ.get("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
             model_id = os.environ.get("ELEVENLABS_MODEL", "eleven_turbo_v2")
 
@@ -0,0 +1,101 @@
+"""
+Process start-up work that needs the server's event loop.
+
+Modules register coroutine functions with ``on_startup``; ``start()`` runs
+them once as background tasks on the running loop. ``on_shutdown`` hooks run
+on the lifespan shutdown event, where the server sends one. ``core.asgi`` calls
+``start()`` from the ASGI lifespan startup event when the server sends one,
+and otherwise on the first request or websocket the process receives. Daphne
+has no lifespan support, and the first request is usually the
+``make-call`` API hit that precedes the media websocket by a few seconds of
+dialing.
+
+``submit()`` lets sync code (DRF views run in a worker thread) schedule a
+coroutine on that same loop.
+"""
+
+import asyncio
+
+from calls import calllog
+
+process_log = calllog.CallLogger(sampled=False)
+
+_hooks = []
+_shutdown_hooks = []
+_loop = None
+_tasks = set()
+
+
+def on_startup(func):
+    """Register ``func`` (an async function taking no arguments). Usable as a decorator."""
+    _hooks.append(func)
+    return func
+
+
+def on_shutdown(func):
+    """Register ``func`` (an async function taking no arguments) to run at shutdown."""
+    _shutdown_hooks.append(func)
+    return func
+
+
+async def shutdown():
+    for func in _shutdown_hooks:
+        await _run_hook(func)
+
+
+def start():
+    """Run the start-up hooks on the current loop. Safe to call repeatedly."""
+    global _loop
+    if _loop is not None:
+        return
+    _loop = asyncio.get_running_loop()
+    for func in _hooks:
+        _spawn(_run_hook(func))
+
+
+async def _run_hook(func):
+    try:
+        await func()
+    except Exception as e:
+        process_log.error('lifecycle_hook_failed', repr(e), hook=func.__name__)
+
+
+def _spawn(coro):
+    # Hold a reference so the task isn't garbage-collected mid-flight
+    task = asyncio.ensure_future(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+def submit(coro):
+    """
+    Schedule ``coro`` on the server loop from any thread. Returns a
+    ``concurrent.futures.Future``, or None (and closes ``coro``) if the loop
+    hasn't started yet.
+    """
+    if _loop is None or _loop.is_closed():
+        coro.close()
+        return None
+    return asyncio.run_coroutine_threadsafe(coro, _loop)
+
+
+class StartupMiddleware:
+    """ASGI wrapper that kicks off ``start()`` and answers lifespan events."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        start()
+        if scope['type'] != 'lifespan':
+            return await self.app(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -2,6 +2,7 @@
 ASGI config for core project.
 
 Routes HTTP requests to Django and WebSocket requests to Channels consumers.
+Start-up hooks (e.g. TTS cache prewarm) are run by calls.warmup on the server loop.
 """
 
 import os
@@ -13,8 +14,10 @@ django.setup()
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
 from calls.routing import websocket_urlpatterns
+from calls.warmup import StartupMiddleware
+import calls.lag  # noqa: F401  (registers the event-loop lag monitor)
 
-application = ProtocolTypeRouter({
+application = StartupMiddleware(ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": URLRouter(websocket_urlpatterns),
-})
+}))
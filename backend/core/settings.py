@@ -91,9 +91,13 @@ CSRF_TRUSTED_ORIGINS = [
 # Uses DATABASE_URL env var if set (Render/Supabase PostgreSQL)
 # Falls back to SQLite for local development
 
+# Request threads close their connection after each request: under Daphne each
+# request runs on a thread that is thrown away afterwards. Only the calls.db
+# worker threads keep theirs open (DB_CONN_MAX_AGE); it is pinged before reuse
 DATABASES = {
     'default': dj_database_url.config(
-        default=f'sqlite:///{BASE_DIR / "db.sqlite3"}'
+        default=f'sqlite:///{BASE_DIR / "db.sqlite3"}',
+        conn_health_checks=True,
     )
 }
 
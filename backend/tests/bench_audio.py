@@ -0,0 +1,75 @@
+"""
+Throughput of the calls.audio DSP primitives, in 20ms frames/sec per core.
+
+A live call moves 50 frames/sec in each direction, so dividing a result by
+50 gives the number of concurrent streams one core could sustain for that
+operation alone.
+
+Usage (from backend/):
+    python tests/bench_audio.py [--seconds 1.0]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from calls.audio import (  # noqa: E402
+    Resampler, apply_gain, pcm16_to_ulaw, rms_dbfs, ulaw_rms_dbfs, ulaw_to_pcm16,
+)
+
+FRAME_MS = 20
+
+
+def frames_per_second(fn, frames, min_seconds):
+    """Run fn over frames until min_seconds of CPU time has passed."""
+    done = 0
+    start = time.process_time()
+    while True:
+        for frame in frames:
+            fn(frame)
+        done += len(frames)
+        elapsed = time.process_time() - start
+        if elapsed >= min_seconds:
+            return done / elapsed
+
+
+def pcm_frames(rate, count=50):
+    n = rate * FRAME_MS // 1000
+    t = np.arange(n * count) / rate
+    pcm = (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+    return [pcm[i * n:(i + 1) * n] for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=1.0, help="CPU seconds per measurement")
+    args = parser.parse_args()
+
+    pcm8k = pcm_frames(8000)
+    ulaw = [pcm16_to_ulaw(f) for f in pcm8k]
+
+    cases = [
+        ("ulaw -> pcm16 decode", lambda f: ulaw_to_pcm16(f), ulaw),
+        ("pcm16 -> ulaw encode", lambda f: pcm16_to_ulaw(f), pcm8k),
+        ("ulaw RMS (power table)", lambda f: ulaw_rms_dbfs(f), ulaw),
+        ("pcm16 RMS", lambda f: rms_dbfs(f), pcm8k),
+        ("pcm16 gain -6dB", lambda f: apply_gain(f, -6.0), pcm8k),
+    ]
+    for rate in (16000, 22050, 24000, 44100):
+        up, down = Resampler(8000, rate), Resampler(rate, 8000)
+        cases.append((f"resample 8000 -> {rate}", up.process, pcm8k))
+        cases.append((f"resample {rate} -> 8000", down.process, pcm_frames(rate)))
+
+    print(f"{'operation':28}{'frames/s/core':>16}{'streams/core':>14}")
+    for name, fn, frames in cases:
+        fps = frames_per_second(fn, frames, args.seconds)
+        print(f"{name:28}{fps:>16,.0f}{fps / (1000 / FRAME_MS):>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Microbenchmark: outbound TTS framing, old bytes-slicing loop vs FrameChunker.
+
+Simulates ElevenLabs delivering ulaw_8000 audio in irregular chunks and
+reports, per second of speech, how many bytes each approach copies and how
+much CPU it burns.
+
+Usage (from backend/):
+    python tests/bench_chunker.py [--seconds 30] [--frame 4000]
+"""
+
+import argparse
+import base64
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calls.audio import FrameChunker  # noqa: E402
+
+BYTES_PER_SECOND = 8000  # ulaw @ 8kHz
+
+
+def make_chunks(seconds, seed=1):
+    """Irregular chunk sizes similar to what a streaming TTS response yields."""
+    rng = random.Random(seed)
+    total = seconds * BYTES_PER_SECOND
+    chunks = []
+    while total > 0:
+        n = min(total, rng.randint(500, 6000))
+        chunks.append(os.urandom(n))
+        total -= n
+    return chunks
+
+
+def old_framing(chunks, frame_size):
+    """The original `audio_buffer += chunk` / `audio_buffer[CHUNK_SIZE:]` loop."""
+    copied = 0
+    audio_buffer = b""
+    for chunk in chunks:
+        audio_buffer += chunk
+        copied += len(audio_buffer)
+        while len(audio_buffer) >= frame_size:
+            send_chunk = audio_buffer[:frame_size]
+            audio_buffer = audio_buffer[frame_size:]
+            copied += len(send_chunk) + len(audio_buffer)
+            base64.b64encode(send_chunk)
+    if audio_buffer:
+        base64.b64encode(audio_buffer)
+    return copied
+
+
+def new_framing(chunks, frame_size, chunker):
+    chunker.reset()
+    copied = 0
+    for chunk in chunks:
+        copied += len(chunk)  # The only copy: into the ring
+        for frame in chunker.feed(chunk):
+            base64.b64encode(frame)
+    tail = chunker.flush()
+    if tail is not None:
+        base64.b64encode(tail)
+    return copied
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = fn()
+        best = min(best, time.process_time() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=int, default=30, help="Seconds of speech per reply")
+    parser.add_argument('--frame', type=int, default=4000, help="Frame size in bytes")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.seconds)
+    chunker = FrameChunker(args.frame)
+
+    old_cpu, old_copied = timed(lambda: old_framing(chunks, args.frame), args.repeat)
+    new_cpu, new_copied = timed(lambda: new_framing(chunks, args.frame, chunker), args.repeat)
+
+    print(f"Reply length: {args.seconds}s of speech, frame size {args.frame} bytes, {len(chunks)} TTS chunks")
+    print(f"{'':12}{'bytes copied/s':>18}{'CPU us/s speech':>18}")
+    for name, cpu, copied in (('old', old_cpu, old_copied), ('chunker', new_cpu, new_copied)):
+        print(f"{name:12}{copied / args.seconds:>18,.0f}{cpu / args.seconds * 1e6:>18,.1f}")
+    print(f"Copy reduction: {old_copied / new_copied:.1f}x, CPU speedup: {old_cpu / new_cpu:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+DB operation queueing delay per call: one shared ORM thread vs the calls.db pool.
+
+Each simulated call runs the consumer's DB pattern concurrently with every
+other call: load the session, save it, a few write-behind batch flushes,
+then the end-of-call save. Every operation sleeps ``--op-ms`` in its worker
+thread, standing in for one Postgres round trip, so the numbers depend on
+thread scheduling only, not on a local database. The shared thread is what
+``sync_to_async`` (``thread_sensitive=True``) gives every call in the
+process; the pool is ``calls.db.run`` with ``--threads`` workers.
+
+Reported per operation: time waiting for a thread (queue) and end to end.
+
+Usage (from backend/):
+    python tests/bench_db.py [--calls 10 100 500] [--threads 16] [--op-ms 2] [--flushes 4]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from asgiref.sync import sync_to_async  # noqa: E402
+
+from calls import db  # noqa: E402
+
+
+def percentile(samples, q):
+    return statistics.quantiles(samples, n=100)[q - 1] if len(samples) > 1 else samples[0]
+
+
+async def simulate(calls, runner, args):
+    queued, total = [], []
+
+    def op(submitted):
+        queued.append(time.perf_counter() - submitted)
+        time.sleep(args.op_ms / 1000)
+
+    async def one_op():
+        submitted = time.perf_counter()
+        await runner(op, submitted)
+        total.append(time.perf_counter() - submitted)
+
+    async def call():
+        # Calls connect spread over ~one op-time each, not all in the same instant
+        await asyncio.sleep(random.uniform(0, calls * args.op_ms / 1000))
+        for _ in range(2 + args.flushes + 1):
+            await one_op()
+            await asyncio.sleep(random.uniform(0, 0.01))
+
+    await asyncio.gather(*[call() for _ in range(calls)])
+    return queued, total
+
+
+def shared_thread(func, *args):
+    return sync_to_async(func)(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--op-ms', type=float, default=2)
+    parser.add_argument('--flushes', type=int, default=4)
+    args = parser.parse_args()
+
+    db.executor = ThreadPoolExecutor(max_workers=args.threads, thread_name_prefix='db')
+    random.seed(1)
+
+    print(f"op: {args.op_ms}ms  pool threads: {args.threads}  ops per call: {args.flushes + 3}\n")
+    print(f"{'calls':>6}  {'mode':<14}{'queue p50':>11}{'queue p99':>11}{'total p99 ms':>14}")
+    for calls in args.calls:
+        for name, runner in (('shared thread', shared_thread), ('db pool', db.run)):
+            queued, total = asyncio.run(simulate(calls, runner, args))
+            print(f"{calls:>6}  {name:<14}{percentile(queued, 50) * 1000:>11.1f}"
+                  f"{percentile(queued, 99) * 1000:>11.1f}{percentile(total, 99) * 1000:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
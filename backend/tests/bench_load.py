@@ -0,0 +1,326 @@
+"""
+Concurrent-call capacity of one process: simulated Twilio calls against TwilioMediaConsumer.
+
+Each simulated call is a Twilio media stream driven through Channels'
+``WebsocketCommunicator``, so the consumer runs exactly as under Daphne,
+minus the socket framing. A call:
+
+- sends a 20ms inbound media frame every 20ms, in real time: loud noise
+  while the caller is "talking", ulaw silence otherwise
+- plays back the outbound audio on a local clock and acks each mark when
+  playback reaches it, as Twilio does (a ``clear`` acks them at once)
+- waits for the greeting, then for ``--turns`` turns talks for 1-2s, waits
+  for the reply to play out and pauses briefly before the next one
+
+Deepgram live STT, the LLM (OpenAI-compatible streaming chat) and
+ElevenLabs input-streaming TTS are the local fakes in ``tests/fakes.py``,
+run in a child process so their CPU and memory are not counted. Each has a
+latency distribution (see ``fakes.latency`` for the spec format).
+
+For each ``--concurrency`` level, all calls run at once (started over
+``--ramp-seconds``), reporting:
+
+- round trip per turn, as the caller hears it: last voiced frame sent to
+  first reply frame received (p50/p90/p99), and turns that got no reply
+- the consumer's own per-stage timeline (``calls.turns``), p90 per stage
+- CPU per call (ms of process CPU per call-second while every call is up)
+  and memory per call (RSS growth during the level, divided by calls)
+- event-loop lag p99
+
+The SLO is ``--slo-percentile`` of the round trip within ``--slo-ms``
+with under 1% of turns unanswered; the run stops at the first level that
+misses it. Rows go to a throwaway SQLite database.
+
+Usage (from backend/):
+    python tests/bench_load.py [--concurrency 5 10 25 50 100] [--turns 3] [--slo-ms 2500] [--slo-percentile 90]
+        [--stt-final-ms lognormal:150:0.4] [--llm-first-token-ms lognormal:250:0.5] [--llm-token-ms 15]
+        [--tts-first-audio-ms lognormal:200:0.4] [--tts-connect-ms 100]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import re
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STREAM_PATH = "/media-stream"
+FRAME_SECONDS = 0.02
+SILENCE = b'\xff' * 160
+
+UTTERANCES = (
+    "What time is my appointment tomorrow",
+    "Can you move it to the afternoon",
+    "Is there anything I need to bring",
+    "Okay and where do I park",
+)
+
+
+def percentile(samples, q):
+    return statistics.quantiles(samples, n=100)[q - 1] if len(samples) > 1 else samples[0]
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak, not current
+
+
+# ------------------------------------------------------------------
+# Fake providers (child process)
+# ------------------------------------------------------------------
+
+def serve_fakes(conn, args):
+    from fakes import FakeDeepgram, FakeElevenLabs, FakeLLM, latency
+
+    async def serve():
+        stt = FakeDeepgram(utterances=UTTERANCES, final_delay=latency(args.stt_final_ms))
+        llm = FakeLLM(tokens=re.findall(r'\s*\S+', args.reply),
+                      first_token_delay=latency(args.llm_first_token_ms), token_delay=latency(args.llm_token_ms))
+        tts = FakeElevenLabs(connect_delay=latency(args.tts_connect_ms), first_audio_delay=latency(args.tts_first_audio_ms),
+                             bytes_per_char=args.tts_bytes_per_char)
+        for server in (stt, llm, tts):
+            await server.start()
+        conn.send({'deepgram': stt.url, 'llm': llm.api_url, 'tts': tts.ws_url})
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)   # Until the parent is done
+        for server in (stt, llm, tts):
+            await server.stop()
+
+    asyncio.run(serve())
+
+
+def start_fakes(args):
+    ctx = multiprocessing.get_context('spawn')
+    parent, child = ctx.Pipe()
+    process = ctx.Process(target=serve_fakes, args=(child, args), daemon=True)
+    process.start()
+    return process, parent, parent.recv()
+
+
+def configure(urls, db_path):
+    """Point the consumer at the fakes; must run before Django and the consumer are imported."""
+    for key, value in {
+        'DJANGO_SETTINGS_MODULE': 'core.settings',
+        'DOMAIN': 'localhost',
+        'DEEPGRAM_API_KEY': 'fake',
+        'GROQ_API_KEY': 'fake',
+        'ELEVENLABS_API_KEY': 'fake',
+        'TTS_PROVIDER': 'websocket',
+        'ELEVENLABS_OUTPUT_FORMAT': 'ulaw_8000',
+        'TTS_CACHE_DIR': '',
+        'LLM_HEDGE': 'false',
+        'CALL_LOG_LEVEL': 'WARNING',
+    }.items():
+        os.environ.setdefault(key, value)
+    # Always the fakes and a throwaway database, whatever the environment says
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    os.environ['DEEPGRAM_URL'] = urls['deepgram']
+    os.environ['LLM_BASE_URL'] = urls['llm']
+    os.environ['ELEVENLABS_WS_URL'] = urls['tts']
+
+
+# ------------------------------------------------------------------
+# Simulated caller
+# ------------------------------------------------------------------
+
+class SimulatedCall:
+    """One caller: talks, waits for the reply to play out, repeats."""
+
+    def __init__(self, index, application, args):
+        from fakes import FakeTwilioStream
+
+        self.args = args
+        self.twilio = FakeTwilioStream(application, f"CAload{index:08d}", f"MZload{index:08d}", STREAM_PATH)
+        self.voiced = [self.twilio.media_message(os.urandom(160), i) for i in range(25)]
+        self.silence = self.twilio.media_message(SILENCE)
+
+        self.round_trips = []
+        self.unanswered = 0
+        self.talking = False
+        self.last_voiced_at = None
+
+    async def run(self, delay):
+        await asyncio.sleep(delay)
+        await self.twilio.start()
+        sender = asyncio.create_task(self._send_audio())
+        try:
+            await self.twilio.wait_played(self.args.turn_timeout)   # The greeting
+            for _ in range(self.args.turns):
+                await asyncio.sleep(random.uniform(0.3, 0.8))
+                self.twilio.first_audio.clear()
+                self.talking = True
+                await asyncio.sleep(random.uniform(1.0, 2.0))
+                self.talking = False
+                if await self.twilio.wait_played(self.args.turn_timeout):
+                    self.round_trips.append(self.twilio.first_audio_at - self.last_voiced_at)
+                else:
+                    self.unanswered += 1
+            await self.twilio.stop()
+        finally:
+            sender.cancel()
+            await self.twilio.close()
+
+    async def _send_audio(self):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        i = 0
+        while True:
+            if self.talking:
+                await self.twilio.send(self.voiced[i % len(self.voiced)])
+                self.last_voiced_at = loop.time()
+                i += 1
+            else:
+                await self.twilio.send(self.silence)
+            next_at += FRAME_SECONDS
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+
+
+# ------------------------------------------------------------------
+# Load levels
+# ------------------------------------------------------------------
+
+async def lag_monitor(samples, interval=0.01):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def usage_sampler(samples, active, interval=0.5):
+    """(process CPU, wall time, RSS, live calls) every ``interval``."""
+    while True:
+        samples.append((time.process_time(), time.perf_counter(), rss_bytes(), active.value))
+        await asyncio.sleep(interval)
+
+
+def full_load_usage(samples, calls):
+    """CPU ms per call-second and peak RSS over the samples taken with every call up."""
+    full = [s for s in samples if s[3] >= calls]
+    if len(full) < 2:
+        return None, max((s[2] for s in samples), default=0)
+    cpu = (full[-1][0] - full[0][0]) / (full[-1][1] - full[0][1])
+    return cpu / calls * 1000, max(s[2] for s in full)
+
+
+async def run_level(calls, application, args, index_base):
+    from asgiref.sync import sync_to_async
+    from django.utils import timezone
+    from calls import consumers, persistence, turns
+
+    since = timezone.now()
+    baseline_rss = rss_bytes()
+    usage, lag = [], []
+    monitors = [asyncio.create_task(usage_sampler(usage, consumers.ACTIVE_CALLS)),
+                asyncio.create_task(lag_monitor(lag))]
+    simulated = [SimulatedCall(index_base + i, application, args) for i in range(calls)]
+    results = await asyncio.gather(*(call.run(i * args.ramp_seconds / calls) for i, call in enumerate(simulated)),
+                                   return_exceptions=True)
+    for monitor in monitors:
+        monitor.cancel()
+    await persistence.buffer.flush()
+
+    errors = [r for r in results if isinstance(r, BaseException)]
+    round_trips = [rt for call in simulated for rt in call.round_trips]
+    unanswered = sum(call.unanswered for call in simulated) + len(errors) * args.turns
+    cpu_ms, peak_rss = full_load_usage(usage, calls)
+    report = await sync_to_async(turns.latency_report)(since)
+    return {
+        'calls': calls,
+        'turns': len(round_trips) + unanswered,
+        'unanswered': unanswered,
+        'errors': errors,
+        'round_trip': {q: percentile(round_trips, q) * 1000 if round_trips else None for q in (50, 90, 99)},
+        'stages': {stage: values['p90'] for stage, values in report['stages'].items() if values['p90'] is not None},
+        'cpu_ms': cpu_ms,
+        'mem_mb': (peak_rss - baseline_rss) / calls / 1e6,
+        'lag_p99_ms': percentile(lag, 99) * 1000 if lag else None,
+    }
+
+
+def slo_met(row, args):
+    latency = row['round_trip'][args.slo_percentile]
+    return (latency is not None and latency <= args.slo_ms
+            and row['unanswered'] <= 0.01 * max(row['turns'], 1))
+
+
+def _fmt(value, spec='.0f'):
+    return '-' if value is None else format(value, spec)
+
+
+def print_row(row, args):
+    rt = row['round_trip']
+    print(f"{row['calls']:>5} calls | round trip p50 {_fmt(rt[50])} p90 {_fmt(rt[90])} p99 {_fmt(rt[99])}ms | "
+          f"unanswered {row['unanswered']}/{row['turns']} | CPU {_fmt(row['cpu_ms'], '.1f')}ms/call-s | "
+          f"mem {row['mem_mb']:.2f}MB/call | loop lag p99 {_fmt(row['lag_p99_ms'], '.1f')}ms | "
+          f"{'ok' if slo_met(row, args) else 'SLO MISSED'}")
+    print("        stage p90 (ms): " + " ".join(f"{stage}={ms}" for stage, ms in row['stages'].items()))
+    for error in row['errors'][:3]:
+        print(f"        call error: {error!r}")
+
+
+async def main(args):
+    process, conn, urls = start_fakes(args)
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench_load_'), 'db.sqlite3')
+    configure(urls, db_path)
+
+    import django
+    django.setup()
+    from asgiref.sync import sync_to_async
+    from django.core.management import call_command
+    from calls import warmup
+    from calls.consumers import TwilioMediaConsumer
+
+    await sync_to_async(call_command)('migrate', verbosity=0)
+    application = TwilioMediaConsumer.as_asgi()
+    print(f"Fakes: {urls}; DB {db_path}")
+    print(f"SLO: p{args.slo_percentile} round trip <= {args.slo_ms:.0f}ms, <1% of turns unanswered")
+
+    broke_at = None
+    index = 0
+    try:
+        for calls in args.concurrency:
+            row = await run_level(calls, application, args, index)
+            index += calls
+            print_row(row, args)
+            if not slo_met(row, args):
+                broke_at = calls
+                break
+    finally:
+        await warmup.shutdown()
+        conn.send('stop')
+        process.join(5)
+
+    if broke_at is None:
+        print(f"SLO held up to {args.concurrency[-1]} concurrent calls (the highest level tried).")
+    else:
+        print(f"SLO breaks at {broke_at} concurrent calls.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[5, 10, 25, 50, 100])
+    parser.add_argument('--turns', type=int, default=3, help="Caller turns per call, after the greeting")
+    parser.add_argument('--ramp-seconds', type=float, default=2.0, help="Calls of a level start spread over this")
+    parser.add_argument('--turn-timeout', type=float, default=10.0, help="Seconds to wait for a reply")
+    parser.add_argument('--slo-ms', type=float, default=2500,
+                        help="The defaults below put the idle round trip near 1.7s (endpointing + debounce + first audio)")
+    parser.add_argument('--slo-percentile', type=int, choices=(50, 90, 99), default=90)
+    parser.add_argument('--stt-final-ms', default='lognormal:150:0.4', help="Endpoint to final transcript")
+    parser.add_argument('--llm-first-token-ms', default='lognormal:250:0.5')
+    parser.add_argument('--llm-token-ms', default='15', help="Gap between streamed tokens")
+    parser.add_argument('--tts-connect-ms', default='100', help="TTS websocket connect")
+    parser.add_argument('--tts-first-audio-ms', default='lognormal:200:0.4', help="First text to first audio, per reply")
+    parser.add_argument('--tts-bytes-per-char', type=int, default=560, help="ulaw bytes per character (560 = 70ms)")
+    parser.add_argument('--reply', default="Sure, your appointment is tomorrow at three. Anything else?",
+                        help="Text every LLM reply streams")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,156 @@
+"""
+Event-loop lag from call logging: print() vs calls.calllog.
+
+Simulates ``--calls`` concurrent calls on one event loop. Each call ticks
+every 20ms (one inbound media frame) and writes ``--lines-per-second`` log
+lines on average, shaped like the consumer's old prints (transcript chunks,
+echo drops, interrupts, LLM/TTS outcomes). Both modes write the same lines
+to the same sink: a pipe, line buffered like stdout under
+``PYTHONUNBUFFERED``, read by a separate thread standing in for the log
+collector. ``--reader-delay-ms`` makes that reader slow, which is when a
+synchronous print blocks the loop on a full pipe.
+
+- print: ``print()`` to the pipe from the loop, as consumers.py used to
+- calllog: ``CallLogger`` records through the queue handler; the writer
+  thread does the formatting and the write
+
+Reported: loop lag (how late a 5ms timer fired) p50/p99/max, the loop
+thread's CPU use, and lines the reader got (calllog may drop on a full queue).
+
+Usage (from backend/):
+    python tests/bench_logging.py [--calls 200] [--seconds 10] [--lines-per-second 10] [--reader-delay-ms 0]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calls import calllog  # noqa: E402
+
+TICK = 0.02
+SENTENCES = ["yes that works for me", "can you repeat the time", "no I said Tuesday", "okay thanks"]
+
+
+def percentile(samples, q):
+    return statistics.quantiles(samples, n=100)[q - 1] if len(samples) > 1 else samples[0]
+
+
+class PipeSink:
+    """A line-buffered pipe and the thread draining it."""
+
+    def __init__(self, delay):
+        read_fd, write_fd = os.pipe()
+        self.stream = os.fdopen(write_fd, 'w', buffering=1)
+        self.lines = 0
+        self.delay = delay
+        self.reader = threading.Thread(target=self._drain, args=(os.fdopen(read_fd, 'rb', buffering=0),), daemon=True)
+        self.reader.start()
+
+    def _drain(self, pipe):
+        while chunk := pipe.read(4096):
+            self.lines += chunk.count(b'\n')
+            if self.delay:
+                time.sleep(self.delay)
+
+    def close(self):
+        self.stream.close()
+        self.reader.join()
+
+
+def print_logger(i, sink):
+    call_sid = f"CA{i:032x}"
+
+    def emit(kind, sentence, confidence):
+        if kind == 0:
+            print(f"User (Final chunk): {sentence} (confidence: {confidence:.2f})", file=sink)
+        elif kind == 1:
+            print(f"[Echo Dropped] Ignoring self-hearing hallucination: '{sentence}'", file=sink)
+        elif kind == 2:
+            print(f"[Interrupt] User started speaking: '{sentence}'. Cancelling AI.", file=sink)
+        else:
+            print(f"AI: {sentence} ({call_sid})", file=sink)
+    return emit
+
+
+def structured_logger(i, sink):
+    turn = random.randint(1, 20)
+    log = calllog.CallLogger(turn=lambda: turn, level='INFO', sampled=False)
+    log.bind(f"CA{i:032x}", f"MZ{i:032x}")
+
+    def emit(kind, sentence, confidence):
+        if kind == 0:
+            log.info('transcript_chunk', sentence, confidence=round(confidence, 2))
+        elif kind == 1:
+            log.info('echo_dropped', sentence)
+        elif kind == 2:
+            log.info('interrupt', sentence)
+        else:
+            log.info('ai_reply', sentence)
+    return emit
+
+
+async def call(emit, seconds, lines_per_second):
+    await asyncio.sleep(random.random() * TICK)   # Calls don't tick in lockstep
+    for _ in range(int(seconds / TICK)):
+        await asyncio.sleep(TICK)
+        chance = lines_per_second * TICK
+        while random.random() < chance:
+            emit(random.randrange(4), random.choice(SENTENCES), random.random())
+            chance -= 1
+
+
+async def lag_monitor(samples, stop, interval=0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def run(mode, args):
+    sink = PipeSink(args.reader_delay_ms / 1000)
+    if mode == 'calllog':
+        calllog.configure(sink.stream, fmt=args.format)
+    make = print_logger if mode == 'print' else structured_logger
+    dropped = calllog.RECORDS_DROPPED.value
+
+    samples, stop = [], asyncio.Event()
+    monitor = asyncio.create_task(lag_monitor(samples, stop))
+    cpu = time.thread_time()
+    await asyncio.gather(*(call(make(i, sink.stream), args.seconds, args.lines_per_second)
+                           for i in range(args.calls)))
+    cpu = time.thread_time() - cpu
+    stop.set()
+    await monitor
+
+    if mode == 'calllog':
+        calllog.shutdown()   # Writes out what is still queued
+    sink.close()
+    return samples, cpu, sink.lines, calllog.RECORDS_DROPPED.value - dropped
+
+
+async def main(args):
+    expected = args.calls * args.seconds * args.lines_per_second
+    print(f"{args.calls} calls x {args.seconds}s, ~{expected:.0f} lines; reader delay {args.reader_delay_ms}ms/read")
+    for mode in ('print', 'calllog'):
+        samples, cpu, lines, dropped = await run(mode, args)
+        print(f"{mode:>8}: loop lag p50 {percentile(samples, 50) * 1000:6.2f}ms  p99 {percentile(samples, 99) * 1000:6.2f}ms  "
+              f"max {max(samples) * 1000:7.2f}ms | loop thread CPU {cpu / args.seconds * 100:4.1f}% | "
+              f"{lines} lines written, {dropped} dropped")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--lines-per-second', type=float, default=10, help="Log lines per call-second")
+    parser.add_argument('--reader-delay-ms', type=float, default=0, help="Log collector pause after each read")
+    parser.add_argument('--format', choices=sorted(calllog.FORMATTERS), default='text')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,62 @@
+"""
+Per-message cost of rendering outbound Twilio media messages.
+
+Compares ``MediaFrameEncoder`` with building a dict and running
+``json.dumps`` for every chunk. At 20ms frames a reply produces 50 media
+messages per second of speech, so the fixed per-message overhead matters
+more than the base64 work.
+
+Usage (from backend/):
+    python tests/bench_media_encode.py [--messages 200000]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calls.twilio_media import MediaFrameEncoder  # noqa: E402
+
+STREAM_SID = "MZ18ad3ab5a668481ce02b83e7395059f0"
+
+
+def encode_dumps(frame):
+    return json.dumps({
+        "event": "media",
+        "streamSid": STREAM_SID,
+        "media": {
+            "payload": base64.b64encode(frame).decode('utf-8'),
+            "track": "outbound"
+        }
+    })
+
+
+def measure(fn, frames, count):
+    start = time.process_time()
+    for i in range(count):
+        fn(frames[i % len(frames)])
+    return (time.process_time() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=200_000)
+    args = parser.parse_args()
+
+    encoder = MediaFrameEncoder(STREAM_SID)
+    print(f"Messages per run: {args.messages:,}\n")
+    print(f"{'frame':>8}  {'encoder':<14}{'us/msg':>8}{'us per s of audio':>20}")
+    for frame_ms in (20, 100, 500):
+        frames = [memoryview(os.urandom(frame_ms * 8)) for _ in range(64)]
+        assert json.loads(encoder.media(frames[0])) == json.loads(encode_dumps(frames[0]))
+        for name, fn in (('json.dumps', encode_dumps), ('pre-rendered', encoder.media)):
+            per_msg = measure(fn, frames, args.messages)
+            print(f"{frame_ms:>6}ms  {name:<14}{per_msg * 1e6:>8.2f}{per_msg * 1e6 * 1000 / frame_ms:>20.1f}")
+
+
+if __name__ == '__main__':
+    main()
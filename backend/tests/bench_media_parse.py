@@ -0,0 +1,78 @@
+"""
+Per-frame cost of parsing inbound Twilio media messages.
+
+Compares the fast path in ``calls.twilio_media`` with the original
+``json.loads`` + ``base64.b64decode`` route. Every call delivers 50 media
+messages per second, so the per-message cost sets how many frames (and
+calls) one process can take in before parsing alone eats the event loop.
+
+Usage (from backend/):
+    python tests/bench_media_parse.py [--frames 200000]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calls.twilio_media import parse_message  # noqa: E402
+
+FRAME_BYTES = 160     # 20ms of 8kHz μ-law
+FRAMES_PER_SECOND = 50
+
+
+def make_messages(count):
+    messages = []
+    for i in range(count):
+        messages.append(json.dumps({
+            "event": "media",
+            "sequenceNumber": str(i + 2),
+            "media": {"track": "inbound", "chunk": str(i + 1), "timestamp": str(i * 20),
+                      "payload": base64.b64encode(os.urandom(FRAME_BYTES)).decode()},
+            "streamSid": "MZ18ad3ab5a668481ce02b83e7395059f0",
+        }, separators=(',', ':')))
+    return messages
+
+
+def parse_json(text):
+    data = json.loads(text)
+    if data.get('event') == 'media':
+        return base64.b64decode(data['media']['payload'])
+
+
+def parse_fast(text):
+    return parse_message(text)[2]
+
+
+def measure(fn, messages, frames):
+    start = time.process_time()
+    for i in range(frames):
+        fn(messages[i % len(messages)])
+    return (time.process_time() - start) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--frames', type=int, default=200_000)
+    args = parser.parse_args()
+
+    messages = make_messages(1000)
+    assert all(parse_fast(m) == parse_json(m) for m in messages)
+
+    print(f"Frames per run: {args.frames:,}\n")
+    print(f"{'parser':<20}{'us/frame':>10}{'frames/s':>14}{'calls/core':>12}")
+    results = {}
+    for name, fn in (('json.loads+b64', parse_json), ('fast path', parse_fast)):
+        per_frame = measure(fn, messages, args.frames)
+        results[name] = per_frame
+        print(f"{name:<20}{per_frame * 1e6:>10.2f}{1 / per_frame:>14,.0f}"
+              f"{1 / per_frame / FRAMES_PER_SECOND:>12,.0f}")
+    print(f"\nSpeed-up: {results['json.loads+b64'] / results['fast path']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+CPU cost of the in-process metrics at full call load.
+
+Drives the consumer's per-frame hot path one call-second at a time:
+- 50 inbound media messages through Channels' ``websocket_receive``. This
+  covers parse, VAD, the level meter and the STT queue with batched sends.
+- outbound frames through ``_send_audio`` and Channels' ``send``, for the
+  share of the time the AI is speaking.
+
+The websocket and STT sockets are no-ops, so this is the work the process
+itself does per call, minus Daphne's framing and socket I/O.
+
+Timing the path with and without metrics cannot resolve a ~1% difference on
+a shared machine. So the metric updates are counted instead. Counts per
+call-second are multiplied by each update's cost, measured on its own. A
+process is at full load when the hot path fills a core. At that load the
+metrics' share of the CPU is their cost per call-second over the path's
+cost, plus the process-wide work: event-loop lag samples and one
+``/calls/metrics/`` render per scrape.
+
+Usage (from backend/):
+    python tests/bench_metrics.py [--call-seconds 2000] [--speaking 0.5] [--scrape-seconds 15] [--repeat 7]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+import timeit
+from collections import Counter
+from unittest.mock import AsyncMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault('DOMAIN', 'localhost')
+
+import django  # noqa: E402
+
+django.setup()
+
+from calls import lag, metrics  # noqa: E402
+from calls.consumers import TwilioMediaConsumer  # noqa: E402
+from calls.stt import AudioSendQueue  # noqa: E402
+from calls.twilio_media import MediaFrameEncoder  # noqa: E402
+
+INBOUND_FPS = 50
+STREAM_SID = "MZ18ad3ab5a668481ce02b83e7395059f0"
+
+
+def media_message(i):
+    return json.dumps({
+        "event": "media", "sequenceNumber": str(i + 2), "streamSid": STREAM_SID,
+        "media": {"track": "inbound", "chunk": str(i + 1), "timestamp": str(i * 20),
+                  "payload": base64.b64encode(os.urandom(160)).decode()},
+    }, separators=(',', ':'))
+
+
+async def make_consumer():
+    consumer = TwilioMediaConsumer()
+    consumer.accept = AsyncMock()
+    await consumer.connect()
+    consumer.stream_sid = STREAM_SID
+    consumer.frame_encoder = MediaFrameEncoder(STREAM_SID)
+    consumer.first_audio_sent = True
+
+    async def no_op(data):
+        pass
+    consumer.base_send = no_op   # Channels' send, minus the socket
+    consumer.stt_queue = AudioSendQueue(no_op, max_frames=50, batch_ms=100)
+    consumer.stt_queue.start()
+    return consumer
+
+
+async def hot_path(consumer, messages, call_seconds, speaking):
+    frame = os.urandom(160)
+    outbound = int(INBOUND_FPS * speaking)
+    events = [{'type': 'websocket.receive', 'text': message} for message in messages]
+    started = time.process_time()
+    for _ in range(call_seconds):
+        for event in events:
+            await consumer.websocket_receive(event)
+        for _ in range(outbound):
+            await consumer._send_audio(frame)
+        await asyncio.sleep(0)   # Let the STT sender drain its batches
+    return (time.process_time() - started) / call_seconds
+
+
+UPDATES = [(metrics.Counter, 'inc'), (metrics.Gauge, 'inc'), (metrics.Gauge, 'dec'),
+           (metrics.Gauge, 'set'), (metrics.Histogram, 'observe')]
+
+
+class counting_updates:
+    """Count calls to every metric update method."""
+
+    def __enter__(self):
+        self.counts = Counter()
+        self.saved = [(cls, name, getattr(cls, name)) for cls, name in UPDATES]
+        for cls, name, method in self.saved:
+            setattr(cls, name, self._counted(cls, name, method))
+        return self.counts
+
+    def _counted(self, cls, name, method):
+        key = f"{cls.__name__}.{name}"
+
+        def counted(metric, *args):
+            self.counts[key] += 1
+            return method(metric, *args)
+        return counted
+
+    def __exit__(self, *exc):
+        for cls, name, method in self.saved:
+            setattr(cls, name, method)
+
+
+def update_costs():
+    """Seconds per call of each update method, on a throwaway metric."""
+    samples = {
+        'Counter.inc': metrics.Counter('bench_total').inc,
+        'Gauge.inc': metrics.Gauge('bench').inc,
+        'Gauge.dec': metrics.Gauge('bench').dec,
+        'Gauge.set': lambda g=metrics.Gauge('bench'): g.set(1),
+        'Histogram.observe': lambda h=metrics.Histogram('bench_seconds'): h.observe(0.004),
+    }
+    return {key: min(timeit.repeat(func, number=100000, repeat=9)) / 100000 for key, func in samples.items()}
+
+
+def cost_of(func, rounds):
+    started = time.process_time()
+    for _ in range(rounds):
+        func()
+    return (time.process_time() - started) / rounds
+
+
+async def main(args):
+    consumer = await make_consumer()
+    messages = [media_message(i) for i in range(INBOUND_FPS)]
+    await hot_path(consumer, messages, 100, args.speaking)  # Warm up
+
+    # Least disturbed run
+    path = min([await hot_path(consumer, messages, args.call_seconds, args.speaking) for _ in range(args.repeat)])
+    with counting_updates() as counts:
+        await hot_path(consumer, messages, args.call_seconds, args.speaking)
+    await consumer.stt_queue.close(flush=False)
+    await consumer.tts.close()
+
+    costs = update_costs()
+    per_call = sum(count / args.call_seconds * costs[key] for key, count in counts.items())
+    render = cost_of(metrics.render, 200)
+    lag_per_second = costs['Histogram.observe'] * 1000 / lag.EVENT_LOOP_LAG_INTERVAL_MS
+    full = int(1 / path)
+    share = per_call / path + render / args.scrape_seconds + lag_per_second
+
+    print(f"hot path: {path * 1e6:.0f}us per call-second")
+    for key, count in sorted(counts.items()):
+        print(f"  {key:<18} {count / args.call_seconds:>6.1f}/call-second x {costs[key] * 1e9:>4.0f}ns")
+    print(f"metric updates: {per_call * 1e6:.1f}us per call-second ({per_call / path * 100:.2f}% of the hot path)")
+    print(f"render: {render * 1000:.2f}ms ({len(metrics.render())} bytes) every {args.scrape_seconds:g}s; "
+          f"lag monitor: {lag_per_second * 1e6:.1f}us/s")
+    print(f"full load: ~{full} calls per core; metrics at full load: {share * 100:.2f}% of the process CPU")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--call-seconds', type=int, default=2000)
+    parser.add_argument('--speaking', type=float, default=0.5, help="Share of time the AI is speaking")
+    parser.add_argument('--scrape-seconds', type=float, default=15)
+    parser.add_argument('--repeat', type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,327 @@
+"""
+Replay recorded calls through TwilioMediaConsumer, offline.
+
+A recording (``calls.recorder``, written with ``CALL_RECORD_DIR`` set) holds
+one call's inbound audio and what Deepgram, the LLM and ElevenLabs sent
+back, with timestamps. This drives the current consumer with it:
+
+- the recorded Twilio ``start``, every inbound media frame and the ``stop``
+  are sent at their recorded times (``FakeTwilioStream`` plays the reply
+  audio on a local clock and acks marks as Twilio would)
+- Deepgram: the recorded results (interim and final) are handed to the
+  consumer's transcript handler at their recorded times; the audio still
+  goes through the STT send queue, which discards it
+- LLM: each reply request gets the next recorded reply, with its recorded
+  time to first token and gaps between tokens
+- TTS: each reply gets the next recorded synthesis: ulaw silence of the
+  recorded lengths, the first chunk the recorded delay after the first text
+  arrives and the rest at their recorded offsets
+
+The consumer's own logic (VAD, echo filter, barge-in, debounce, segmenter,
+playback pacing) runs for real, so a change to it can be measured against
+real conversations. Replies are matched to requests by order: if the
+change makes the consumer ask for more replies than the call had, the
+extra ones fail (LLM) or are synthesized at a flat rate (TTS), and the
+run reports how many.
+
+Reported per call: every turn's stage timeline (``calls.turns``, ms after
+the caller stopped speaking) and whether it was interrupted; then the
+round trip p50/p90/p99 over all turns.
+
+``--speed`` above 1 compresses the caller's audio and the provider delays,
+but the consumer's own timers (debounce, playback pacing) and the playback
+clock still run in real time: use it to smoke-test recordings, and compare
+latencies at ``--speed 1``. Nothing is written to a database; set
+``CALL_LOG_LEVEL=INFO`` to see the consumer's call log.
+
+Usage (from backend/):
+    python tests/bench_replay.py RECORDING_OR_DIR [...] [--speed 1]
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for key, value in {
+    'DJANGO_SETTINGS_MODULE': 'core.settings',
+    'DOMAIN': 'localhost',
+    'DEEPGRAM_API_KEY': 'fake',
+    'GROQ_API_KEY': 'fake',
+    'ELEVENLABS_API_KEY': 'fake',
+    'CALL_LOG_LEVEL': 'WARNING',
+}.items():
+    os.environ.setdefault(key, value)
+# Replayed audio is ulaw; replays are not recorded, cached or stored
+os.environ['ELEVENLABS_OUTPUT_FORMAT'] = 'ulaw_8000'
+os.environ['TTS_CACHE_DIR'] = ''
+os.environ['CALL_RECORD_DIR'] = ''
+os.environ['DATABASE_URL'] = 'sqlite://:memory:'
+
+import django  # noqa: E402
+
+django.setup()
+
+from calls import consumers, llm, recorder, tts, turns  # noqa: E402
+from calls.stt import AudioSendQueue  # noqa: E402
+from fakes import FakeTwilioStream  # noqa: E402
+
+SILENCE = 0xff
+# For replies the recording has no audio for: about 14 characters of speech a second
+FALLBACK_BYTES_PER_CHAR = 570
+FALLBACK_FIRST_AUDIO = 0.3
+
+
+class ReplayReply:
+    """Recorded tokens, each after its recorded gap."""
+
+    def __init__(self, tokens, speed):
+        self.tokens = tokens
+        self.speed = speed
+
+    async def __aiter__(self):
+        for gap, text in self.tokens:
+            if gap > 0:
+                await asyncio.sleep(gap / self.speed)
+            yield text
+
+    async def close(self):
+        pass
+
+
+class ReplayLLM:
+    """Stands in for the LLM gateway: the recorded replies, in order."""
+
+    def __init__(self, replies, speed):
+        self.replies = iter(replies)
+        self.speed = speed
+        self.served = 0
+        self.missing = 0
+
+    async def open(self, messages, **params):
+        reply = next(self.replies, None)
+        if reply is None:
+            self.missing += 1
+            raise llm.LLMError("The recording has no more LLM replies")
+        self.served += 1
+        if reply.first_delay is None:
+            if reply.error:
+                raise llm.LLMError(reply.error)
+            # Cancelled before its first token in the recording: wait to be cancelled again
+            await asyncio.Event().wait()
+        await asyncio.sleep(reply.first_delay / self.speed)
+        return ReplayReply(reply.tokens, self.speed)
+
+
+class ReplayTTS(tts.TTSSession):
+    """Stands in for the call's TTS session: the recorded syntheses, in order, as ulaw silence."""
+
+    def __init__(self, replies, speed):
+        self.replies = iter(replies)
+        self.speed = speed
+        self.served = 0
+        self.missing = 0
+
+    async def stream(self, text_iterator):
+        loop = asyncio.get_running_loop()
+        reply = next(self.replies, None)
+        if reply is None or reply.first_delay is None:
+            self.missing += 1
+            reply = None
+        else:
+            self.served += 1
+
+        text = []
+        first_text = asyncio.Event()
+
+        async def take_text():
+            try:
+                async for chunk in text_iterator:
+                    if chunk and chunk.strip():
+                        text.append(chunk)
+                        first_text.set()
+            finally:
+                first_text.set()
+
+        reader = asyncio.create_task(take_text())
+        try:
+            if reply is None:
+                await reader
+                await asyncio.sleep(FALLBACK_FIRST_AUDIO / self.speed)
+                length = len("".join(text)) * FALLBACK_BYTES_PER_CHAR
+                for offset in range(0, length, 800):
+                    yield bytes([SILENCE]) * min(800, length - offset)
+                return
+
+            if reply.first_text_at is not None:
+                await first_text.wait()
+            await asyncio.sleep(reply.first_delay / self.speed)
+            first_audio = loop.time()
+            for offset, length in reply.chunks:
+                delay = first_audio + offset / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield bytes([SILENCE]) * length
+            await reader
+        finally:
+            reader.cancel()
+
+
+def transcript_result(result):
+    """The parts of a Deepgram result the consumer reads."""
+    alternative = SimpleNamespace(transcript=result['text'], confidence=result['confidence'])
+    return SimpleNamespace(channel=SimpleNamespace(alternatives=[alternative]), is_final=result['final'])
+
+
+class ReplayConsumer(consumers.TwilioMediaConsumer):
+    """The consumer with its providers served from ``recording``; each instance adds itself to ``instances``."""
+
+    def __init__(self, recording, speed, instances, **kwargs):
+        super().__init__(**kwargs)
+        self.recording = recording
+        self.speed = speed
+        self.timelines = []
+        self.stt_feed = None
+        instances.append(self)
+
+    async def connect(self):
+        await super().connect()
+        self.llm = ReplayLLM(self.recording.llm_replies(), self.speed)
+
+    async def disconnect(self, close_code):
+        if self.stt_feed is not None:
+            self.stt_feed.cancel()
+        await super().disconnect(close_code)
+
+    def _create_tts(self, provider):
+        return ReplayTTS(self.recording.tts_replies(), self.speed)
+
+    async def _take_preanswer(self):
+        return None
+
+    async def _load_session(self):
+        pass  # No session: nothing is written to the database
+
+    async def _start_deepgram(self):
+        async def discard(audio):
+            pass
+
+        self.stt_queue = AudioSendQueue(
+            discard,
+            max_frames=consumers.STT_QUEUE_MAX_MS // 20,
+            batch_ms=consumers.STT_BATCH_MS,
+            policy=consumers.STT_QUEUE_POLICY,
+        )
+        self.stt_queue.start()
+        self.stt_feed = asyncio.create_task(self._feed_transcripts())
+
+    async def _feed_transcripts(self):
+        loop = asyncio.get_running_loop()
+        for at, result in self.recording.transcripts():
+            delay = self.connected_at + at / self.speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._on_transcript(transcript_result(result))
+
+    async def _handle_ai_response(self, text_iterator, full_text_ref, cache_text=None, audio=None):
+        # Every reply goes through the replayed TTS so replies and recorded syntheses stay in step
+        await super()._handle_ai_response(text_iterator, full_text_ref)
+
+    async def _run_turn(self, turn, reply):
+        try:
+            await super()._run_turn(turn, reply)
+        finally:
+            self.timelines.append(turn)
+
+
+def recording_paths(paths):
+    found = []
+    for path in paths:
+        found += sorted(glob.glob(os.path.join(path, '*.callrec'))) if os.path.isdir(path) else [path]
+    return found
+
+
+async def replay(recording, speed):
+    """Drive one recorded call through ``ReplayConsumer``; returns the consumer once the call is over."""
+    instances = []
+    messages = {}
+    for at, text in recording.twilio():
+        event = json.loads(text).get('event')
+        if event in ('start', 'stop'):
+            messages.setdefault(event, (at, text))
+    if 'start' not in messages:
+        raise ValueError("The recording has no Twilio start message")
+
+    meta = recording.meta
+    twilio = FakeTwilioStream(ReplayConsumer.as_asgi(recording=recording, speed=speed, instances=instances),
+                              meta.get('call_sid') or 'CAreplay', meta.get('stream_sid') or 'MZreplay')
+    loop = asyncio.get_running_loop()
+    began = loop.time()
+    await twilio.start(messages['start'][1])
+
+    async def at(offset):
+        delay = began + offset / speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    for i, (offset, frame) in enumerate(recording.media()):
+        await at(offset)
+        await twilio.send(twilio.media_message(frame, i))
+    if 'stop' in messages:
+        await at(messages['stop'][0])
+        await twilio.send(messages['stop'][1])
+    else:
+        await at(recording.duration)
+    await asyncio.sleep(0.1)   # Let the consumer handle the stop before the socket goes
+    await twilio.close()
+    return instances[0]
+
+
+def print_turns(timelines):
+    stages = turns.STAGES[1:]
+    print("  turn  " + " ".join(f"{stage:>16}" for stage in stages) + "  interrupted")
+    for turn in timelines:
+        offsets = turn.offsets_ms()
+        cells = " ".join(f"{offsets[stage]:>16}" if stage in offsets else f"{'-':>16}" for stage in stages)
+        print(f"  {turn.index:>4}  {cells}  {'yes' if turn.interrupted else 'no'}")
+
+
+async def main(args):
+    round_trips = []
+    for path in recording_paths(args.recordings):
+        recording = recorder.load(path)
+        meta = recording.meta
+        print(f"{path}: {meta.get('call_sid') or '-'} recorded {time.strftime('%Y-%m-%d %H:%M', time.localtime(meta['started']))}, "
+              f"{recording.duration:.1f}s, {len(recording.media())} frames, {len(recording.transcripts())} STT results, "
+              f"{len(recording.llm_replies())} LLM replies, {len(recording.tts_replies())} TTS replies")
+        if meta.get('playback_frame_ms') != consumers.PLAYBACK_FRAME_MS:
+            print(f"  recorded with PLAYBACK_FRAME_MS={meta.get('playback_frame_ms')}, replaying with {consumers.PLAYBACK_FRAME_MS}")
+
+        started = time.perf_counter()
+        consumer = await replay(recording, args.speed)
+        timelines = consumer.timelines
+        print(f"  replayed at {args.speed:g}x in {time.perf_counter() - started:.1f}s: {len(timelines)} turns; "
+              f"LLM {consumer.llm.served} served, {consumer.llm.missing} past the recording; "
+              f"TTS {consumer.tts.served} served, {consumer.tts.missing} synthesized at a flat rate")
+        print_turns(timelines)
+
+        for turn in timelines:
+            if all(stage in turn.times for stage in turns.ROUND_TRIP):
+                round_trips.append(round((turn.times[turns.ROUND_TRIP[1]] - turn.times[turns.ROUND_TRIP[0]]) * 1000))
+
+    report = turns.percentiles(round_trips)
+    print(f"Round trip over {len(round_trips)} turns (ms): " +
+          " ".join(f"{q} {'-' if ms is None else ms}" for q, ms in report.items()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('recordings', nargs='+', help="Recordings (.callrec), or directories of them")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay this many times faster than recorded")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+"""
+Per-token cost of splitting streamed LLM output into TTS segments.
+
+Compares ``SentenceSegmenter`` with the original chunking in
+``_generate_and_speak`` (an ``any()`` plus five ``rfind`` calls over the
+whole buffer on every token). The old cost grows with the buffered text, so
+the run-on case, a long stretch with no sentence boundary, is where it
+shows most.
+
+Usage (from backend/):
+    python tests/bench_segmenter.py [--replies 2000]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calls.segmenter import SentenceSegmenter  # noqa: E402
+
+TYPICAL = ("Sure, I can look into that for you right now. Dr. Patel's clinic charges $3.50 per page, "
+           "for copies of records. It opens at 9 a.m. on weekdays, and most requests are handled "
+           "within two business days. Is there anything else I can help you with today?")
+RUN_ON = " ".join(["and then we would need to check the account details with the billing team"] * 8) + "."
+
+
+def tokenize(text):
+    return re.findall(r"\s*[\w$']+|\s*[^\w\s]|\s+", text)
+
+
+def legacy(tokens):
+    """Returns (token index, segment) pairs."""
+    out = []
+    buffer = ""
+    for i, content in enumerate(tokens):
+        buffer += content
+        if any(punct in buffer for punct in ['.', '!', '?', ':', '\n']):
+            last_punct_idx = max(buffer.rfind(p) for p in ['.', '!', '?', ':', '\n'])
+            out.append((i, buffer[:last_punct_idx + 1]))
+            buffer = buffer[last_punct_idx + 1:]
+    if buffer.strip():
+        out.append((len(tokens) - 1, buffer))
+    return out
+
+
+def segmenter(tokens):
+    seg = SentenceSegmenter()
+    out = []
+    for i, content in enumerate(tokens):
+        for segment in seg.push(content):
+            out.append((i, segment))
+    tail = seg.flush()
+    if tail:
+        out.append((len(tokens) - 1, tail))
+    return out
+
+
+def measure(fn, tokens, replies):
+    start = time.process_time()
+    for _ in range(replies):
+        fn(tokens)
+    return (time.process_time() - start) / (replies * len(tokens))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--replies', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'reply':<10}{'tokens':>8}{'chunker':>12}{'us/token':>10}{'segments':>10}{'first segment':>16}")
+    for name, text in (('typical', TYPICAL), ('run-on', RUN_ON)):
+        tokens = tokenize(text)
+        for label, fn in (('legacy', legacy), ('segmenter', segmenter)):
+            segments = fn(tokens)
+            # Tokens that had to arrive before the first segment could go to TTS
+            first_at = segments[0][0] + 1
+            per_token = measure(fn, tokens, args.replies)
+            print(f"{name:<10}{len(tokens):>8}{label:>12}{per_token * 1e6:>10.2f}{len(segments):>10}"
+                  f"{f'token {first_at}':>16}")
+
+
+if __name__ == '__main__':
+    main()
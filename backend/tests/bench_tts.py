@@ -0,0 +1,83 @@
+"""
+Time to first audio per reply: persistent TTS websocket vs a new connection per reply.
+
+Runs against the local fake ElevenLabs server from ``tests/fakes.py``, with
+``--connect-ms`` standing in for what every fresh connection pays (TCP/TLS
+setup plus model warm-up) and ``--first-audio-ms`` for synthesis of the
+first chunk. The persistent session pays the connection once per call; a
+fresh connection per reply, like the old per-reply HTTP request, pays it on
+every turn.
+
+Usage (from backend/):
+    python tests/bench_tts.py [--replies 20] [--connect-ms 150] [--first-audio-ms 60]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calls.tts import WebSocketStreamSession  # noqa: E402
+from fakes import FakeElevenLabs  # noqa: E402
+
+REPLY = ["Sure, ", "I can help with that. ", "Your appointment is on Tuesday at ten. ", "Anything else? "]
+
+
+async def text_chunks():
+    for chunk in REPLY:
+        yield chunk
+
+
+async def first_audio(session):
+    started = time.perf_counter()
+    first = None
+    async for _ in session.stream(text_chunks()):
+        if first is None:
+            first = time.perf_counter() - started
+    return first
+
+
+async def run(args):
+    server = await FakeElevenLabs(connect_delay=args.connect_ms / 1000,
+                                  first_audio_delay=args.first_audio_ms / 1000).start()
+
+    def new_session():
+        return WebSocketStreamSession('key', 'voice', 'eleven_turbo_v2_5', 'ulaw_8000', url=server.ws_url)
+
+    try:
+        fresh = []
+        for _ in range(args.replies):
+            session = new_session()
+            fresh.append(await first_audio(session))
+            await session.close()
+
+        persistent = []
+        session = new_session()
+        await session.open()   # At call start, off the reply path
+        for _ in range(args.replies):
+            persistent.append(await first_audio(session))
+        await session.close()
+    finally:
+        await server.stop()
+
+    print(f"Replies: {args.replies}  connect: {args.connect_ms}ms  first audio: {args.first_audio_ms}ms\n")
+    print(f"{'mode':<26}{'p50 ms':>10}{'max ms':>10}")
+    for name, samples in (('new connection per reply', fresh), ('persistent per call', persistent)):
+        print(f"{name:<26}{statistics.median(samples) * 1000:>10.1f}{max(samples) * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--replies', type=int, default=20)
+    parser.add_argument('--connect-ms', type=float, default=150)
+    parser.add_argument('--first-audio-ms', type=float, default=60)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
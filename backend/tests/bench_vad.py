@@ -0,0 +1,62 @@
+"""
+Per-frame CPU budget of the local energy VAD.
+
+Every live call runs the VAD on 50 inbound frames per second, so the cost
+per 20ms frame decides how many concurrent streams one core can carry
+before barge-in detection itself becomes the bottleneck.
+
+Usage (from backend/):
+    python tests/bench_vad.py [--frames 100000] [--budget 0.05]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calls.audio.vad import EnergyVAD  # noqa: E402
+
+FRAME_BYTES = 160     # 20ms of 8kHz μ-law
+FRAMES_PER_SECOND = 50
+
+
+def make_frames(count, seed=1):
+    """Alternate between near-silence and loud bursts so every code path runs."""
+    rng = random.Random(seed)
+    frames = []
+    for i in range(count):
+        loud = (i // 40) % 2
+        base = 0x90 if loud else 0xF8
+        frames.append(bytes(base + rng.randint(0, 7) for _ in range(FRAME_BYTES)))
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--frames', type=int, default=100_000)
+    parser.add_argument('--budget', type=float, default=0.05,
+                        help="Share of one core the VAD may use (default 5%%)")
+    args = parser.parse_args()
+
+    frames = make_frames(1000)
+    vad = EnergyVAD()
+
+    start = time.process_time()
+    for i in range(args.frames):
+        vad.process(frames[i % len(frames)])
+    elapsed = time.process_time() - start
+
+    per_frame_us = elapsed / args.frames * 1e6
+    per_stream_core = per_frame_us * FRAMES_PER_SECOND / 1e6   # Core-seconds per second of call
+    print(f"Frames processed:         {args.frames:,}")
+    print(f"CPU per 20ms frame:       {per_frame_us:.2f} us")
+    print(f"CPU per stream:           {per_stream_core * 100:.3f}% of one core")
+    print(f"Streams per core at {args.budget:.0%}:   {int(args.budget / per_stream_core):,}")
+    print(f"Streams per core (100%):  {int(1 / per_stream_core):,}")
+
+
+if __name__ == '__main__':
+    main()
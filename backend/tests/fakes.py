@@ -0,0 +1,392 @@
+"""
+Local stand-ins for provider APIs, for tests and benchmarks.
+
+Each fake is a real aiohttp server on 127.0.0.1 speaking just enough of the
+provider's wire protocol for the code under test, with knobs for the
+latencies that matter (connection setup, time to first audio). A latency
+knob is either a fixed number of seconds or a function returning one per
+use; ``latency()`` builds such functions from a spec string.
+
+``FakeTwilioStream`` is the other side: Twilio driving the consumer.
+``with_fakes`` runs an async test with its fakes up.
+"""
+
+import asyncio
+import base64
+import functools
+import json
+import random
+
+from aiohttp import web, WSMsgType
+
+
+def latency(spec):
+    """
+    Seconds to wait, from a spec in milliseconds:
+
+        "200"                fixed
+        "uniform:100:300"    uniform between the two
+        "normal:250:50"      mean, standard deviation (never below 0)
+        "lognormal:250:0.5"  median, sigma (a long right tail, like real APIs)
+
+    A plain number is returned as seconds; anything else as a function.
+    """
+    kind, _, params = str(spec).partition(':')
+    if not params:
+        return float(kind) / 1000
+    a, b = (float(p) for p in params.split(':'))
+    if kind == 'uniform':
+        return lambda: random.uniform(a, b) / 1000
+    if kind == 'normal':
+        return lambda: max(0.0, random.gauss(a, b)) / 1000
+    if kind == 'lognormal':
+        return lambda: random.lognormvariate(0, b) * a / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _delay(value):
+    return value() if callable(value) else value
+
+
+def with_fakes(fixture):
+    """
+    Decorator for async tests: the test runs inside ``fixture(self)``, an async
+    context manager that starts the fakes it needs (keeping them on ``self``)
+    and stops them afterwards. The shared HTTP pools are closed before the
+    fixture exits, so no test hands connections to fakes that are gone to the next.
+    """
+    def decorate(test):
+        @functools.wraps(test)
+        async def wrapper(self):
+            from calls import http  # Here, not at import: benchmarks import the fakes before configuring the app
+
+            async with fixture(self):
+                try:
+                    await test(self)
+                finally:
+                    await http.close()
+        return wrapper
+    return decorate
+
+
+class FakeServer:
+    """Runs an ``aiohttp.web.Application`` on a free local port."""
+
+    def __init__(self):
+        self.app = web.Application()
+        self._runner = None
+        self.port = None
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+
+class FakeElevenLabs(FakeServer):
+    """
+    ElevenLabs multi-context input streaming (``multi-stream-input``).
+
+    Every text chunk comes back as ``bytes_per_char`` bytes of ulaw silence
+    per non-space character, after ``first_audio_delay`` for the first chunk
+    of a context. ``connect_delay`` stands in for TLS setup plus model
+    warm-up on a new connection.
+    """
+
+    def __init__(self, connect_delay=0.0, first_audio_delay=0.0, bytes_per_char=80):
+        super().__init__()
+        self.connect_delay = connect_delay
+        self.first_audio_delay = first_audio_delay
+        self.bytes_per_char = bytes_per_char
+        self.connections = 0
+        self.messages = []
+        self.closed_contexts = []
+        self.app.router.add_get('/v1/text-to-speech/{voice_id}/multi-stream-input', self.handle)
+
+    @property
+    def ws_url(self):
+        return f"ws://127.0.0.1:{self.port}/v1/text-to-speech/{{voice_id}}/multi-stream-input"
+
+    async def handle(self, request):
+        if self.connect_delay:
+            await asyncio.sleep(_delay(self.connect_delay))
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+
+        started = set()
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            data = json.loads(msg.data)
+            self.messages.append(data)
+            if data.get('close_socket'):
+                break
+            context_id = data.get('context_id')
+            if data.get('close_context'):
+                self.closed_contexts.append(context_id)
+                await ws.send_json({'contextId': context_id, 'isFinal': True})
+                continue
+
+            text = data.get('text', '')
+            chars = len(text.replace(' ', ''))
+            if not chars:
+                continue
+            if context_id not in started:
+                started.add(context_id)
+                if self.first_audio_delay:
+                    await asyncio.sleep(_delay(self.first_audio_delay))
+            audio = b'\xff' * (chars * self.bytes_per_char)
+            await ws.send_json({'audio': base64.b64encode(audio).decode(), 'contextId': context_id, 'isFinal': None})
+        await ws.close()
+        return ws
+
+
+class FakeLLM(FakeServer):
+    """
+    OpenAI-compatible ``POST /v1/chat/completions`` with ``stream: true``.
+
+    Streams ``tokens`` as SSE chunks, the first after ``first_token_delay``
+    and the rest ``token_delay`` apart. ``status`` other than 200 fails the
+    request outright.
+    """
+
+    def __init__(self, tokens=("Hello", " there", "."), first_token_delay=0.0, token_delay=0.0, status=200):
+        super().__init__()
+        self.tokens = tokens
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.status = status
+        self.requests = []
+        self.app.router.add_post('/v1/chat/completions', self.handle)
+
+    @property
+    def api_url(self):
+        return f"{self.base_url}/v1"
+
+    async def handle(self, request):
+        body = await request.json()
+        self.requests.append(body)
+        if self.status != 200:
+            return web.json_response({'error': {'message': 'fake failure'}}, status=self.status)
+
+        resp = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await resp.prepare(request)
+        await asyncio.sleep(_delay(self.first_token_delay))
+        for i, token in enumerate(self.tokens):
+            if i and self.token_delay:
+                await asyncio.sleep(_delay(self.token_delay))
+            chunk = {'id': 'fake', 'object': 'chat.completion.chunk', 'model': body.get('model'),
+                     'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]}
+            await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await resp.write(b"data: [DONE]\n\n")
+        return resp
+
+
+class FakeDeepgram(FakeServer):
+    """
+    Deepgram live transcription (``/v1/listen``), one simulated caller per socket.
+
+    Speech is a run of 20ms ulaw frames louder than ``speech_dbfs``. While it
+    lasts, an interim result goes out every ``interim_ms``; once the
+    request's ``endpointing`` (ms) of quieter frames follow, the final result
+    arrives ``final_delay`` later. Transcripts cycle through ``utterances``.
+    """
+
+    def __init__(self, utterances=("What time is my appointment tomorrow",), final_delay=0.0,
+                 interim_ms=300, speech_dbfs=-40.0):
+        super().__init__()
+        self.utterances = utterances
+        self.final_delay = final_delay
+        self.interim_ms = interim_ms
+        self.speech_dbfs = speech_dbfs
+        self.connections = 0
+        self.finals = 0
+        self.app.router.add_get('/v1/listen', self.handle)
+
+    @property
+    def url(self):
+        return self.base_url
+
+    async def handle(self, request):
+        from calls.audio.levels import ulaw_rms_dbfs
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        endpointing = int(request.query.get('endpointing', 500))
+        utterance = self.connections - 1
+        voiced_ms = quiet_ms = 0
+        pending = set()
+
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT:
+                if json.loads(msg.data).get('type') == 'CloseStream':
+                    break
+                continue
+            if msg.type != WSMsgType.BINARY:
+                continue
+            for i in range(0, len(msg.data) - 159, 160):
+                if ulaw_rms_dbfs(msg.data[i:i + 160]) > self.speech_dbfs:
+                    voiced_ms += 20
+                    quiet_ms = 0
+                    if voiced_ms % self.interim_ms == 0:
+                        text = self.utterances[utterance % len(self.utterances)]
+                        words = text.split()
+                        partial = " ".join(words[:max(1, len(words) * voiced_ms // 2000)])
+                        await ws.send_json(_result(partial, False, voiced_ms / 1000))
+                elif voiced_ms:
+                    quiet_ms += 20
+                    if quiet_ms >= endpointing:
+                        text = self.utterances[utterance % len(self.utterances)]
+                        task = asyncio.create_task(self._send_final(ws, text, voiced_ms / 1000))
+                        pending.add(task)
+                        task.add_done_callback(pending.discard)
+                        utterance += 1
+                        voiced_ms = quiet_ms = 0
+
+        for task in pending:
+            task.cancel()
+        await ws.close()
+        return ws
+
+    async def _send_final(self, ws, text, duration):
+        await asyncio.sleep(_delay(self.final_delay))
+        if not ws.closed:
+            self.finals += 1
+            await ws.send_json(_result(text, True, duration))
+
+
+def _result(transcript, is_final, duration):
+    """A live ``Results`` message with every field the SDK's response class requires."""
+    return {
+        'type': 'Results',
+        'channel_index': [0, 1],
+        'duration': duration,
+        'start': 0.0,
+        'is_final': is_final,
+        'speech_final': is_final,
+        'from_finalize': False,
+        'channel': {'alternatives': [{'transcript': transcript, 'confidence': 0.98, 'words': []}]},
+        'metadata': {
+            'request_id': 'fake',
+            'model_uuid': 'fake',
+            'model_info': {'name': 'fake', 'version': 'fake', 'arch': 'fake'},
+        },
+    }
+
+
+class FakeTwilioStream:
+    """
+    Twilio's side of one media stream, driven through Channels' ``WebsocketCommunicator``.
+
+    Outbound audio is "played" on a local clock and each mark is acked once
+    playback reaches it, as Twilio does; a ``clear`` drops the queued audio
+    and acks its marks at once. ``first_audio`` is set by the first outbound
+    frame (clear it before each turn); ``wait_played`` waits for the reply
+    in progress to finish playing.
+    """
+
+    def __init__(self, application, call_sid, stream_sid, path="/media-stream"):
+        from channels.testing import WebsocketCommunicator
+        from calls.twilio_media import MediaFrameEncoder
+
+        self.comm = WebsocketCommunicator(application, path)
+        self.call_sid = call_sid
+        self.stream_sid = stream_sid
+        self.first_audio = asyncio.Event()
+        self.first_audio_at = None
+        self.last_audio_at = 0.0
+        self.play_until = 0.0
+        self.frames_received = 0
+        self._empty_media = len(MediaFrameEncoder(stream_sid).media(b''))
+        self._marks = {}           # name -> task acking it once played
+        self._receiver = None
+
+    def media_message(self, frame, i=0):
+        """An inbound ``media`` message carrying ``frame`` (ulaw bytes)."""
+        return json.dumps({
+            "event": "media", "sequenceNumber": str(i + 2), "streamSid": self.stream_sid,
+            "media": {"track": "inbound", "chunk": str(i + 1), "timestamp": str(i * 20),
+                      "payload": base64.b64encode(frame).decode()},
+        }, separators=(',', ':'))
+
+    async def start(self, start_message=None):
+        """Connect and send ``connected`` and ``start`` (``start_message`` as-is, if given)."""
+        connected, _ = await self.comm.connect()
+        if not connected:
+            raise ConnectionError("Consumer refused the websocket")
+        self._receiver = asyncio.create_task(self._receive())
+        await self.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+        await self.send(start_message or json.dumps(
+            {"event": "start", "start": {"streamSid": self.stream_sid, "callSid": self.call_sid}}))
+
+    async def send(self, text):
+        await self.comm.send_to(text_data=text)
+
+    async def stop(self):
+        await self.send(json.dumps({"event": "stop", "streamSid": self.stream_sid}))
+
+    async def close(self):
+        for task in list(self._marks.values()):
+            task.cancel()
+        await self.comm.disconnect()
+        if self._receiver:
+            self._receiver.cancel()
+
+    async def wait_played(self, timeout):
+        """Wait for reply audio, then for it to finish playing. False if none came within ``timeout``."""
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(self.first_audio.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        while loop.time() < max(self.play_until, self.last_audio_at) + 0.3:
+            await asyncio.sleep(0.1)
+        return True
+
+    async def _receive(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # A timeout here would cancel the consumer, so wait as long as any run could take
+            message = await self.comm.receive_output(timeout=3600)
+            if message['type'] == 'websocket.close':
+                return
+            text = message.get('text')
+            if not text:
+                continue
+            now = loop.time()
+            if text.startswith('{"event":"media"'):
+                # Only the payload length matters: 4 base64 chars per 3 bytes of 8kHz ulaw
+                seconds = (len(text) - self._empty_media) * 3 / 4 / 8000
+                self.frames_received += 1
+                if not self.first_audio.is_set():
+                    self.first_audio_at = now
+                    self.first_audio.set()
+                self.play_until = max(self.play_until, now) + seconds
+                self.last_audio_at = now
+            elif text.startswith('{"event":"mark"'):
+                name = json.loads(text)['mark']['name']
+                self._marks[name] = asyncio.create_task(self._ack_mark(name, self.play_until - now))
+            elif text.startswith('{"event":"clear"'):
+                self.play_until = now
+                for name, task in list(self._marks.items()):
+                    task.cancel()
+                    self._marks[name] = asyncio.create_task(self._ack_mark(name, 0))
+
+    async def _ack_mark(self, name, delay):
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._marks.pop(name, None)
+        await self.send(json.dumps({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}}))
@@ -0,0 +1,108 @@
+from django.test import SimpleTestCase
+
+from calls.audio import FrameChunker
+
+
+class FrameChunkerTests(SimpleTestCase):
+
+    def test_1_emits_fixed_size_frames_in_order(self):
+        """Irregular chunks come out as fixed-size frames plus a short tail"""
+        chunker = FrameChunker(4, capacity_frames=2)
+        data = bytes(range(23))
+        out = []
+        for piece in (data[:3], data[3:12], data[12:13], data[13:]):
+            out.extend(bytes(frame) for frame in chunker.feed(piece))
+
+        self.assertTrue(all(len(frame) == 4 for frame in out))
+        tail = chunker.flush()
+        self.assertEqual(b"".join(out) + bytes(tail), data)
+        self.assertIsNone(chunker.flush())
+
+    def test_2_frames_are_views_into_the_ring(self):
+        """Frames are zero-copy memoryviews over the preallocated buffer"""
+        chunker = FrameChunker(4)
+        frame = next(chunker.feed(b"abcdefgh"))
+        self.assertIsInstance(frame, memoryview)
+        self.assertIs(frame.obj, chunker._buf)
+
+    def test_3_reset_discards_partial_audio(self):
+        """reset() drops the partial frame left over from an interrupted reply"""
+        chunker = FrameChunker(4)
+        list(chunker.feed(b"abcdef"))
+        chunker.reset()
+        self.assertEqual(len(chunker), 0)
+        self.assertEqual([bytes(f) for f in chunker.feed(b"wxyz")], [b"wxyz"])
+
+
+class EnergyVADTests(SimpleTestCase):
+
+    def tone(self, amplitude, ms=20):
+        """μ-law encoded square wave, 20ms per frame at 8kHz."""
+        # 0x80 / 0x00 are ±full scale; quieter codes sit closer to 0xFF / 0x7F
+        high, low = 0xFF - amplitude, 0x7F - amplitude
+        return bytes([high, low] * (ms * 4))
+
+    def test_4_ulaw_table_matches_g711(self):
+        """Decode table matches the reference G.711 values"""
+        from calls.audio.g711 import ulaw_to_pcm16
+        self.assertEqual(ulaw_to_pcm16(b"\x00\x80\xff\x7f").tolist(), [-32124, 32124, 0, 0])
+
+    def test_5_detects_speech_start_and_end(self):
+        """Speech starts after a few loud frames and ends after the hangover"""
+        from calls.audio.vad import EnergyVAD, SPEECH_START, SPEECH_END
+        vad = EnergyVAD(start_frames=3, hangover_frames=5)
+        silence = b"\xff" * 160
+
+        events = [vad.process(silence) for _ in range(10)]
+        events += [vad.process(self.tone(0x40)) for _ in range(5)]
+        events += [vad.process(silence) for _ in range(6)]
+
+        self.assertEqual([e for e in events if e], [SPEECH_START, SPEECH_END])
+        self.assertEqual(events.index(SPEECH_START), 12)  # Third loud frame
+        self.assertFalse(vad.speaking)
+
+    def test_6_ignores_steady_background_noise(self):
+        """A constant low hiss is learned as the noise floor, not speech"""
+        from calls.audio.vad import EnergyVAD
+        vad = EnergyVAD(threshold_db=-60.0)
+        hiss = self.tone(0x08)
+        events = [vad.process(hiss) for _ in range(200)]
+        self.assertNotIn('speech_start', events[100:])
+        self.assertFalse(vad.speaking)
+
+
+class CodecAndResamplerTests(SimpleTestCase):
+
+    def test_7_ulaw_round_trip(self):
+        """Encoding then decoding stays within μ-law quantisation error"""
+        import numpy as np
+        from calls.audio import pcm16_to_ulaw, ulaw_to_pcm16
+        pcm = np.linspace(-30000, 30000, 4001).astype(np.int16)
+        decoded = ulaw_to_pcm16(pcm16_to_ulaw(pcm)).astype(np.int32)
+        error = np.abs(decoded - pcm)
+        self.assertTrue(np.all(error <= np.abs(pcm.astype(np.int32)) // 16 + 8))
+
+    def test_8_resampler_is_seamless_across_chunks(self):
+        """Feeding 20ms chunks gives the same output as one big buffer"""
+        import numpy as np
+        from calls.audio import Resampler
+        t = np.arange(8000) / 8000
+        pcm = (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+        for out_rate in (16000, 22050, 24000, 44100):
+            whole = Resampler(8000, out_rate).process(pcm)
+            chunked = Resampler(8000, out_rate)
+            parts = np.concatenate([chunked.process(pcm[i:i + 160]) for i in range(0, len(pcm), 160)])
+            self.assertEqual(len(whole), out_rate)
+            self.assertTrue(np.array_equal(whole, parts))
+
+    def test_9_pcm_tts_output_becomes_ulaw_8000(self):
+        """A pcm_24000 TTS stream split at odd byte offsets comes out as 8kHz μ-law"""
+        import numpy as np
+        from calls.audio import TTSTranscoder, ulaw_rms_dbfs
+        t = np.arange(24000) / 24000
+        pcm = (8000 * np.sin(2 * np.pi * 300 * t)).astype('<i2').tobytes()
+        transcoder = TTSTranscoder('pcm_24000')
+        out = b"".join(transcoder.process(pcm[i:i + 1001]) for i in range(0, len(pcm), 1001))
+        self.assertEqual(len(out), 8000)
+        # 8000-peak sine is ~ -15 dBFS RMS
+        self.assertAlmostEqual(ulaw_rms_dbfs(out[1000:]), -15.3, delta=0.5)
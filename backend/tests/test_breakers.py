@@ -0,0 +1,107 @@
+from django.test import SimpleTestCase
+
+from calls import breakers, http
+from calls.breakers import CircuitBreaker, CircuitOpenError
+from calls.llm import Gateway, LLMError, Provider
+from fakes import FakeLLM
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def test_1_opens_after_consecutive_failures_and_probes_after_reset(self):
+        """Closed -> open after N failures -> one half-open probe -> closed or open again"""
+        clock = FakeClock()
+        breaker = CircuitBreaker('test', failures=3, reset_seconds=10, clock=clock)
+        breaker.record_failure(ConnectionError())
+        breaker.record_success()
+        for _ in range(2):
+            breaker.record_failure(ConnectionError())
+        self.assertTrue(breaker.allow())
+
+        breaker.record_failure(ConnectionError("down"))
+        self.assertEqual(breaker.state, breakers.OPEN)
+        self.assertFalse(breaker.allow())
+        self.assertRaises(CircuitOpenError, breaker.check)
+        self.assertEqual(breaker.stats()['retry_in_seconds'], 10.0)
+
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, breakers.HALF_OPEN)
+        self.assertFalse(breaker.allow())        # Only one probe at a time
+        breaker.record_failure(ConnectionError())
+        self.assertEqual(breaker.state, breakers.OPEN)
+
+        clock.now = 20
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, breakers.CLOSED)
+        self.assertEqual(breaker.stats()['consecutive_failures'], 0)
+
+    async def test_2_retries_within_the_latency_budget(self):
+        """Failures are retried while another attempt fits the budget; an open circuit is not called"""
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("reset")
+            return "ok"
+
+        breaker = CircuitBreaker('test', failures=5)
+        self.assertEqual(await breakers.retry(breaker, flaky, budget=1.0, base_delay=0.01), "ok")
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(breaker.failures, 0)
+
+        attempts.clear()
+        with self.assertRaises(ConnectionError):
+            await breakers.retry(breaker, flaky, budget=0)
+        self.assertEqual(len(attempts), 1)
+
+        breaker = CircuitBreaker('test', failures=1)
+        breaker.record_failure()
+        attempts.clear()
+        with self.assertRaises(CircuitOpenError):
+            await breakers.retry(breaker, flaky, budget=1.0)
+        self.assertEqual(attempts, [])
+
+    async def test_3_open_llm_circuit_fails_over_without_a_request(self):
+        """A failing LLM provider opens its circuit; later replies skip it without contacting it"""
+        broken = await FakeLLM(status=503).start()
+        backup = await FakeLLM(tokens=("Backup", ".")).start()
+        try:
+            broken_provider = Provider('broken', broken.api_url, 'key', 'model',
+                                       breaker=CircuitBreaker('broken', failures=2))
+            backup_provider = Provider('backup', backup.api_url, 'key', 'model',
+                                       breaker=CircuitBreaker('backup', failures=2))
+            gateway = Gateway([broken_provider, backup_provider], hedge_after_ms=5000)
+            for _ in range(3):
+                reply = await gateway.open([{"role": "user", "content": "hi"}])
+                self.assertEqual(reply.provider.name, 'backup')
+                await reply.close()
+            self.assertEqual(len(broken.requests), 2)
+            self.assertEqual(broken_provider.stats()['circuit'], breakers.OPEN)
+
+            alone = Gateway([broken_provider], timeout_ms=5000)
+            with self.assertRaisesRegex(LLMError, "circuit open"):
+                await alone.open([{"role": "user", "content": "hi"}])
+            self.assertEqual(len(broken.requests), 2)
+        finally:
+            await http.close()
+            await broken.stop()
+            await backup.stop()
+
+    def test_4_providers_endpoint_reports_breaker_state(self):
+        """GET /calls/providers/ lists every provider's circuit"""
+        response = self.client.get('/calls/providers/')
+        self.assertEqual(response.status_code, 200)
+        for name in breakers.PROVIDERS:
+            self.assertIn(response.json()[name]['state'], (breakers.CLOSED, breakers.HALF_OPEN, breakers.OPEN))
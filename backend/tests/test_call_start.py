@@ -0,0 +1,81 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+from django.test import SimpleTestCase
+
+from calls import breakers
+from calls.consumers import TwilioMediaConsumer, GREETING_TEXT, STT_UNAVAILABLE_TEXT
+
+START = {'event': 'start', 'start': {'streamSid': 'MZ-start', 'callSid': 'CA-start'}}
+
+
+class CallStartTests(SimpleTestCase):
+
+    async def make_consumer(self, delay=0.1):
+        consumer = TwilioMediaConsumer()
+        consumer.accept = AsyncMock()
+        await consumer.connect()
+        loop = asyncio.get_running_loop()
+        self.greeting_at = None
+
+        self.finished = []
+
+        async def slow(*args):
+            await asyncio.sleep(delay)
+            self.finished.append(loop.time())
+
+        async def speak(text, audio=None):
+            self.greeting_at = loop.time()
+
+        consumer._load_session = slow
+        consumer._fetch_context = slow
+        consumer._start_deepgram = slow
+        consumer._open_tts = slow
+        consumer._speak_phrase = speak
+        consumer._log_event = Mock()
+        consumer._save_message = Mock()
+        return consumer
+
+    async def test_1_stages_overlap_and_greeting_goes_first(self):
+        """Deepgram and TTS connect alongside session+context, and the greeting doesn't wait for any of them"""
+        consumer = await self.make_consumer(delay=0.1)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await consumer._handle_start(START)
+        await consumer.startup_task
+        elapsed = loop.time() - started
+
+        # Session, context, Deepgram and TTS each take 0.1s: serially that is 0.4s,
+        # but only session -> context is a chain, so the stages must have overlapped
+        self.assertEqual(len(self.finished), 4)
+        self.assertLess(elapsed, 0.4)
+        self.assertLess(self.greeting_at, min(self.finished))
+        self.assertTrue(consumer.prompt_ready.is_set())
+        self.assertEqual(set(consumer.start_timings), {'preanswer', 'session', 'context', 'deepgram', 'tts'})
+        consumer._save_message.assert_called_with('assistant', GREETING_TEXT)
+
+    async def test_2_receive_loop_is_not_blocked_by_start_up(self):
+        """_handle_start returns at once; turns wait for the system prompt"""
+        consumer = await self.make_consumer(delay=0.2)
+        await consumer._handle_start(START)
+        self.assertFalse(consumer.startup_task.done())
+        self.assertFalse(consumer.prompt_ready.is_set())
+        await consumer.startup_task
+        self.assertEqual(consumer.memory.messages()[0]['role'], 'system')
+
+    async def test_3_no_transcription_ends_the_call(self):
+        """When Deepgram can't start (here its circuit is open), Twilio apologizes and hangs up"""
+        consumer = await self.make_consumer()
+        consumer.call_sid = 'CA-start'
+        consumer._update_call = AsyncMock()
+        breaker = breakers.CircuitBreaker('deepgram-start-test', failures=1)
+        breaker.record_failure(ConnectionError("down"))
+
+        with patch('calls.consumers.stt_breaker', breaker):
+            await TwilioMediaConsumer._start_deepgram(consumer)
+
+        self.assertIsNone(consumer.stt_queue)
+        twiml = consumer._update_call.await_args[0][0]
+        self.assertIn(STT_UNAVAILABLE_TEXT, twiml)
+        self.assertIn('<Hangup/>', twiml)
+        await consumer.tts.close()
@@ -0,0 +1,68 @@
+import io
+import json
+import logging
+import queue
+
+from django.test import SimpleTestCase
+
+from calls import calllog
+from calls.calllog import CallLogger, DroppingQueueHandler
+
+
+class CallLogTests(SimpleTestCase):
+
+    def setUp(self):
+        self.out = io.StringIO()
+
+    def tearDown(self):
+        calllog.configure()
+
+    def written(self):
+        calllog.shutdown()   # Drains the queue through the writer thread
+        return self.out.getvalue().splitlines()
+
+    def test_1_records_carry_call_ids_turn_and_fields(self):
+        """JSON lines are tagged with call_sid, stream_sid and the turn at the time of logging"""
+        calllog.configure(self.out, fmt='json')
+        turn = [0]
+        log = CallLogger(turn=lambda: turn[0], sampled=False)
+        log.bind("CA123", "MZ456")
+        turn[0] = 3
+        log.info('echo_dropped', "hello there", similarity=0.9)
+
+        entry = json.loads(self.written()[0])
+        self.assertEqual((entry['event'], entry['msg'], entry['level']), ('echo_dropped', "hello there", 'INFO'))
+        self.assertEqual((entry['call_sid'], entry['stream_sid'], entry['turn']), ("CA123", "MZ456", 3))
+        self.assertEqual(entry['similarity'], 0.9)
+
+    def test_2_levels_and_sampling_are_per_call(self):
+        """Sampled calls log DEBUG detail; others drop it before a record is built"""
+        calllog.configure(self.out, fmt='text')
+        quiet = CallLogger(sampled=False, level='INFO')
+        traced = CallLogger(sampled=True, level='DEBUG')
+        quiet.bind("CAquiet", "MZ1")
+        traced.bind("CAtraced", "MZ2")
+        for log in (quiet, traced):
+            log.debug('transcript_chunk', "hi", confidence=0.98)
+            log.warning('clear_failed', "boom")
+
+        lines = self.written()
+        self.assertEqual(len(lines), 3)
+        # One writer drains the queue in order: quiet's DEBUG record was never queued
+        self.assertTrue(lines[0].endswith("WARNING [CAquiet] clear_failed: boom"))
+        self.assertTrue(lines[1].endswith("DEBUG [CAtraced] transcript_chunk: hi confidence=0.98"))
+        self.assertTrue(lines[2].endswith("WARNING [CAtraced] clear_failed: boom"))
+        self.assertFalse(any('CAquiet' in line and 'DEBUG' in line for line in lines))
+
+        quiet.set_level('DEBUG')
+        self.assertTrue(quiet.enabled(logging.DEBUG))
+
+    def test_3_full_queue_drops_instead_of_blocking(self):
+        """A stalled writer costs dropped records, never a blocked event loop"""
+        handler = DroppingQueueHandler(queue.Queue(2))
+        dropped = calllog.RECORDS_DROPPED.value
+        for i in range(5):
+            handler.emit(logging.makeLogRecord({'msg': 'chunk %d', 'args': (i,)}))
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(calllog.RECORDS_DROPPED.value - dropped, 3)
+        self.assertEqual(handler.queue.get_nowait().msg, 'chunk 0')
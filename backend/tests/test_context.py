@@ -0,0 +1,76 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from aiohttp import web
+from django.test import SimpleTestCase
+
+from calls.context import ContextCache, ContextError
+from fakes import FakeServer, with_fakes
+
+
+@asynccontextmanager
+async def fake_crm(self):
+    """A local context API that counts its requests."""
+    self.requests = []
+
+    async def handle(request):
+        self.requests.append(request.headers.get('Authorization'))
+        await asyncio.sleep(0.05)
+        return web.json_response({'name': 'Asha', 'plan': 'gold'})
+
+    async def large(request):
+        return web.Response(body=b'"' + b'x' * 4096 + b'"', content_type='application/json')
+
+    self.server = FakeServer()
+    self.server.app.router.add_get('/customer', handle)
+    self.server.app.router.add_get('/large', large)
+    await self.server.start()
+    self.url = self.server.base_url + '/customer'
+    try:
+        yield
+    finally:
+        await self.server.stop()
+
+
+with_fake_crm = with_fakes(fake_crm)
+
+
+class ContextCacheTests(SimpleTestCase):
+
+    @with_fake_crm
+    async def test_1_concurrent_lookups_share_one_request(self):
+        """Lookups racing for the same URL and headers hit the API once; later ones hit the cache"""
+        cache = ContextCache(ttl=60)
+        results = await asyncio.gather(*[cache.get(self.url, {'Authorization': 'a'}) for _ in range(5)])
+        self.assertEqual(results, [{'name': 'Asha', 'plan': 'gold'}] * 5)
+        self.assertEqual(len(self.requests), 1)
+
+        await cache.get(self.url, {'Authorization': 'a'})
+        self.assertEqual(len(self.requests), 1)
+        await cache.get(self.url, {'Authorization': 'b'})
+        self.assertEqual(self.requests, ['a', 'b'])
+
+    @with_fake_crm
+    async def test_2_entries_expire_and_are_evicted(self):
+        """Expired entries are fetched again; the LRU holds at most max_entries"""
+        cache = ContextCache(ttl=0.1, max_entries=1)
+        await cache.get(self.url)
+        self.assertIsNotNone(cache.peek(self.url))
+        await asyncio.sleep(0.15)
+        self.assertIsNone(cache.peek(self.url))
+        await cache.get(self.url)
+        self.assertEqual(len(self.requests), 2)
+
+        await cache.get(self.url, {'Authorization': 'other'})
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.peek(self.url))
+
+    @with_fake_crm
+    async def test_3_oversized_and_failed_responses_are_not_cached(self):
+        """Bodies over the size cap and non-200 answers raise ContextError and leave no entry"""
+        cache = ContextCache(max_bytes=1024)
+        with self.assertRaises(ContextError):
+            await cache.get(self.server.base_url + '/large')
+        with self.assertRaises(ContextError):
+            await cache.get(self.server.base_url + '/missing')
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,16 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import SimpleTestCase
+
+from calls import db
+
+
+def conn_max_age():
+    return connections[DEFAULT_DB_ALIAS].settings_dict['CONN_MAX_AGE']
+
+
+class DBPoolTests(SimpleTestCase):
+
+    async def test_1_only_workers_keep_their_connection(self):
+        """A pool worker keeps its connection for DB_CONN_MAX_AGE; other threads close theirs after each request"""
+        self.assertEqual(await db.run(conn_max_age), db.DB_CONN_MAX_AGE)
+        self.assertEqual(conn_max_age(), 0)
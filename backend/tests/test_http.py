@@ -0,0 +1,105 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest import mock
+
+from aiohttp import web
+from asgiref.sync import sync_to_async
+from django.test import SimpleTestCase
+
+from calls import consumers, http
+from fakes import FakeServer, with_fakes
+
+
+async def echo(request):
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    async for msg in ws:
+        await ws.send_str(msg.data)
+    return ws
+
+
+@asynccontextmanager
+async def fake_server(self):
+    """A local server answering ``GET /`` (and echoing on ``/ws``)."""
+    self.server = FakeServer()
+    self.server.app.router.add_get('/', lambda request: web.json_response({'ok': True}))
+    self.server.app.router.add_get('/ws', echo)
+    await self.server.start()
+    try:
+        yield
+    finally:
+        await self.server.stop()
+
+
+with_fake_server = with_fakes(fake_server)
+
+
+def snapshot(client):
+    return (http.REQUESTS[client, 'new'].value, http.REQUESTS[client, 'reused'].value,
+            http.CONNECT_SECONDS[client].count)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    @with_fake_server
+    async def test_1_aiohttp_session_reuses_connections(self):
+        """Only the first request on the shared aiohttp session opens a connection"""
+        new, reused, connects = snapshot('aiohttp')
+        session = http.aiohttp_session()
+        for _ in range(3):
+            async with http.aiohttp_session().get(self.server.base_url + '/') as resp:
+                self.assertEqual(await resp.json(), {'ok': True})
+
+        self.assertIs(http.aiohttp_session(), session)
+        self.assertEqual(snapshot('aiohttp'), (new + 1, reused + 2, connects + 1))
+
+    @with_fake_server
+    async def test_2_httpx_clients_reuse_connections(self):
+        """The shared httpx clients (async and sync) count new vs reused connections"""
+        new, reused, connects = snapshot('httpx')
+        for _ in range(3):
+            resp = await http.async_httpx().get(self.server.base_url + '/')
+            self.assertEqual(resp.status_code, 200)
+        self.assertEqual(snapshot('httpx'), (new + 1, reused + 2, connects + 1))
+
+        get = sync_to_async(http.sync_httpx().get, thread_sensitive=False)
+        for _ in range(2):
+            resp = await get(self.server.base_url + '/')
+            self.assertEqual(resp.status_code, 200)
+        self.assertEqual(snapshot('httpx'), (new + 2, reused + 3, connects + 2))
+
+    @with_fake_server
+    async def test_3_call_websockets_are_not_capped_by_the_pool(self):
+        """Websockets held open for a call don't take the shared pool's per-host slots"""
+        with mock.patch.object(http, 'HTTP_POOL_PER_HOST', 2):
+            sockets = await asyncio.wait_for(asyncio.gather(
+                *(http.websocket_session().ws_connect(self.server.base_url + '/ws') for _ in range(3))), 2)
+            async with http.aiohttp_session().get(self.server.base_url + '/') as resp:
+                self.assertEqual(resp.status, 200)
+        for ws in sockets:
+            await ws.close()
+
+    async def test_4_sdk_clients_outlive_a_pool_close(self):
+        """After http.close() the SDK clients are rebuilt on the new pool instead of keeping the closed one"""
+        groq, elevenlabs = consumers.groq_client(), consumers.el_client()
+        self.assertIs(consumers.groq_client(), groq)
+        await http.close()
+        self.assertIsNot(consumers.groq_client(), groq)
+        self.assertIsNot(consumers.el_client(), elevenlabs)
+        self.assertFalse(http.async_httpx().is_closed)
+        await http.close()
+
+    def test_5_a_session_left_on_a_finished_loop_is_closed(self):
+        """A session made on an earlier event loop is closed when the next loop replaces it"""
+        async def session():
+            return http.aiohttp_session()
+
+        async def replace():
+            replacement = http.aiohttp_session()
+            await asyncio.sleep(0)
+            await http.close()
+            return replacement
+
+        old = asyncio.run(session())
+        self.assertIsNot(asyncio.run(replace()), old)
+        self.assertTrue(old.closed)
@@ -0,0 +1,93 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from calls import llm
+from calls.llm import Gateway, LLMError, Provider
+from fakes import FakeLLM, with_fakes
+
+
+def with_fake_llms(**configs):
+    """Run the test against one fake OpenAI-compatible server per keyword (name=FakeLLM kwargs)."""
+    @asynccontextmanager
+    async def fake_llms(self):
+        self.servers = {name: await FakeLLM(**kwargs).start() for name, kwargs in configs.items()}
+        self.providers = [Provider(name, server.api_url, 'key', f"{name}-model")
+                          for name, server in self.servers.items()]
+        try:
+            yield
+        finally:
+            for server in self.servers.values():
+                await server.stop()
+    return with_fakes(fake_llms)
+
+
+async def collect(reply):
+    try:
+        return "".join([text async for text in reply])
+    finally:
+        await reply.close()
+
+
+class GatewayTests(SimpleTestCase):
+
+    @with_fake_llms(fast={}, backup={})
+    async def test_1_fast_primary_is_not_hedged(self):
+        """A primary that answers before the deadline is the only request sent"""
+        gateway = Gateway(self.providers, hedge_after_ms=200)
+        reply = await gateway.open([{"role": "user", "content": "hi"}], max_tokens=10)
+        self.assertEqual(reply.provider.name, 'fast')
+        self.assertEqual(await collect(reply), "Hello there.")
+        self.assertEqual(self.servers['fast'].requests[0]['model'], 'fast-model')
+        self.assertEqual(self.servers['fast'].requests[0]['max_tokens'], 10)
+        self.assertEqual(self.servers['backup'].requests, [])
+
+    @with_fake_llms(slow={'first_token_delay': 1.0}, backup={'tokens': ("Backup", ".")})
+    async def test_2_slow_primary_is_hedged(self):
+        """No first token by the deadline: the hedge is sent and the first to answer wins"""
+        gateway = Gateway(self.providers, hedge_after_ms=50)
+        reply = await gateway.open([{"role": "user", "content": "hi"}])
+        self.assertEqual(reply.provider.name, 'backup')
+        self.assertEqual(await collect(reply), "Backup.")
+        self.assertEqual(len(self.servers['slow'].requests), 1)
+        self.assertEqual(len(self.providers[1].ttft), 1)
+        # The cancelled primary still counts, with the time it had waited
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.providers[0].ttft), 1)
+        self.assertGreaterEqual(self.providers[0].ttft.percentile(50), 0.05)
+
+    @with_fake_llms(broken={'status': 503}, backup={})
+    async def test_3_failed_primary_is_hedged_at_once(self):
+        """A primary error sends the hedge immediately; all failing raises LLMError"""
+        gateway = Gateway(self.providers, hedge_after_ms=5000)
+        reply = await gateway.open([{"role": "user", "content": "hi"}])
+        self.assertEqual(reply.provider.name, 'backup')
+        await reply.close()
+
+        self.servers['backup'].status = 500
+        with self.assertRaises(LLMError):
+            await gateway.open([{"role": "user", "content": "hi"}])
+
+    @with_fake_llms(primary={'first_token_delay': 0.02})
+    async def test_4_deadline_adapts_to_primary_ttft(self):
+        """The hedge deadline follows the primary's p90 TTFT, within its bounds"""
+        gateway = Gateway(self.providers, hedge_after_ms=0)
+        self.assertEqual(gateway.hedge_deadline(), 0.8)
+        for seconds in [0.3] * 18 + [0.6] * 2:
+            self.providers[0].ttft.add(seconds)
+        self.assertEqual(gateway.hedge_deadline(), 0.6)
+        self.assertEqual(gateway.stats()['providers']['primary']['ttft_p50_ms'], 300)
+
+    def test_5_hedging_defaults_to_another_target_only(self):
+        """By default the hedge is only sent to a different endpoint or model, never as a duplicate request"""
+        with patch.object(llm, 'LLM_HEDGE', 'auto'), patch.object(llm, 'LLM_HEDGE_BASE_URL', ''):
+            with patch.object(llm, 'LLM_HEDGE_MODEL', ''):
+                self.assertFalse(llm.hedge_enabled('model-a'))
+            with patch.object(llm, 'LLM_HEDGE_MODEL', 'model-a'):
+                self.assertFalse(llm.hedge_enabled('model-a'))
+            with patch.object(llm, 'LLM_HEDGE_MODEL', 'model-b'):
+                self.assertTrue(llm.hedge_enabled('model-a'))
+        with patch.object(llm, 'LLM_HEDGE', 'true'):
+            self.assertTrue(llm.hedge_enabled('model-a'))
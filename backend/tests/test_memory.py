@@ -0,0 +1,87 @@
+import asyncio
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from calls.memory import ConversationMemory, estimate_tokens, message_tokens
+
+
+def turn(i):
+    return ("user" if i % 2 == 0 else "assistant", f"Turn {i}: " + "words " * 20)
+
+
+class ConversationMemoryTests(SimpleTestCase):
+
+    async def test_1_short_calls_are_sent_verbatim(self):
+        """Under budget the prompt is the system prompt plus every turn"""
+        async def summarize(summary, turns):
+            raise AssertionError("should not summarize")
+
+        memory = ConversationMemory("Be brief.", summarize, budget=1000)
+        for i in range(4):
+            memory.add(*turn(i))
+        messages = memory.messages()
+        self.assertEqual(len(messages), 5)
+        self.assertEqual(messages[0], {"role": "system", "content": "Be brief."})
+        self.assertEqual(messages[-1]["content"], turn(3)[1])
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+
+    async def test_2_older_turns_are_folded_into_a_summary(self):
+        """Past the budget, older turns are summarized while recent ones stay verbatim"""
+        calls = []
+
+        async def summarize(summary, turns):
+            calls.append((summary, [t["content"] for t in turns]))
+            await asyncio.sleep(0.01)
+            return f"summary of {len(turns)} turns"
+
+        memory = ConversationMemory("Be brief.", summarize, budget=150, keep_recent=2)
+        for i in range(6):
+            memory.add(*turn(i))
+        await memory.wait()
+
+        self.assertEqual(len(calls), 1)
+        self.assertIsNone(calls[0][0])
+        messages = memory.messages()
+        self.assertEqual(messages[1]["content"], f"Summary of the call so far: summary of {len(calls[0][1])} turns")
+        kept = [m["content"] for m in messages[2:]]
+        self.assertEqual(kept, [turn(i)[1] for i in range(6)][-len(kept):])
+        self.assertEqual(len(memory.turns), 4)
+        self.assertLessEqual(sum(message_tokens(m) for m in messages), 150)
+
+    async def test_3_prompt_stays_in_budget_while_summary_is_pending(self):
+        """A turn answered mid-summary leaves out the oldest turns; a failed summary keeps them for later"""
+        release = asyncio.Event()
+
+        async def summarize(summary, turns):
+            await release.wait()
+            raise RuntimeError("LLM down")
+
+        memory = ConversationMemory("Be brief.", summarize, budget=100, keep_recent=2)
+        for i in range(4):
+            memory.add(*turn(i))
+        await asyncio.sleep(0)
+        pending = memory.messages()
+        self.assertEqual([m["content"] for m in pending[1:]], [turn(2)[1], turn(3)[1]])
+
+        release.set()
+        await memory.wait()
+        self.assertEqual(len(memory.turns), 4)
+        self.assertIsNone(memory.summary)
+        self.assertEqual(memory.messages(), pending)
+
+    async def test_4_failed_summaries_back_off(self):
+        """A summarizer that keeps failing is retried after a few new messages, not on every one"""
+        calls = []
+
+        async def summarize(summary, turns):
+            calls.append(len(turns))
+            raise RuntimeError("LLM down")
+
+        memory = ConversationMemory("Be brief.", summarize, budget=100, keep_recent=2)
+        with patch('calls.memory.MEMORY_SUMMARY_RETRY_TURNS', 4):
+            for i in range(17):
+                memory.add(*turn(i))
+                await memory.wait()
+        # Over budget from the 3rd message: tried then, after 4 more messages, then after 8 more
+        self.assertEqual(len(calls), 3)
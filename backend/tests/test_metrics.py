@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+from django.test import SimpleTestCase
+
+import calls.consumers  # noqa: F401  (registers the consumer's metrics, as the ASGI app does)
+from calls import lag, metrics
+
+
+class MetricsExpositionTests(SimpleTestCase):
+
+    def test_1_render_is_prometheus_text(self):
+        """Families get HELP/TYPE once; histogram buckets are cumulative with +Inf, _sum and _count"""
+        metrics.counter('test_render_total', 'A "counted" thing\nover lines').inc(3)
+        for kind in ('a', 'b"\\'):
+            metrics.gauge('test_render_level', 'Level', {'kind': kind}).set(1.5)
+        latency = metrics.histogram('test_render_seconds', 'Latency', {'client': 'x'}, buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            latency.observe(value)
+
+        text = metrics.render()
+        self.assertIn('# HELP test_render_total A "counted" thing\\nover lines\n# TYPE test_render_total counter\n'
+                      'test_render_total 3\n', text)
+        self.assertEqual(text.count('# TYPE test_render_level gauge'), 1)
+        self.assertIn('test_render_level{kind="a"} 1.5\n', text)
+        self.assertIn('test_render_level{kind="b\\"\\\\"} 1.5\n', text)
+        self.assertIn('test_render_seconds_bucket{client="x",le="0.1"} 1\n'
+                      'test_render_seconds_bucket{client="x",le="1"} 3\n'
+                      'test_render_seconds_bucket{client="x",le="+Inf"} 4\n'
+                      'test_render_seconds_sum{client="x"} 4.05\n'
+                      'test_render_seconds_count{client="x"} 4\n', text)
+
+    def test_2_collectors_refresh_derived_values_before_render(self):
+        """on_collect functions run on every render; a failing one does not break the scrape"""
+        derived = metrics.gauge('test_collected', 'Derived at scrape time')
+        scrapes = []
+
+        @metrics.on_collect
+        def refresh():
+            scrapes.append(1)
+            derived.set(len(scrapes))
+
+        @metrics.on_collect
+        def broken():
+            raise RuntimeError("boom")
+
+        try:
+            metrics.render()
+            self.assertIn('test_collected 2\n', metrics.render())
+        finally:
+            metrics._collectors.remove(refresh)
+            metrics._collectors.remove(broken)
+
+    def test_3_endpoint_serves_the_registry(self):
+        """GET /calls/metrics/ returns the text format, including the call and loop gauges"""
+        response = self.client.get('/calls/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        body = response.content.decode()
+        for name in ('calls_active', 'twilio_media_frames_per_second', 'event_loop_lag_max_seconds',
+                     'llm_ttft_seconds_bucket', 'db_flush_seconds_count', 'context_cache_hit_ratio'):
+            self.assertIn(name, body)
+
+    async def test_4_lag_monitor_sees_a_blocked_loop(self):
+        """A 100ms blocking call shows up as ~100ms of lag, reported once as the scrape's worst"""
+        task = asyncio.create_task(lag.monitor(interval=0.01))
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)          # Blocks the loop, as a sync call on it would
+        await asyncio.sleep(0.02)
+        task.cancel()
+
+        lag.report_worst()
+        self.assertGreaterEqual(lag.LAG_MAX.value, 0.08)
+        lag.report_worst()
+        self.assertEqual(lag.LAG_MAX.value, 0)
@@ -0,0 +1,47 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.test import TransactionTestCase
+
+from calls.models import CallEvent, CallSession, ConversationMessage
+from calls.persistence import WriteBehindBuffer
+
+
+class WriteBehindBufferTests(TransactionTestCase):
+
+    def setUp(self):
+        self.session = CallSession.objects.create(call_sid="CApersist", from_number="+1", to_number="+2")
+
+    def count(self, model):
+        return sync_to_async(model.objects.filter(session=self.session).count)()
+
+    async def test_1_rows_wait_for_flush_and_keep_their_order(self):
+        """Queued rows are written together on flush, in the order they were added"""
+        buffer = WriteBehindBuffer(batch_size=100, flush_interval=60)
+        for i in range(5):
+            buffer.add(CallEvent(session=self.session, event_type='transcription', detail=f"chunk {i}"))
+        buffer.add(ConversationMessage(session=self.session, role='user', content="hello"))
+        self.assertEqual(await self.count(CallEvent), 0)
+
+        rows, batches = await buffer.end_call(self.session.id)
+        self.assertEqual((rows, batches), (6, 1))
+        details = await sync_to_async(list)(
+            CallEvent.objects.filter(session=self.session).order_by('timestamp', 'id').values_list('detail', flat=True))
+        self.assertEqual(details, [f"chunk {i}" for i in range(5)])
+        self.assertEqual(await self.count(ConversationMessage), 1)
+        self.assertEqual(len(buffer), 0)
+
+    async def test_2_size_and_time_thresholds_trigger_a_flush(self):
+        """A full batch is written right away; a partial one after flush_interval"""
+        buffer = WriteBehindBuffer(batch_size=3, flush_interval=0.05)
+        for i in range(3):
+            buffer.add(CallEvent(session=self.session, event_type='timing', detail=str(i)))
+        await asyncio.sleep(0.01)
+        self.assertEqual(await self.count(CallEvent), 3)
+
+        buffer.add(CallEvent(session=self.session, event_type='timing', detail='3'))
+        await asyncio.sleep(0.01)
+        self.assertEqual(await self.count(CallEvent), 3)
+        await asyncio.sleep(0.1)
+        self.assertEqual(await self.count(CallEvent), 4)
+        self.assertEqual(await buffer.end_call(self.session.id), (4, 2))
@@ -0,0 +1,118 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from calls.playback import PacedPlayback
+
+
+class FakeTwilio:
+    """Collects what PacedPlayback would send over the media socket."""
+
+    def __init__(self):
+        self.frames = []
+        self.marks = []
+        self.sent_at = []
+
+    async def send_media(self, frame):
+        self.frames.append(bytes(frame))
+        self.sent_at.append(asyncio.get_running_loop().time())
+
+    async def send_mark(self, name):
+        self.marks.append(name)
+
+
+class PacedPlaybackTests(SimpleTestCase):
+
+    def make_playback(self, twilio, **kwargs):
+        return PacedPlayback(twilio.send_media, twilio.send_mark, **kwargs)
+
+    async def test_1_frames_are_paced_to_real_time(self):
+        """One second of audio takes ~1s minus the lookahead to send"""
+        twilio = FakeTwilio()
+        playback = self.make_playback(twilio, lookahead_ms=100)
+        playback.start()
+
+        start = asyncio.get_running_loop().time()
+        await playback.write(b"\xff" * 8000)
+        elapsed = asyncio.get_running_loop().time() - start
+
+        self.assertEqual(len(twilio.frames), 50)
+        self.assertTrue(all(len(f) == 160 for f in twilio.frames))
+        self.assertGreater(elapsed, 0.8)
+        self.assertLess(elapsed, 1.2)   # Headroom for a loaded test run; unpaced it would be ~0
+
+    async def test_2_marks_track_played_position(self):
+        """Periodic marks are sent and their acks advance played_bytes"""
+        twilio = FakeTwilio()
+        playback = self.make_playback(twilio, lookahead_ms=10_000, mark_interval_ms=100)
+        playback.start()
+        await playback.write(b"\xff" * 2000)
+        await playback.finish()
+
+        self.assertEqual(twilio.marks, ["ai-1-1", "ai-1-2", "ai-1-end"])
+        self.assertTrue(playback.on_mark("ai-1-2"))
+        self.assertEqual(playback.played_bytes, 1600)
+        self.assertFalse(playback.on_mark("ai-0-end"))  # Stale ack from an older reply
+        self.assertTrue(playback.on_mark("ai-1-end"))
+        self.assertTrue(playback.played_all)
+
+    async def test_3_heard_text_after_interrupt(self):
+        """An interrupted reply is cut to the share of audio actually played"""
+        twilio = FakeTwilio()
+        playback = self.make_playback(twilio, lookahead_ms=10_000, mark_interval_ms=250)
+        playback.start()
+        await playback.write(b"\xff" * 8000)
+
+        playback.on_mark("ai-1-2")  # 500ms of 1000ms played
+        playback.interrupt()
+        playback.on_mark("ai-1-4")  # Flushed by 'clear', must be ignored
+
+        text = "one two three four five six seven eight nine ten"
+        self.assertEqual(playback.heard_text(text), "one two three four five...")
+
+    async def test_4_heard_text_counts_only_what_tts_was_given(self):
+        """Text the LLM produced after the last segment handed to TTS was never voiced, so it is not heard"""
+        twilio = FakeTwilio()
+        playback = self.make_playback(twilio, lookahead_ms=10_000, mark_interval_ms=250)
+        playback.start()
+        await playback.write(b"\xff" * 8000)
+
+        playback.on_mark("ai-1-2")  # 500ms of the 1000ms synthesized from the first sentence
+        playback.interrupt()
+
+        spoken = "one two three four five six seven eight nine ten."
+        text = spoken + " eleven twelve thirteen fourteen fifteen sixteen seventeen eighteen nineteen twenty"
+        self.assertEqual(playback.heard_text(text, spoken=spoken), "one two three four five...")
+
+    async def test_5_uninterrupted_reply_is_kept_whole(self):
+        """A reply that played to the end is saved verbatim"""
+        twilio = FakeTwilio()
+        playback = self.make_playback(twilio, lookahead_ms=10_000)
+        playback.start()
+        await playback.write(b"\xff" * 800)
+        await playback.finish()
+        playback.on_mark("ai-1-end")
+        playback.interrupt()
+        self.assertEqual(playback.heard_text("All of it."), "All of it.")
+
+    async def test_6_tentative_pause_resends_cleared_audio(self):
+        """Resuming after a VAD pause re-sends what the 'clear' dropped"""
+        twilio = FakeTwilio()
+        playback = self.make_playback(twilio, lookahead_ms=10_000, mark_interval_ms=100)
+        playback.start()
+        audio = bytes(range(256)) * 10
+        await playback.write(audio[:1600])
+
+        self.assertTrue(playback.pause())  # Nothing played yet by the clock: rewind to 0
+        writer = asyncio.create_task(playback.write(audio[1600:]))
+        await asyncio.sleep(0.01)
+        self.assertEqual(playback.sent_bytes, 1600)  # Held while paused
+        self.assertFalse(playback.on_mark("ai-1-1"))  # Ack flushed by the clear
+
+        playback.resume()
+        await writer
+        await playback.finish()
+
+        resent = b"".join(twilio.frames[10:])
+        self.assertEqual(resent, audio)
+        self.assertEqual(playback.sent_bytes, len(audio))
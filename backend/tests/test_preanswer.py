@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from django.http import QueryDict
+from django.test import SimpleTestCase
+
+from calls import preanswer, prompts
+from calls.consumers import TwilioMediaConsumer
+from calls.serializers import MakeCallRequestSerializer
+
+
+class PreAnswerTests(SimpleTestCase):
+
+    def test_1_system_prompt_includes_context(self):
+        """Fetched context is appended to the session prompt"""
+        self.assertEqual(prompts.compile_system_prompt("Be brief.", None).text, "Be brief.")
+        prompt = prompts.compile_system_prompt("Be brief.", {"name": "Asha"}).text
+        self.assertTrue(prompt.startswith("Be brief.\n\n"))
+        self.assertIn("name: Asha", prompt)
+
+    @patch('calls.consumers.synthesize_ulaw', new_callable=AsyncMock, return_value=b'\xff' * 800)
+    @patch('calls.consumers.generate_opener', new_callable=AsyncMock, return_value='"Hi Asha, it\'s the clinic."')
+    async def test_2_personalized_greeting_is_buffered_before_pickup(self, opener, synthesize):
+        """A pickup mid-preparation waits for it and gets the opener with its audio"""
+        task = asyncio.create_task(preanswer.prepare(1, 'CA-pre-1', "Be brief.", None, None, True))
+        await asyncio.sleep(0)
+        pre = await preanswer.take('CA-pre-1', timeout=1)
+        await task
+
+        self.assertEqual(pre.greeting, "Hi Asha, it's the clinic.")
+        self.assertEqual(pre.audio, b'\xff' * 800)
+        self.assertEqual(pre.prompt.text, "Be brief.")
+        synthesize.assert_awaited_once_with("Hi Asha, it's the clinic.")
+        self.assertIsNone(await preanswer.take('CA-pre-1', timeout=0))
+
+    async def test_3_unprepared_or_slow_calls_fall_back(self):
+        """Unknown calls and preparation that outlasts the wait return None"""
+        self.assertIsNone(await preanswer.take('CA-unknown', timeout=0.01))
+
+        preanswer._pending['CA-slow'] = preanswer.PreAnswer('CA-slow')
+        self.assertIsNone(await preanswer.take('CA-slow', timeout=0.01))
+
+    async def test_4_opener_is_in_the_conversation_history(self):
+        """The next LLM request sees the personalized greeting the caller heard"""
+        consumer = TwilioMediaConsumer()
+        consumer.accept = AsyncMock()
+        await consumer.connect()
+        pre = SimpleNamespace(greeting="Hi Asha, it's the clinic.", audio=b'\xff' * 800, context_fetched=True,
+                              prompt=prompts.compile_system_prompt("Be brief.", None))
+        with patch.object(consumer, '_take_preanswer', AsyncMock(return_value=pre)), \
+                patch.object(consumer, '_load_session', AsyncMock()), \
+                patch.object(consumer, '_start_deepgram', AsyncMock()), \
+                patch.object(consumer, '_open_tts', AsyncMock()), \
+                patch.object(consumer, '_speak_phrase', AsyncMock()):
+            await consumer._start_call()
+            await consumer.response_task
+
+        self.assertEqual(consumer.memory.messages()[1:], [{"role": "assistant", "content": "Hi Asha, it's the clinic."}])
+        await consumer.tts.close()
+
+    def test_5_personalize_flag_parses_as_a_boolean(self):
+        """"false"/"0" turn the opener off; leaving the flag out keeps the server default"""
+        for data, expected in (({'personalize_greeting': 'false'}, False), ({'personalize_greeting': '0'}, False),
+                               ({'personalize_greeting': 'true'}, True), ({}, None)):
+            for payload in ({'to': '+15550100', **data}, QueryDict(mutable=True)):
+                if isinstance(payload, QueryDict):
+                    payload.update({'to': '+15550100', **data})
+                serializer = MakeCallRequestSerializer(data=payload)
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+                self.assertIs(serializer.validated_data['personalize_greeting'], expected)
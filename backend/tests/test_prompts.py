@@ -0,0 +1,43 @@
+from django.test import SimpleTestCase
+
+from calls.prompts import compile_system_prompt
+
+CONTEXT = {
+    "name": "Asha Rao",
+    "account": {"plan": "gold", "id": 4411, "internal_notes": None},
+    "tags": ["vip", "renewal"],
+    "last_order": {"item": "Blue kettle", "delivered": True},
+    "history": "word " * 100,
+}
+
+
+class PromptCompilerTests(SimpleTestCase):
+
+    def test_1_context_is_rendered_compactly(self):
+        """Nested context becomes sorted key: value lines; empty fields are skipped, long values clipped"""
+        prompt = compile_system_prompt("Be brief.", CONTEXT, fields=[], value_chars=40)
+        lines = prompt.text.split("\n")[3:]
+        self.assertEqual(lines[:4], ["account.id: 4411", "account.plan: gold", "history: " + ("word " * 8).strip() + "…",
+                                     "last_order.delivered: yes"])
+        self.assertIn("tags: vip, renewal", lines)
+        self.assertNotIn("internal_notes", prompt.text)
+        self.assertEqual(prompt.context_fields, 7)
+
+    def test_2_field_projection_and_size_cap(self):
+        """Only the configured fields are rendered, and the block stops at max_chars"""
+        prompt = compile_system_prompt("Be brief.", CONTEXT, fields=["name", "account.plan", "missing"])
+        self.assertTrue(prompt.text.endswith("name: Asha Rao\naccount.plan: gold"))
+
+        capped = compile_system_prompt("Be brief.", CONTEXT, fields=[], max_chars=40)
+        self.assertEqual(capped.context_fields, 2)
+        self.assertEqual(capped.dropped_fields, 5)
+
+    def test_3_prefix_is_byte_stable_across_calls(self):
+        """Calls of the same campaign share the prefix bytes regardless of whitespace or caller"""
+        one = compile_system_prompt("Be brief.  \r\nSell kettles.\n", {"name": "Asha"})
+        two = compile_system_prompt("Be brief.\nSell kettles.", {"name": "Ravi"})
+        self.assertEqual(one.prefix, "Be brief.\nSell kettles.")
+        self.assertEqual(one.prefix_hash, two.prefix_hash)
+        self.assertTrue(one.text.startswith(one.prefix) and two.text.startswith(two.prefix))
+        self.assertIn("prefix_seen=no", one.report())
+        self.assertIn("prefix_seen=yes", two.report())
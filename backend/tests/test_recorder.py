@@ -0,0 +1,92 @@
+import asyncio
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from calls import recorder
+
+
+async def text(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+class CallRecorderTests(SimpleTestCase):
+
+    async def test_1_recording_round_trips(self):
+        """Everything recorded comes back from load() in order, with its time since the call started"""
+        loop = asyncio.get_running_loop()
+        directory = tempfile.mkdtemp()
+        rec = recorder.start_call(loop.time(), directory=directory, sample=1)
+        rec.twilio('{"event":"start"}')
+        rec.media(b'\x7f' * 160)
+        rec.transcript("what time is it", True, 0.98)
+        rec.llm_request()
+        await asyncio.sleep(0.05)
+        rec.llm_first()
+        rec.llm_token("It's")
+        rec.llm_token(" noon.")
+        rec.tts_start()
+        self.assertEqual([chunk async for chunk in rec.tts_text(text("It's", " noon."))], ["It's", " noon."])
+        await asyncio.sleep(0.02)
+        rec.tts_audio(320)
+        rec.tts_audio(160)
+        path = await rec.save("CA1", call_sid="CA1")
+
+        self.assertEqual(path, os.path.join(directory, "CA1.callrec"))
+        loaded = recorder.load(path)
+        self.assertEqual(loaded.meta['call_sid'], "CA1")
+        self.assertEqual(loaded.twilio()[0][1], '{"event":"start"}')
+        self.assertEqual(loaded.media()[0][1], b'\x7f' * 160)
+        self.assertEqual(loaded.transcripts()[0][1], {'text': "what time is it", 'final': True, 'confidence': 0.98})
+
+        (reply,) = loaded.llm_replies()
+        self.assertGreaterEqual(reply.first_delay, 0.05)
+        self.assertEqual([token for _, token in reply.tokens], ["It's", " noon."])
+
+        (synthesis,) = loaded.tts_replies()
+        self.assertGreaterEqual(synthesis.first_delay, 0.02)
+        self.assertEqual([length for _, length in synthesis.chunks], [320, 160])
+        self.assertEqual(synthesis.chunks[0][0], 0)
+
+    async def test_2_off_unless_a_directory_is_set(self):
+        """No directory, or a call outside the sample, means no recorder"""
+        loop = asyncio.get_running_loop()
+        self.assertIsNone(recorder.start_call(loop.time(), directory='', sample=1))
+        self.assertIsNone(recorder.start_call(loop.time(), directory=tempfile.mkdtemp(), sample=0))
+
+    def test_3_rejects_other_files(self):
+        """Anything without the recording header is refused"""
+        with tempfile.NamedTemporaryFile(suffix='.callrec') as f:
+            f.write(b'not a recording')
+            f.flush()
+            with self.assertRaises(ValueError):
+                recorder.load(f.name)
+
+    async def test_4_name_stays_inside_the_directory(self):
+        """A sid with path separators or dots is written as a plain file in the recording directory"""
+        loop = asyncio.get_running_loop()
+        directory = tempfile.mkdtemp()
+        rec = recorder.start_call(loop.time(), directory=directory, sample=1)
+        rec.media(b'\x7f' * 160)
+        path = await rec.save("../escaped/CA1")
+
+        self.assertEqual(path, os.path.join(directory, "___escaped_CA1.callrec"))
+        self.assertEqual(os.listdir(directory), ["___escaped_CA1.callrec"])
+        self.assertEqual(recorder.load(path).media()[0][1], b'\x7f' * 160)
+
+    async def test_5_stops_at_the_size_cap(self):
+        """A recording that reaches its cap stops whole, and is saved with what came before, marked truncated"""
+        loop = asyncio.get_running_loop()
+        rec = recorder.start_call(loop.time(), directory=tempfile.mkdtemp(), sample=1, max_bytes=1000)
+        for _ in range(10):
+            rec.media(b'\x7f' * 160)
+        rec.transcript("hello", True, 0.9)
+        path = await rec.save("CA1")
+
+        self.assertTrue(rec.truncated)
+        loaded = recorder.load(path)
+        self.assertTrue(loaded.meta['truncated'])
+        self.assertEqual(len(loaded.media()), 5)   # 5 x (9 + 160) bytes fit in 1000
+        self.assertEqual(loaded.transcripts(), [])
@@ -0,0 +1,70 @@
+import re
+
+from django.test import SimpleTestCase
+
+from calls.segmenter import SentenceSegmenter
+
+REPLY = ("Sure, I can look into that for you right now. Dr. Patel's clinic charges $3.50 per page, "
+         "e.g. for copies of records. It opens at 9 a.m. on weekdays!\nIs there anything else?")
+
+
+def tokenize(text):
+    """Split roughly like an LLM tokenizer: words with their leading space, punctuation on its own."""
+    return re.findall(r"\s*[\w$']+|\s*[^\w\s]|\s+", text)
+
+
+class SentenceSegmenterTests(SimpleTestCase):
+
+    def segment(self, tokens, **kwargs):
+        segmenter = SentenceSegmenter(**kwargs)
+        out = []
+        for token in tokens:
+            out.extend(segmenter.push(token))
+        tail = segmenter.flush()
+        return out + ([tail] if tail else [])
+
+    def test_1_abbreviations_and_decimals_stay_whole(self):
+        """'Dr.', 'e.g.', 'a.m.' and '$3.50' never end a segment"""
+        self.assertEqual(self.segment(tokenize(REPLY), first_clause_words=20), [
+            "Sure, I can look into that for you right now.",
+            "Dr. Patel's clinic charges $3.50 per page, e.g. for copies of records.",
+            "It opens at 9 a.m. on weekdays!",
+            "Is there anything else?",
+        ])
+
+    def test_2_output_does_not_depend_on_token_boundaries(self):
+        """Character-by-character, tokenized and whole-text input give the same segments"""
+        expected = self.segment([REPLY])
+        self.assertEqual(self.segment(list(REPLY)), expected)
+        self.assertEqual(self.segment(tokenize(REPLY)), expected)
+        self.assertEqual(" ".join(expected), REPLY.replace("\n", " "))
+
+    def test_3_short_sentences_merge_and_long_runs_are_cut(self):
+        """Sentences under min_chars are merged; text with no boundary is cut at max_chars"""
+        segments = self.segment(tokenize("Great. Okay. That works for me, thanks. " + "word " * 80),
+                                min_chars=30, max_chars=100, first_clause_words=50)
+        self.assertEqual(segments[0], "Great.")
+        self.assertEqual(segments[1], "Okay. That works for me, thanks.")
+        self.assertTrue(all(len(s) <= 100 for s in segments))
+
+    def test_4_first_segment_goes_with_the_token_that_ends_it(self):
+        """The opening clause or sentence is released by its own punctuation token, not the next one"""
+        for text, first in (
+            ("Well, to be honest with you, that plan sounds really good to me overall.", "Well, to be honest with you,"),
+            ("Sure, I can look into that for you right now. It opens at nine.", "Sure, I can look into that for you right now."),
+            ("It costs 3.50 per page, and that is all.", "It costs 3.50 per page,"),
+        ):
+            tokens = tokenize(text)
+            segmenter = SentenceSegmenter()
+            released = next(i for i, token in enumerate(tokens) if segmenter.push(token))
+            self.assertEqual("".join(tokens[:released + 1]).strip(), first)
+            self.assertEqual(" ".join([first] + self.segment(tokens[released + 1:])), text)
+
+    def test_5_a_plain_no_ends_a_sentence(self):
+        """"No." is an answer, not an abbreviation"""
+        self.assertEqual(self.segment(tokenize("No. I said Tuesday at noon, not Thursday morning at ten."),
+                                      first_clause_words=20),
+                         ["No.", "I said Tuesday at noon, not Thursday morning at ten."])
+        self.assertEqual(self.segment(tokenize("That's fine. No. I meant the one on Tuesday instead, sorry."),
+                                      min_chars=10, first_clause_words=20),
+                         ["That's fine.", "No. I meant the one on Tuesday instead, sorry."])
@@ -0,0 +1,84 @@
+import asyncio
+import base64
+import json
+from unittest.mock import AsyncMock
+
+from django.test import SimpleTestCase
+
+from calls.consumers import TwilioMediaConsumer
+from calls.stt import AudioSendQueue, BLOCK
+
+
+class FakeSTTSocket:
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.batches = []
+
+    async def send(self, data):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.batches.append(data)
+
+
+class AudioSendQueueTests(SimpleTestCase):
+
+    async def feed(self, queue, frames, interval=0.02):
+        for i in range(frames):
+            await queue.put(bytes([i % 256]) * 160)
+            await asyncio.sleep(interval)
+
+    async def test_1_coalesces_20ms_frames_into_100ms_batches(self):
+        """50 frames arrive as ~10 sends of 800 bytes"""
+        socket = FakeSTTSocket()
+        queue = AudioSendQueue(socket.send, batch_ms=100)
+        queue.start()
+        await self.feed(queue, 50, interval=0.005)
+        await queue.close()
+
+        self.assertEqual(b"".join(socket.batches), b"".join(bytes([i]) * 160 for i in range(50)))
+        self.assertLessEqual(len(socket.batches), 11)
+        self.assertTrue(all(len(b) <= 800 for b in socket.batches[:-1]))
+
+    async def test_2_slow_socket_does_not_block_producer(self):
+        """With drop_oldest a stalled STT socket costs frames, not receive-loop time"""
+        socket = FakeSTTSocket(delay=10)
+        queue = AudioSendQueue(socket.send, max_frames=5, batch_ms=20)
+        queue.start()
+        await asyncio.sleep(0.03)  # Let the sender pick up nothing and idle
+
+        start = asyncio.get_running_loop().time()
+        await queue.put(b"\x00" * 160)
+        await asyncio.sleep(0.05)  # First batch is now stuck in the slow send
+        for _ in range(20):
+            await queue.put(b"\x01" * 160)
+        self.assertLess(asyncio.get_running_loop().time() - start, 0.5)
+        self.assertEqual(len(queue), 5)
+        self.assertEqual(queue.dropped, 15)
+        await queue.close(flush=False, timeout=0.1)
+
+    async def test_3_block_policy_waits_for_space(self):
+        """With block, put() waits until the sender frees a slot"""
+        socket = FakeSTTSocket(delay=0.05)
+        queue = AudioSendQueue(socket.send, max_frames=2, batch_ms=1000, policy=BLOCK)
+        queue.start()
+        for _ in range(6):
+            await queue.put(b"\x02" * 160)
+        await queue.close()
+        self.assertEqual(queue.dropped, 0)
+        self.assertEqual(sum(len(b) for b in socket.batches), 6 * 160)
+
+    async def test_4_consumer_enqueues_into_an_empty_queue(self):
+        """Inbound media reaches the STT queue even while the queue is empty (and so falsy)"""
+        consumer = TwilioMediaConsumer()
+        consumer.accept = AsyncMock()
+        await consumer.connect()
+        socket = FakeSTTSocket()
+        consumer.stt_queue = AudioSendQueue(socket.send, batch_ms=20)
+        consumer.stt_queue.start()
+
+        payload = base64.b64encode(b"\xff" * 160).decode()
+        await consumer.websocket_receive({'type': 'websocket.receive', 'text': json.dumps(
+            {"event": "media", "media": {"track": "inbound", "payload": payload}})})
+        await consumer.stt_queue.close()
+        self.assertEqual(sum(len(b) for b in socket.batches), 160)
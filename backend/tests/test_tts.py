@@ -0,0 +1,85 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from django.test import SimpleTestCase
+
+from calls.tts import WebSocketStreamSession, TTSError
+from fakes import FakeElevenLabs, with_fakes
+
+
+async def text_chunks(*chunks, delay=0):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+@asynccontextmanager
+async def fake_elevenlabs(self):
+    """A fresh fake server and TTS session."""
+    self.server = await FakeElevenLabs(bytes_per_char=10).start()
+    self.tts = WebSocketStreamSession('key', 'voice', 'eleven_turbo_v2_5', 'ulaw_8000', url=self.server.ws_url)
+    try:
+        yield
+    finally:
+        await self.tts.close()
+        await self.server.stop()
+
+
+with_fake_elevenlabs = with_fakes(fake_elevenlabs)
+
+
+class WebSocketTTSTests(SimpleTestCase):
+
+    async def collect(self, stream):
+        return b"".join([audio async for audio in stream])
+
+    @with_fake_elevenlabs
+    async def test_1_replies_share_one_connection(self):
+        """Three replies stream over the websocket opened at call start"""
+        await self.tts.open()
+        for reply in ("Hello there. ", "How can I help? ", "Goodbye! "):
+            audio = await self.collect(self.tts.stream(text_chunks(*reply.split(' '))))
+            self.assertEqual(len(audio), len(reply.replace(' ', '')) * 10)
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.closed_contexts, ['reply-1', 'reply-2', 'reply-3'])
+        self.assertTrue(self.server.messages[0]['text'] == ' ' and self.server.messages[0]['context_id'] == 'reply-1')
+        # Each reply ends by flushing its context, then closing it
+        ends = [(m['context_id'], 'flush' if m.get('flush') else 'close')
+                for m in self.server.messages if m.get('flush') or m.get('close_context')]
+        self.assertEqual(ends, [(f'reply-{i}', end) for i in (1, 2, 3) for end in ('flush', 'close')])
+
+    @with_fake_elevenlabs
+    async def test_2_cancel_stops_the_reply_and_keeps_the_socket(self):
+        """Barge-in closes the context; the next reply goes out on the same socket"""
+        received = []
+        async for audio in self.tts.stream(text_chunks("one ", "two ", "three ", "four ", delay=0.05)):
+            received.append(audio)
+            self.tts.cancel()
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(len(received), 1)
+        self.assertIn('reply-1', self.server.closed_contexts)
+        audio = await self.collect(self.tts.stream(text_chunks("Okay. ")))
+        self.assertEqual(len(audio), 50)
+        self.assertEqual(self.server.connections, 1)
+
+    @with_fake_elevenlabs
+    async def test_3_reconnects_after_the_socket_drops(self):
+        """A socket closed between replies is reopened; one closed mid-reply raises"""
+        await self.tts.open()
+        await self.tts._ws.close()
+        audio = await self.collect(self.tts.stream(text_chunks("Still here. ")))
+        self.assertEqual(len(audio), 100)
+        self.assertEqual(self.server.connections, 2)
+
+        async def dropping():
+            yield "First "
+            await asyncio.sleep(0.05)
+            await self.tts._ws.close()
+            await asyncio.sleep(0.05)
+            yield "never sent "
+
+        with self.assertRaises(TTSError):
+            await self.collect(self.tts.stream(dropping()))
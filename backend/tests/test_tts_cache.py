@@ -0,0 +1,56 @@
+import mmap
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from calls.tts_cache import TTSCache, BYTES_SERVED
+
+
+def key(text):
+    return TTSCache.key(text, 'voice', 'eleven_turbo_v2_5', 'ulaw_8000')
+
+
+class TTSCacheTests(SimpleTestCase):
+
+    def test_1_lru_evicts_by_bytes(self):
+        """The least recently used phrases go first once total bytes exceed the budget"""
+        cache = TTSCache(max_bytes=3000)
+        cache.put(key('a'), b'\xff' * 1000)
+        cache.put(key('b'), b'\xff' * 1000)
+        cache.put(key('c'), b'\xff' * 1000)
+        cache.get(key('a'))                     # 'b' is now the oldest
+        cache.put(key('d'), b'\xff' * 1500)
+
+        self.assertIsNone(cache.get(key('b')))
+        self.assertIsNone(cache.get(key('c')))
+        self.assertIsNotNone(cache.get(key('a')))
+        self.assertEqual(cache.bytes, 2500)
+
+    def test_2_disk_store_survives_restart(self):
+        """A new cache on the same directory serves the phrase from an mmap"""
+        audio = bytes(range(256)) * 10
+        with tempfile.TemporaryDirectory() as directory:
+            TTSCache(directory=directory).put(key('Hello!'), audio)
+
+            cache = TTSCache(directory=directory)
+            self.assertTrue(cache.has(key('  Hello!  ')))
+            served_before = BYTES_SERVED.value
+            hit = cache.get(key('Hello!'))
+            self.assertIsInstance(hit, mmap.mmap)
+            self.assertEqual(bytes(hit), audio)
+            self.assertEqual(BYTES_SERVED.value - served_before, len(audio))
+            self.assertIsNone(cache.get(TTSCache.key('Hello!', 'other-voice', 'eleven_turbo_v2_5', 'ulaw_8000')))
+            self.assertEqual(cache.hit_ratio, 0.5)
+
+    def test_3_directory_is_created_on_first_write(self):
+        """Building a disk cache touches nothing; the directory appears with the first phrase stored"""
+        with tempfile.TemporaryDirectory() as parent:
+            directory = os.path.join(parent, 'tts')
+            cache = TTSCache(directory=directory)
+            self.assertFalse(os.path.exists(directory))
+            self.assertIsNone(cache.get(key('Hello!')))
+
+            cache.put(key('Hello!'), b'\xff' * 160)
+            self.assertTrue(cache.has(key('Hello!')))
+            self.assertEqual(len(os.listdir(directory)), 1)
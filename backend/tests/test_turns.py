@@ -0,0 +1,113 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from calls import turns
+from calls.consumers import TwilioMediaConsumer
+from calls.models import CallSession, CallTurn
+
+
+def turn_row(session, minutes_ago=1, interrupted=False, **stages):
+    return CallTurn(session=session, index=1, interrupted=interrupted,
+                    started_at=timezone.now() - timedelta(minutes=minutes_ago), **stages)
+
+
+class TurnTimelineTests(SimpleTestCase):
+
+    def test_1_stages_are_stored_relative_to_the_end_of_speech(self):
+        """Offsets are ms after the last user audio; without VAD they count from the STT final"""
+        timeline = turns.TurnTimeline(3)
+        for stage, at in [('user_audio_end', 10.0), ('stt_final', 10.4), ('debounce_fired', 10.8),
+                          ('llm_request', 10.801), ('llm_first_token', 11.1), ('tts_first_byte', 11.3),
+                          ('first_frame_sent', 11.31)]:
+            timeline.mark(stage, at)
+        timeline.mark('llm_request', 12.0)   # A later time for a stage keeps the first
+        row = timeline.to_model(CallSession(), now=12.0)
+        self.assertEqual((row.index, row.measured_from), (3, 'user_audio_end'))
+        self.assertEqual((row.stt_final_ms, row.llm_request_ms, row.first_frame_sent_ms), (400, 801, 1310))
+        self.assertIsNone(row.playback_marked_ms)
+        self.assertAlmostEqual((timezone.now() - row.started_at).total_seconds(), 2.0, delta=0.1)
+
+        durations = turns.stage_durations(row)
+        self.assertEqual(durations['stt_final'], 400)
+        self.assertEqual(durations['llm_first_token'], 299)
+        self.assertEqual(durations['round_trip'], 1310)
+
+        no_vad = turns.TurnTimeline(1)
+        no_vad.mark('stt_final', 5.0)
+        no_vad.mark('first_frame_sent', 6.0)
+        row = no_vad.to_model(CallSession(), now=6.0)
+        self.assertEqual((row.measured_from, row.stt_final_ms, row.first_frame_sent_ms), ('stt_final', 0, 1000))
+        self.assertNotIn('round_trip', turns.stage_durations(row))
+
+    async def test_2_reply_stages_are_marked_and_the_turn_is_queued(self):
+        """_run_turn records the reply's stages and queues one CallTurn, flagged if barged in"""
+        consumer = TwilioMediaConsumer()
+        consumer.accept = AsyncMock()
+        await consumer.connect()
+        consumer.session = CallSession(call_sid="CAturns")
+
+        async def reply():
+            for stage in ('llm_request', 'llm_first_token', 'tts_first_byte', 'first_frame_sent'):
+                consumer._turn_mark(stage)
+                await asyncio.sleep(0.01)
+
+        timeline = turns.TurnTimeline(1)
+        timeline.mark('stt_final', asyncio.get_running_loop().time())
+        with patch('calls.persistence.buffer.add') as add:
+            await consumer._run_turn(timeline, reply())
+            row = add.call_args[0][0]
+            self.assertIsNone(consumer.turn)
+            self.assertFalse(row.interrupted)
+            self.assertGreaterEqual(row.first_frame_sent_ms, 30)
+
+            task = asyncio.create_task(consumer._run_turn(turns.TurnTimeline(2), asyncio.sleep(10)))
+            await asyncio.sleep(0)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            self.assertTrue(add.call_args[0][0].interrupted)
+
+            async def swallows_cancel():
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    pass
+
+            consumer.response_task = asyncio.create_task(consumer._run_turn(turns.TurnTimeline(3), swallows_cancel()))
+            await asyncio.sleep(0)
+            task = consumer.response_task
+            consumer._cancel_response_task()
+            await task
+            self.assertTrue(add.call_args[0][0].interrupted)
+        self.assertEqual(consumer.turn_count, 3)
+        await consumer.tts.close()
+
+
+class TurnLatencyTests(TestCase):
+
+    def setUp(self):
+        self.session = CallSession.objects.create(call_sid="CAlatency", from_number="+1", to_number="+2")
+
+    def test_3_endpoint_reports_percentiles_per_stage(self):
+        """GET /calls/turn-latency/ gives p50/p90/p99 per stage over the window"""
+        rows = [turn_row(self.session, stt_final_ms=400, llm_request_ms=800 + i, first_frame_sent_ms=1500 + 10 * i)
+                for i in range(10)]
+        rows.append(turn_row(self.session, minutes_ago=120, stt_final_ms=5000))                 # Outside the window
+        rows.append(turn_row(self.session, interrupted=True, stt_final_ms=9000))                # Barged in
+        CallTurn.objects.bulk_create(rows)
+
+        response = self.client.get('/calls/turn-latency/?minutes=60')
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['window_minutes'], report['turns']), (60, 10))
+        self.assertEqual(report['stages']['stt_final'], {'samples': 10, 'p50': 400, 'p90': 400, 'p99': 400})
+        self.assertEqual(report['stages']['round_trip']['p50'], 1550)
+        self.assertEqual(report['stages']['round_trip']['p99'], 1590)
+        self.assertEqual(report['stages']['tts_first_byte']['samples'], 0)
+
+        report = self.client.get('/calls/turn-latency/?include_interrupted=true').json()
+        self.assertEqual(report['stages']['stt_final']['p99'], 9000)
+        self.assertEqual(self.client.get('/calls/turn-latency/?minutes=x').status_code, 400)
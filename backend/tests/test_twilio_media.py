@@ -0,0 +1,68 @@
+import base64
+import json
+import os
+
+from django.test import SimpleTestCase
+
+from calls.twilio_media import MediaFrameEncoder, parse_message, FAST_PATH, SLOW_PATH
+
+
+def media_message(audio, stream_sid="MZ123"):
+    # Twilio's own key order and compact separators
+    return json.dumps({
+        "event": "media",
+        "sequenceNumber": "4",
+        "media": {"track": "inbound", "chunk": "3", "timestamp": "60",
+                  "payload": base64.b64encode(audio).decode()},
+        "streamSid": stream_sid,
+    }, separators=(',', ':'))
+
+
+class ParseMessageTests(SimpleTestCase):
+
+    def test_1_media_frames_take_the_fast_path(self):
+        """Twilio media frames decode without json.loads and match the full parse"""
+        audio = os.urandom(160)
+        before = FAST_PATH.value
+        event, data, decoded = parse_message(media_message(audio))
+        self.assertEqual((event, data, decoded), ('media', None, audio))
+        self.assertEqual(FAST_PATH.value, before + 1)
+
+    def test_2_other_events_fall_back_to_json(self):
+        """start/mark/stop come back as parsed dicts with no audio"""
+        text = json.dumps({"event": "mark", "streamSid": "MZ1", "mark": {"name": "ai-1-end"}})
+        event, data, audio = parse_message(text)
+        self.assertEqual(event, 'mark')
+        self.assertEqual(data['mark']['name'], 'ai-1-end')
+        self.assertIsNone(audio)
+
+    def test_3_unusual_layouts_still_decode(self):
+        """Spaced JSON, reordered keys and escaped slashes go through the JSON fallback"""
+        audio = bytes(range(256))
+        payload = base64.b64encode(audio).decode()
+        variants = [
+            json.dumps({"event": "media", "media": {"payload": payload}}),
+            json.dumps({"media": {"payload": payload}, "event": "media"}, separators=(',', ':')),
+            '{"event":"media","media":{"payload":"%s"}}' % payload.replace('/', '\\/'),
+        ]
+        for text in variants:
+            before = SLOW_PATH.value
+            event, data, decoded = parse_message(text)
+            self.assertEqual((event, decoded), ('media', audio))
+            self.assertEqual(SLOW_PATH.value, before + 1)
+
+
+class MediaFrameEncoderTests(SimpleTestCase):
+
+    def test_1_messages_match_json_dumps(self):
+        """Pre-rendered media/mark/clear messages parse to the same dicts json.dumps produced"""
+        encoder = MediaFrameEncoder('MZ"odd\\sid')
+        frame = os.urandom(160)
+        self.assertEqual(json.loads(encoder.media(memoryview(frame))), {
+            "event": "media", "streamSid": 'MZ"odd\\sid',
+            "media": {"payload": base64.b64encode(frame).decode(), "track": "outbound"},
+        })
+        self.assertEqual(json.loads(encoder.mark('ai-1-"end"')), {
+            "event": "mark", "streamSid": 'MZ"odd\\sid', "mark": {"name": 'ai-1-"end"'},
+        })
+        self.assertEqual(json.loads(encoder.clear()), {"event": "clear", "streamSid": 'MZ"odd\\sid'})
@@ -0,0 +1,39 @@
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from calls import warmup
+
+
+class StartupMiddlewareTests(SimpleTestCase):
+
+    async def test_1_startup_hooks_run_once_on_the_server_loop(self):
+        """StartupMiddleware runs registered hooks once and answers lifespan events"""
+        ran = []
+
+        async def hook():
+            ran.append('hook')
+
+        async def shutdown_hook():
+            ran.append('shutdown')
+
+        # Only the test's own hooks: the real ones warm connections to live hosts
+        with mock.patch.object(warmup, '_hooks', [hook]), \
+                mock.patch.object(warmup, '_shutdown_hooks', [shutdown_hook]), \
+                mock.patch.object(warmup, '_loop', None):
+            app = warmup.StartupMiddleware(None)
+            messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+            sent = []
+
+            async def receive():
+                return next(messages)
+
+            async def send(message):
+                sent.append(message['type'])
+
+            await app({'type': 'lifespan'}, receive, send)
+            warmup.start()
+            await asyncio.sleep(0.01)
+            self.assertCountEqual(ran, ['hook', 'shutdown'])   # The start-up hook runs as a background task
+            self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])